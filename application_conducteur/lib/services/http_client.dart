@@ -17,6 +17,9 @@ class HttpClient {
 
   static bool _isRefreshing = false;
 
+  // Dernière réponse de chaque GET portant un ETag, rejouée quand le serveur répond 304
+  static final Map<String, Response<dynamic>> _etagCache = {};
+
   static Dio get instance {
     _dio.interceptors.clear();
 
@@ -42,8 +45,37 @@ class HttpClient {
             options.headers['Authorization'] = 'Bearer $access';
             print('✅ Token ajouté');
           }
+          if (options.method == 'GET') {
+            final cached = _etagCache[options.uri.toString()];
+            final etag = cached?.headers.value('etag');
+            if (etag != null) {
+              options.headers['If-None-Match'] = etag;
+            }
+            options.validateStatus = (status) =>
+                status != null && ((status >= 200 && status < 300) || status == 304);
+          }
           handler.next(options);
         },
+        onResponse: (response, handler) {
+          final options = response.requestOptions;
+          if (options.method == 'GET') {
+            final key = options.uri.toString();
+            final cached = _etagCache[key];
+            if (response.statusCode == 304 && cached != null) {
+              // Rien n'a changé côté serveur : on renvoie le corps déjà reçu
+              return handler.resolve(Response(
+                requestOptions: options,
+                data: cached.data,
+                headers: cached.headers,
+                statusCode: 200,
+              ));
+            }
+            if (response.statusCode == 200 && response.headers.value('etag') != null) {
+              _etagCache[key] = response;
+            }
+          }
+          handler.next(response);
+        },
         onError: (DioException error, handler) async {
           print('❌ Erreur HTTP: ${error.response?.statusCode}');
           print('URL: ${error.requestOptions.uri}');
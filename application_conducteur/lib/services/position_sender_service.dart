@@ -45,6 +45,11 @@ class PositionSenderService with ChangeNotifier, WidgetsBindingObserver {
     }
   }
 
+  // Les positions sont mises en tampon puis envoyées par lots
+  static const String _bufferKey = 'positions_buffer';
+  static const int _flushSize = 10;
+  static const int _maxBufferSize = 1000;
+
   Future<void> _sendPosition() async {
     double latitude;
     double longitude;
@@ -79,23 +84,43 @@ class PositionSenderService with ChangeNotifier, WidgetsBindingObserver {
         notifyListeners();
         return;
       }
+
+      final List<dynamic> buffer = jsonDecode(prefs.getString(_bufferKey) ?? '[]');
+      buffer.add({
+        'latitude': latitude,
+        'longitude': longitude,
+        'timestamp': DateTime.now().toUtc().toIso8601String(),
+      });
+      if (buffer.length > _maxBufferSize) {
+        buffer.removeRange(0, buffer.length - _maxBufferSize);
+      }
+      await prefs.setString(_bufferKey, jsonEncode(buffer));
+      await prefs.setDouble('last_latitude', latitude);
+      await prefs.setDouble('last_longitude', longitude);
+
+      if (buffer.length < _flushSize) {
+        _lastStatus = 'Position mise en attente (${buffer.length}/$_flushSize)';
+        notifyListeners();
+        return;
+      }
+
       final response = await http.post(
-        Uri.parse('$backendUrl/api/positions/'),
+        Uri.parse('$backendUrl/api/positions/bulk/'),
         headers: {
           'Content-Type': 'application/json',
           'Authorization': 'Bearer $token',
         },
         body: jsonEncode({
           'driver': driverId,
-          'latitude': latitude,
-          'longitude': longitude,
+          'positions': buffer,
         }),
       );
-      if (response.statusCode == 201 || response.statusCode == 200) {
-        _lastStatus = 'Position envoyée à $latitude, $longitude';
-        // Enregistrer la dernière position dans SharedPreferences
-        await prefs.setDouble('last_latitude', latitude);
-        await prefs.setDouble('last_longitude', longitude);
+      if (response.statusCode == 201 || response.statusCode == 400) {
+        // Les positions rejetées ne seront pas meilleures au prochain envoi
+        await prefs.setString(_bufferKey, '[]');
+        _lastStatus = response.statusCode == 201
+            ? '${buffer.length} positions envoyées'
+            : 'Lot de positions rejeté';
       } else {
         _lastStatus = 'Erreur d\'envoi: \\${response.statusCode}';
       }
@@ -104,4 +129,4 @@ class PositionSenderService with ChangeNotifier, WidgetsBindingObserver {
     }
     notifyListeners();
   }
-} 
\ No newline at end of file
+}
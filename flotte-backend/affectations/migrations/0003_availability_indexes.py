@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('affectations', '0002_alter_affectation_kilometrage_initial'),
+        ('fleet', '0024_availability_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='affectation',
+            index=models.Index(fields=['vehicule', 'date_debut', 'date_fin'], name='affect_vehicule_span_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='affectation',
+            index=models.Index(fields=['conducteur', 'date_debut', 'date_fin'], name='affect_conducteur_span_idx'),
+        ),
+    ]
@@ -64,6 +64,10 @@ class Affectation(models.Model):
         verbose_name = 'Affectation'
         verbose_name_plural = 'Affectations'
         ordering = ['-date_debut']
+        indexes = [
+            models.Index(fields=['vehicule', 'date_debut', 'date_fin'], name='affect_vehicule_span_idx'),
+            models.Index(fields=['conducteur', 'date_debut', 'date_fin'], name='affect_conducteur_span_idx'),
+        ]
 
     def __str__(self):
         return f"{self.vehicule} - {self.conducteur} ({self.date_debut.strftime('%d/%m/%Y')})"
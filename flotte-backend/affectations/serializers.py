@@ -1,8 +1,8 @@
 from rest_framework import serializers
-from fleet.serializers import VehicleSerializer, DriverSerializer
+from fleet.serializers import VehicleSerializer, DriverSerializer, SparseFieldsMixin
 from .models import Affectation
 
-class AffectationSerializer(serializers.ModelSerializer):
+class AffectationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     vehicule_details = VehicleSerializer(source='vehicule', read_only=True)
     conducteur_details = DriverSerializer(source='conducteur', read_only=True)
     duree = serializers.IntegerField(read_only=True)
@@ -15,7 +15,7 @@ class AffectationViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        queryset = Affectation.objects.all()
+        queryset = Affectation.objects.select_related('vehicule', 'conducteur__user_profile__user')
         
         # Filtrage par statut
         statut = self.request.query_params.get('statut', None)
@@ -1,4 +1,5 @@
 from django.contrib import admin
-from .models import PointGPS  # 👈 le vrai nom de ton modèle
+from .models import PointGPS, OdometreMission  # 👈 le vrai nom de ton modèle
 
 admin.site.register(PointGPS)  # 👈 enregistre-le pour l’admin
+admin.site.register(OdometreMission)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conducteur', '0001_initial'),
+        ('fleet', '0015_compact_position_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OdometreMission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance_km', models.FloatField(default=0)),
+                ('vitesse_max_kmh', models.FloatField(default=0)),
+                ('temps_mouvement_s', models.FloatField(default=0)),
+                ('nombre_points', models.IntegerField(default=0)),
+                ('dernier_latitude', models.FloatField(blank=True, null=True)),
+                ('dernier_longitude', models.FloatField(blank=True, null=True)),
+                ('dernier_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('mission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='odometre', to='fleet.mission')),
+            ],
+        ),
+    ]
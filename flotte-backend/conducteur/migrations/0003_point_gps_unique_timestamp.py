@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:54
+
+from django.db import migrations, models
+from django.db.models import Min, Count
+
+
+def remove_duplicate_points(apps, schema_editor):
+    PointGPS = apps.get_model('conducteur', 'PointGPS')
+    duplicates = (
+        PointGPS.objects.values('mission_id', 'timestamp')
+        .annotate(keep_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        PointGPS.objects.filter(
+            mission_id=row['mission_id'], timestamp=row['timestamp']
+        ).exclude(id=row['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conducteur', '0002_odometremission'),
+        ('fleet', '0015_compact_position_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_points, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='pointgps',
+            constraint=models.UniqueConstraint(fields=('mission', 'timestamp'), name='unique_point_gps_mission_timestamp'),
+        ),
+    ]
@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from fleet.models import Mission
+from fleet.geo import segment_distances_km
 
 # Create your models here.
 
@@ -9,5 +10,85 @@ class PointGPS(models.Model):
     longitude = models.FloatField()
     timestamp = models.DateTimeField()
 
+    class Meta:
+        constraints = [
+            # Rend l'envoi des points rejouable sans créer de doublons
+            models.UniqueConstraint(fields=['mission', 'timestamp'], name='unique_point_gps_mission_timestamp'),
+        ]
+
     def __str__(self):
         return f"Point {self.latitude}, {self.longitude} ({self.timestamp})"
+
+class OdometreMission(models.Model):
+    """Cumul de distance d'une mission, mis à jour à chaque réception de points GPS."""
+    # En dessous de cette vitesse, le véhicule est considéré à l'arrêt
+    VITESSE_MOUVEMENT_KMH = 3
+
+    mission = models.OneToOneField(Mission, on_delete=models.CASCADE, related_name='odometre')
+    distance_km = models.FloatField(default=0)
+    vitesse_max_kmh = models.FloatField(default=0)
+    temps_mouvement_s = models.FloatField(default=0)
+    nombre_points = models.IntegerField(default=0)
+    dernier_latitude = models.FloatField(null=True, blank=True)
+    dernier_longitude = models.FloatField(null=True, blank=True)
+    dernier_timestamp = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Odomètre {self.mission} : {self.distance_km:.2f} km"
+
+    def ajouter_points(self, points):
+        """
+        Ajoute des points (latitude, longitude, timestamp) au cumul.
+
+        Le cumul ne dépend que des nouveaux segments ; si un point arrive en
+        retard (antérieur au dernier point comptabilisé, par exemple lors d'un
+        envoi hors ligne), le cumul est recalculé sur toute la trace enregistrée.
+        """
+        points = sorted(points, key=lambda p: p[2])
+        if not points:
+            return
+        if self.dernier_timestamp is not None and points[0][2] <= self.dernier_timestamp:
+            self.recalculer()
+            return
+        self._cumuler(points)
+
+    def recalculer(self):
+        """Remet le cumul à zéro et le recalcule depuis les points GPS enregistrés."""
+        self.distance_km = self.vitesse_max_kmh = self.temps_mouvement_s = 0
+        self.nombre_points = 0
+        self.dernier_latitude = self.dernier_longitude = self.dernier_timestamp = None
+        points = list(self.mission.points_gps.order_by('timestamp').values_list('latitude', 'longitude', 'timestamp'))
+        if points:
+            self._cumuler(points)
+
+    def _cumuler(self, points):
+        start = None
+        previous = None
+        if self.dernier_timestamp is not None:
+            start = (self.dernier_latitude, self.dernier_longitude)
+            previous = self.dernier_timestamp
+        distances = segment_distances_km([(p[0], p[1]) for p in points], start=start)
+        timestamps = ([previous] if previous else []) + [p[2] for p in points]
+        for distance, t0, t1 in zip(distances, timestamps, timestamps[1:]):
+            self.distance_km += distance
+            seconds = (t1 - t0).total_seconds()
+            if seconds <= 0:
+                continue
+            speed = distance * 3600 / seconds
+            if speed >= self.VITESSE_MOUVEMENT_KMH:
+                self.temps_mouvement_s += seconds
+                self.vitesse_max_kmh = max(self.vitesse_max_kmh, speed)
+
+        self.nombre_points += len(points)
+        self.dernier_latitude, self.dernier_longitude, self.dernier_timestamp = points[-1]
+
+    @classmethod
+    def mettre_a_jour(cls, mission, points):
+        """Met à jour (ou initialise depuis la trace existante) l'odomètre d'une mission."""
+        with transaction.atomic():
+            odometre, created = cls.objects.select_for_update().get_or_create(mission=mission)
+            if created:
+                points = mission.points_gps.values_list('latitude', 'longitude', 'timestamp')
+            odometre.ajouter_points(points)
+            odometre.save()
+        return odometre
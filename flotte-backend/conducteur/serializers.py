@@ -1,16 +1,35 @@
 from rest_framework import serializers
 from fleet.models import Mission
-from .models import PointGPS
-from fleet.serializers import VehicleSerializer, DriverSerializer
+from .models import PointGPS, OdometreMission
+from fleet.serializers import VehicleSerializer, DriverSerializer, SparseFieldsMixin, POSITION_COORDINATES_KWARGS
 
 class PointGPSSerializer(serializers.ModelSerializer):
     class Meta:
         model = PointGPS
         fields = ['id', 'mission', 'latitude', 'longitude', 'timestamp']
 
-class MissionSerializer(serializers.ModelSerializer):
+class PointGPSBulkItemSerializer(serializers.ModelSerializer):
+    """Point d'un lot : mission et doublons sont vérifiés en une seule requête par la vue."""
+    mission = serializers.IntegerField(source='mission_id', required=False)
+
+    class Meta:
+        model = PointGPS
+        fields = ['mission', 'latitude', 'longitude', 'timestamp']
+        extra_kwargs = POSITION_COORDINATES_KWARGS
+        validators = []
+
+class OdometreMissionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OdometreMission
+        fields = [
+            'distance_km', 'vitesse_max_kmh', 'temps_mouvement_s', 'nombre_points',
+            'dernier_latitude', 'dernier_longitude', 'dernier_timestamp'
+        ]
+
+class MissionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     vehicle_details = VehicleSerializer(source='vehicle', read_only=True)
     driver_details = DriverSerializer(source='driver', read_only=True)
+    odometre = OdometreMissionSerializer(read_only=True)
 
     class Meta:
         model = Mission
@@ -29,5 +48,6 @@ class MissionSerializer(serializers.ModelSerializer):
             'raison',
             'statut',
             'reponse_conducteur',
+            'odometre',
         ]
         read_only_fields = ['distance_parcourue', 'created_at', 'updated_at', 'statut'] 
\ No newline at end of file
@@ -1,3 +1,174 @@
-from django.test import TestCase
+import pytest
+from types import SimpleNamespace
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+from rest_framework import status
+from rest_framework.test import APIClient
+from fleet.models import Vehicle, Driver, Mission
+from .models import PointGPS, OdometreMission
 
-# Create your tests here.
+@pytest.fixture
+def user():
+    return User.objects.create_user(username='conducteur1', password='testpass123')
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+@pytest.fixture
+def mission(user):
+    driver = Driver.objects.create(user_profile=user.profile, numero_permis='P-0001')
+    vehicle = Vehicle.objects.create(marque='Toyota', modele='Hilux', immatriculation='AB-123-CD', kilometrage=0)
+    return Mission.objects.create(vehicle=vehicle, driver=driver, statut='acceptee')
+
+@pytest.mark.django_db
+class TestMissionTrace:
+    def test_trace_polyline(self, api_client, mission):
+        start = timezone.now()
+        PointGPS.objects.bulk_create([
+            PointGPS(mission=mission, latitude=5.0 + i * 0.001, longitude=-4.0,
+                     timestamp=start + timedelta(seconds=i))
+            for i in range(50)
+        ])
+        response = api_client.get(f'/api/conducteur/missions/{mission.id}/trace/', {'tolerance': '1'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['points_count'] == 50
+        assert response.data['simplified_count'] == 2
+
+@pytest.mark.django_db
+class TestMissionTerminer:
+    def test_terminer_stores_distance(self, api_client, mission):
+        start = timezone.now()
+        PointGPS.objects.bulk_create([
+            PointGPS(mission=mission, latitude=5.0 + i * 0.01, longitude=-4.0,
+                     timestamp=start + timedelta(minutes=i))
+            for i in range(11)
+        ])
+        response = api_client.post(f'/api/conducteur/missions/{mission.id}/terminer/')
+        assert response.status_code == status.HTTP_200_OK
+        mission.refresh_from_db()
+        assert mission.statut == 'terminee'
+        assert mission.distance_km == pytest.approx(11.12, abs=0.01)
+
+    def test_terminer_keeps_planned_distance(self, api_client, mission):
+        mission.distance_km = 150
+        mission.save()
+        start = timezone.now()
+        PointGPS.objects.bulk_create([
+            PointGPS(mission=mission, latitude=5.0 + i * 0.01, longitude=-4.0,
+                     timestamp=start + timedelta(minutes=i))
+            for i in range(11)
+        ])
+        response = api_client.post(f'/api/conducteur/missions/{mission.id}/terminer/')
+        assert response.status_code == status.HTTP_200_OK
+        mission.refresh_from_db()
+        assert mission.distance_km == 150
+        assert response.data['odometre']['distance_km'] == pytest.approx(11.12, abs=0.01)
+
+    def test_terminer_without_points_keeps_planned_distance(self, api_client, mission):
+        mission.distance_km = 150
+        mission.save()
+        response = api_client.post(f'/api/conducteur/missions/{mission.id}/terminer/')
+        assert response.status_code == status.HTTP_200_OK
+        mission.refresh_from_db()
+        assert mission.distance_km == 150
+
+@pytest.mark.django_db
+class TestOdometreMission:
+    def test_points_update_running_totals(self, api_client, mission):
+        start = timezone.now()
+        for i in range(6):
+            response = api_client.post('/api/conducteur/gps/', {
+                'mission': mission.id,
+                'latitude': 5.0 + i * 0.01,
+                'longitude': -4.0,
+                'timestamp': (start + timedelta(minutes=i)).isoformat(),
+            }, format='json')
+            assert response.status_code == status.HTTP_201_CREATED
+
+        odometre = OdometreMission.objects.get(mission=mission)
+        assert odometre.nombre_points == 6
+        assert odometre.distance_km == pytest.approx(5.56, abs=0.01)
+        assert odometre.vitesse_max_kmh == pytest.approx(66.7, abs=0.1)
+        assert odometre.temps_mouvement_s == 300
+
+        response = api_client.get(f'/api/conducteur/missions/{mission.id}/')
+        assert response.data['odometre']['distance_km'] == pytest.approx(5.56, abs=0.01)
+
+    def test_initialised_from_existing_track(self, mission):
+        start = timezone.now()
+        PointGPS.objects.bulk_create([
+            PointGPS(mission=mission, latitude=5.0 + i * 0.01, longitude=-4.0,
+                     timestamp=start + timedelta(minutes=i))
+            for i in range(4)
+        ])
+        odometre = OdometreMission.mettre_a_jour(mission, [])
+        assert odometre.nombre_points == 4
+        assert odometre.distance_km == pytest.approx(3.34, abs=0.01)
+
+        # Un point arrivé en retard fait recalculer le cumul sur toute la trace
+        late = PointGPS.objects.create(mission=mission, latitude=4.99, longitude=-4.0,
+                                       timestamp=start - timedelta(minutes=1))
+        OdometreMission.mettre_a_jour(mission, [(late.latitude, late.longitude, late.timestamp)])
+        odometre.refresh_from_db()
+        assert odometre.nombre_points == 5
+        assert odometre.distance_km == pytest.approx(4.45, abs=0.01)
+        assert odometre.dernier_timestamp == start + timedelta(minutes=3)
+
+@pytest.mark.django_db
+class TestPointGPSBulk:
+    def test_bulk_upload_is_idempotent(self, api_client, mission):
+        start = timezone.now() - timedelta(minutes=10)
+        points = [
+            {'latitude': 5.0 + i * 0.01, 'longitude': -4.0,
+             'timestamp': (start + timedelta(minutes=i)).isoformat()}
+            for i in range(5)
+        ]
+        payload = {'mission': mission.id, 'points': points + [points[0]]}
+        response = api_client.post('/api/conducteur/gps/bulk/', payload, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['created'] == 5
+        assert response.data['duplicates'] == 1
+        assert OdometreMission.objects.get(mission=mission).nombre_points == 5
+
+        response = api_client.post('/api/conducteur/gps/bulk/', payload, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['created'] == 0
+        assert response.data['duplicates'] == 6
+        assert PointGPS.objects.filter(mission=mission).count() == 5
+
+    def test_bulk_counts_only_inserted_points(self, api_client, mission, monkeypatch):
+        start = timezone.now() - timedelta(minutes=10)
+        points = [
+            {'latitude': 5.0 + i * 0.01, 'longitude': -4.0,
+             'timestamp': (start + timedelta(minutes=i)).isoformat()}
+            for i in range(3)
+        ]
+        def atomic_after_concurrent_upload():
+            # Un autre envoi enregistre le premier point juste avant l'écriture du lot
+            PointGPS.objects.create(mission=mission, latitude=5.0, longitude=-4.0, timestamp=start)
+            return transaction.atomic()
+
+        monkeypatch.setattr('conducteur.views.transaction', SimpleNamespace(atomic=atomic_after_concurrent_upload))
+        response = api_client.post('/api/conducteur/gps/bulk/', {'mission': mission.id, 'points': points},
+                                   format='json')
+        assert response.data['created'] == 2
+        assert response.data['duplicates'] == 1
+        assert OdometreMission.objects.get(mission=mission).nombre_points == 3
+
+    def test_bulk_reports_item_errors(self, api_client, mission):
+        now = timezone.now().isoformat()
+        data = [
+            {'mission': mission.id, 'latitude': 5.0, 'longitude': -4.0, 'timestamp': now},
+            {'mission': mission.id, 'latitude': 95.0, 'longitude': -4.0, 'timestamp': now},
+            {'mission': 999999, 'latitude': 5.0, 'longitude': -4.0, 'timestamp': now},
+            {'mission': mission.id, 'latitude': 5.0, 'longitude': -4.0},
+        ]
+        response = api_client.post('/api/conducteur/gps/bulk/', data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['created'] == 1
+        assert [e['index'] for e in response.data['errors']] == [1, 2, 3]
@@ -1,16 +1,20 @@
 from django.shortcuts import render
-from rest_framework import viewsets, status
+from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from fleet.models import Mission
-from .models import PointGPS
-from .serializers import MissionSerializer, PointGPSSerializer
+from .models import PointGPS, OdometreMission
+from .serializers import MissionSerializer, PointGPSSerializer, PointGPSBulkItemSerializer
 from django.db.models import Q
-from math import radians, cos, sin, asin, sqrt
 from fleet.models import Affectation, Vehicle
 from fleet.serializers import VehicleSerializer
+from fleet.geo import track_payload
 from rest_framework.views import APIView
+from django.db import transaction
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Create your views here.
 
@@ -20,7 +24,7 @@ class MissionViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        queryset = Mission.objects.all()
+        queryset = Mission.objects.select_related('odometre', 'vehicle', 'driver__user_profile__user')
         statut = self.request.query_params.get('statut')
         conducteur_id = self.request.query_params.get('conducteur')
         if statut:
@@ -52,19 +56,27 @@ class MissionViewSet(viewsets.ModelViewSet):
         mission = self.get_object()
         if mission.statut not in ['acceptee', 'active']:
             return Response({'error': 'Mission non active.'}, status=400)
-        # Calcul de la distance totale
-        points = mission.points_gps.order_by('timestamp')
-        total = 0.0
-        last = None
-        for p in points:
-            if last:
-                total += haversine(last.latitude, last.longitude, p.latitude, p.longitude)
-            last = p
-        mission.distance_parcourue = round(total, 2)
+        # La distance mesurée reste sur l'odomètre (initialisé depuis la trace
+        # s'il n'existe pas) ; la distance prévue par l'administrateur n'est
+        # renseignée avec la mesure que si elle est vide
+        odometre = OdometreMission.mettre_a_jour(mission, [])
+        if not mission.distance_km and odometre.distance_km > 0:
+            mission.distance_km = round(odometre.distance_km, 2)
         mission.statut = 'terminee'
         mission.save()
         return Response(self.get_serializer(mission).data)
 
+    @action(detail=True, methods=['get'])
+    def trace(self, request, pk=None):
+        mission = self.get_object()
+        points = list(mission.points_gps.order_by('timestamp').values_list('latitude', 'longitude', 'timestamp'))
+        try:
+            payload = track_payload(points, request.query_params, serializers.DateTimeField())
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        payload['mission'] = mission.id
+        return Response(payload)
+
     @action(detail=False, methods=['get'])
     def historique(self, request):
         missions = self.get_queryset().filter(statut='terminee')
@@ -76,16 +88,114 @@ class PointGPSViewSet(viewsets.ModelViewSet):
     serializer_class = PointGPSSerializer
     permission_classes = [IsAuthenticated]
 
+    max_bulk_items = 5000
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
-        try:
-            serializer.is_valid(raise_exception=True)
-        except Exception as e:
-            print("[ERROR] PointGPS serializer errors:", serializer.errors)
+        if not serializer.is_valid():
+            logger.warning("PointGPS rejeté: %s", serializer.errors)
             return Response(serializer.errors, status=400)
         self.perform_create(serializer)
+        point = serializer.instance
+        OdometreMission.mettre_a_jour(point.mission, [(point.latitude, point.longitude, point.timestamp)])
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Envoi groupé et rejouable de points GPS (par exemple après une perte de réseau).
+
+        Corps accepté : une liste de points, ou {"mission": <id>, "points": [...]}.
+        Un point déjà reçu (même mission et même horodatage) est compté dans
+        "duplicates" sans erreur ; les points invalides sont listés dans "errors".
+        """
+        data = request.data
+        default_mission = None
+        if isinstance(data, dict):
+            default_mission = data.get('mission')
+            data = data.get('points')
+        if not isinstance(data, list) or not data:
+            return Response({'error': 'Une liste de points est requise'}, status=400)
+        if len(data) > self.max_bulk_items:
+            return Response({'error': f'Maximum {self.max_bulk_items} points par lot'}, status=400)
+
+        errors = []
+        valid = []
+        for index, item in enumerate(data):
+            if not isinstance(item, dict):
+                errors.append({'index': index, 'errors': {'non_field_errors': ['Objet attendu']}})
+                continue
+            item_serializer = PointGPSBulkItemSerializer(data=item)
+            if not item_serializer.is_valid():
+                errors.append({'index': index, 'errors': item_serializer.errors})
+                continue
+            attrs = item_serializer.validated_data
+            attrs.setdefault('mission_id', default_mission)
+            if attrs['mission_id'] is None:
+                errors.append({'index': index, 'errors': {'mission': ['Ce champ est obligatoire.']}})
+                continue
+            if 'timestamp' not in attrs:
+                errors.append({'index': index, 'errors': {'timestamp': ['Ce champ est obligatoire.']}})
+                continue
+            valid.append((index, attrs))
+
+        missions = Mission.objects.in_bulk({attrs['mission_id'] for _, attrs in valid})
+
+        duplicates = 0
+        candidates = {}
+        for index, attrs in valid:
+            key = (attrs['mission_id'], attrs['timestamp'])
+            if attrs['mission_id'] not in missions:
+                errors.append({'index': index, 'errors': {'mission': ['Mission introuvable.']}})
+            elif key in candidates:
+                duplicates += 1
+            else:
+                candidates[key] = PointGPS(**attrs)
+
+        new_points = {}
+        if candidates:
+            with transaction.atomic():
+                # Les envois d'une même mission sont sérialisés par le verrou : les
+                # horodatages relus ensuite sont exactement ceux que l'insertion ignorerait
+                mission_ids = {mission_id for mission_id, _ in candidates}
+                list(Mission.objects.select_for_update().filter(pk__in=mission_ids).values_list('pk', flat=True))
+                existing = self._existing_timestamps(candidates)
+                new_points = {key: point for key, point in candidates.items() if key not in existing}
+                duplicates += len(candidates) - len(new_points)
+                PointGPS.objects.bulk_create(new_points.values(), batch_size=500, ignore_conflicts=True)
+            by_mission = {}
+            for point in new_points.values():
+                by_mission.setdefault(point.mission_id, []).append(
+                    (point.latitude, point.longitude, point.timestamp)
+                )
+            for mission_id, points in by_mission.items():
+                OdometreMission.mettre_a_jour(missions[mission_id], points)
+
+        errors.sort(key=lambda e: e['index'])
+        payload = {
+            'created': len(new_points),
+            'duplicates': duplicates,
+            'rejected': len(errors),
+            'errors': errors,
+        }
+        if new_points:
+            return Response(payload, status=status.HTTP_201_CREATED)
+        if duplicates:
+            return Response(payload, status=status.HTTP_200_OK)
+        return Response(payload, status=400)
+
+    @staticmethod
+    def _existing_timestamps(points):
+        """Clés (mission, horodatage) déjà enregistrées parmi ``points``, lues sur la plage couverte par mission."""
+        bounds = {}
+        for mission_id, timestamp in points:
+            low, high = bounds.get(mission_id, (timestamp, timestamp))
+            bounds[mission_id] = (min(low, timestamp), max(high, timestamp))
+        ranges = Q()
+        for mission_id, (low, high) in bounds.items():
+            ranges |= Q(mission_id=mission_id, timestamp__range=(low, high))
+        return set(PointGPS.objects.filter(ranges).values_list('mission_id', 'timestamp'))
+
 class VehiculesAffectesView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -99,13 +209,3 @@ class VehiculesAffectesView(APIView):
         vehicules = [a.vehicle for a in affectations]
         serializer = VehicleSerializer(vehicules, many=True)
         return Response(serializer.data)
-
-# Utilitaire pour calculer la distance entre deux points GPS (en km)
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371  # Rayon de la Terre en km
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    return R * c
@@ -121,7 +121,9 @@ AUTH_PASSWORD_VALIDATORS = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    # Pagination par curseur, seulement si ?cursor= ou ?page_size= est fourni
+    'DEFAULT_PAGINATION_CLASS': 'fleet.pagination.ApiCursorPagination',
 }
 
 # Internationalization
@@ -167,3 +169,64 @@ CHANNEL_LAYERS = {
         'CONFIG': {"hosts": [('127.0.0.1', 6379)]},
     },
 }
+
+# Écriture différée des positions reçues par WebSocket (VehicleConsumer)
+VEHICLE_POSITION_BUFFER_SIZE = 50
+VEHICLE_POSITION_FLUSH_INTERVAL = 2  # secondes
+# Nombre maximal d'envois par seconde sur ws/fleet/ (positions fusionnées entre deux envois)
+FLEET_LIVE_MAX_RATE = 1
+
+# Filtre d'ingestion des positions : une position est écartée si elle reste à moins de
+# POSITION_FILTER_MIN_DISTANCE_M mètres et POSITION_FILTER_MIN_HEADING_CHANGE degrés de cap
+# de la dernière enregistrée, et moins de POSITION_FILTER_MAX_INTERVAL secondes après elle
+POSITION_FILTER_MIN_DISTANCE_M = 10
+POSITION_FILTER_MIN_HEADING_CHANGE = 30
+POSITION_FILTER_MAX_INTERVAL = 300
+
+# Durée de vie (secondes) de l'instantané de dashboard_stats, invalidé aussi à chaque écriture
+DASHBOARD_STATS_CACHE_TTL = 60
+
+# Cache Django : mémoire locale par défaut ; CACHE_REDIS_URL (ex. redis://127.0.0.1:6379/1)
+# le partage entre processus via le Redis déjà utilisé par Channels. Obligatoire dès que
+# run_alerts ou rebuild_daily_stats tournent à côté du serveur : leurs invalidations
+# n'atteignent pas un cache local (ces commandes l'indiquent au démarrage)
+if os.environ.get('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CACHE_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Durée de vie (secondes) des réponses de fleet.response_cache, invalidées aussi par les signaux
+RESPONSE_CACHE_TTL = 300
+
+# Lots de rapports financiers (fleet.reports) : exécution dans un thread après la création
+# par l'API, paquets de REPORT_BATCH_CHUNK_SIZE véhicules, REPORT_BATCH_WORKERS processus
+# de calcul au-delà d'un paquet (1 : tout dans le processus courant)
+REPORT_BATCH_ASYNC = True
+REPORT_BATCH_CHUNK_SIZE = 200
+REPORT_BATCH_WORKERS = 1
+# Un lot en cours sans paquet enregistré depuis REPORT_BATCH_STALE_AFTER secondes est considéré
+# abandonné (redémarrage du serveur) et remis en attente par generate_reports --pending ; la
+# durée doit dépasser le calcul d'un paquet de REPORT_BATCH_CHUNK_SIZE véhicules
+REPORT_BATCH_STALE_AFTER = 3600
+
+# Exports CSV/XLSX en flux (fleet.exports) : lignes lues par paquets de EXPORT_CHUNK_SIZE
+EXPORT_CHUNK_SIZE = 2000
+
+# Disponibilités (fleet.availability) : fenêtres par appel de /api/availability/<ressource>s/
+# et horizon maximal (jours) des créneaux libres
+AVAILABILITY_MAX_WINDOWS = 50
+AVAILABILITY_MAX_DAYS = 90
+
+# Statistiques de consommation (/api/fuel-logs/consumption_stats/) : durée maximale (jours)
+# et nombre maximal des périodes ?days= d'un appel, une requête d'agrégat par période
+FUEL_STATS_MAX_DAYS = 3650
+FUEL_STATS_MAX_PERIODS = 10
@@ -0,0 +1,177 @@
+# fleet/alerts.py
+
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .live import publish_alerts
+from .response_cache import invalidate_cached_responses
+from .models import DASHBOARD_STATS_CACHE_KEY, Alert, DocumentAdministratif, Driver, Vehicle, bump_table_version
+from .serializers import AlertSerializer
+
+# Une échéance génère une alerte dans les ALERT_WINDOW_DAYS jours qui la précèdent,
+# critique dans les CRITICAL_DAYS derniers jours ou une fois dépassée
+ALERT_WINDOW_DAYS = 30
+CRITICAL_DAYS = 7
+
+VEHICLE_ALERT_TYPES = ('assurance', 'controle_technique')
+
+
+def _niveau(expiration, today):
+    return 'warning' if (expiration - today).days > CRITICAL_DAYS else 'critique'
+
+
+def _key(type_alerte, vehicle_id=None, driver_id=None, document_id=None):
+    return type_alerte, vehicle_id, driver_id, document_id
+
+
+def desired_alerts(today, vehicles=None, drivers=None, documents=None):
+    """
+    Alertes d'échéance attendues, indexées par (type, vehicle_id, driver_id, document_id).
+
+    ``vehicles``, ``drivers`` et ``documents`` limitent l'évaluation à ces
+    identifiants ; None signifie tous, une liste vide aucun. Une requête par
+    règle, filtrée sur la date d'échéance.
+    """
+    limit = today + timedelta(days=ALERT_WINDOW_DAYS)
+    desired = {}
+
+    if vehicles is None or vehicles:
+        queryset = Vehicle.objects.filter(
+            Q(assurance_expiration__lte=limit) | Q(visite_technique__lte=limit)
+        ).only('id', 'marque', 'modele', 'immatriculation', 'assurance_expiration', 'visite_technique')
+        if vehicles is not None:
+            queryset = queryset.filter(id__in=vehicles)
+        for vehicle in queryset:
+            if vehicle.assurance_expiration and vehicle.assurance_expiration <= limit:
+                desired[_key('assurance', vehicle.id)] = {
+                    'message': f"L'assurance du véhicule {vehicle} expire le {vehicle.assurance_expiration}",
+                    'niveau': _niveau(vehicle.assurance_expiration, today),
+                }
+            if vehicle.visite_technique and vehicle.visite_technique <= limit:
+                desired[_key('controle_technique', vehicle.id)] = {
+                    'message': f"La visite technique du véhicule {vehicle} expire le {vehicle.visite_technique}",
+                    'niveau': _niveau(vehicle.visite_technique, today),
+                }
+
+    if drivers is None or drivers:
+        queryset = Driver.objects.filter(
+            statut='actif', date_expiration_permis__lte=limit
+        ).select_related('user_profile__user')
+        if drivers is not None:
+            queryset = queryset.filter(id__in=drivers)
+        for driver in queryset:
+            user = driver.user_profile.user
+            full_name = user.get_full_name() or user.username
+            desired[_key('permis', driver_id=driver.id)] = {
+                'message': f"Le permis de conduire de {full_name} expire le {driver.date_expiration_permis}",
+                'niveau': _niveau(driver.date_expiration_permis, today),
+            }
+
+    if documents is None or documents:
+        queryset = DocumentAdministratif.objects.filter(date_expiration__lte=limit).select_related('vehicle')
+        if documents is not None:
+            queryset = queryset.filter(id__in=documents)
+        for doc in queryset:
+            desired[_key(doc.type_document, doc.vehicle_id, document_id=doc.id)] = {
+                'message': f"Le document {doc.type_document} du véhicule {doc.vehicle} expire le {doc.date_expiration}",
+                'niveau': _niveau(doc.date_expiration, today),
+            }
+
+    return desired
+
+
+def _managed_alerts(vehicles=None, drivers=None, documents=None):
+    """Alertes non résolues produites par les règles d'échéance, dans le même périmètre."""
+    vehicle_rule = Q(type_alerte__in=VEHICLE_ALERT_TYPES, vehicle__isnull=False,
+                     driver__isnull=True, document__isnull=True)
+    driver_rule = Q(type_alerte='permis', driver__isnull=False)
+    document_rule = Q(document__isnull=False)
+    scope = Q(pk__in=[])
+    for rule, field, ids in (
+        (vehicle_rule, 'vehicle_id', vehicles),
+        (driver_rule, 'driver_id', drivers),
+        (document_rule, 'document_id', documents),
+    ):
+        if ids is None:
+            scope |= rule
+        elif ids:
+            scope |= rule & Q(**{f'{field}__in': ids})
+    return Alert.objects.filter(scope, resolue=False)
+
+
+def evaluate_alerts(today=None, vehicles=None, drivers=None, documents=None):
+    """
+    Synchronise les alertes d'échéance avec l'état des véhicules, conducteurs et documents.
+
+    Les alertes existantes sont conservées (même id, même code) et mises à jour
+    si leur message ou leur niveau change ; les nouvelles sont insérées en un
+    bulk_create et celles qui ne s'appliquent plus sont marquées résolues.
+    Retourne un dict avec les listes 'created', 'updated' et 'escalated' (passées
+    au niveau critique) et le nombre 'resolved'.
+    """
+    today = today or timezone.localdate()
+    desired = desired_alerts(today, vehicles, drivers, documents)
+
+    existing = {}
+    duplicates = []
+    for alert in _managed_alerts(vehicles, drivers, documents).order_by('date_alerte', 'id'):
+        key = _key(alert.type_alerte, alert.vehicle_id, alert.driver_id, alert.document_id)
+        if key in existing:
+            duplicates.append(alert.id)
+        else:
+            existing[key] = alert
+
+    to_create = []
+    to_update = []
+    escalated = []
+    for key, values in desired.items():
+        alert = existing.pop(key, None)
+        if alert is None:
+            type_alerte, vehicle_id, driver_id, document_id = key
+            to_create.append(Alert(
+                type_alerte=type_alerte,
+                vehicle_id=vehicle_id,
+                driver_id=driver_id,
+                document_id=document_id,
+                **values
+            ))
+        elif alert.message != values['message'] or alert.niveau != values['niveau']:
+            if values['niveau'] == 'critique' and alert.niveau != 'critique':
+                escalated.append(alert)
+            alert.message = values['message']
+            alert.niveau = values['niveau']
+            to_update.append(alert)
+    to_resolve = [alert.id for alert in existing.values()] + duplicates
+
+    with transaction.atomic():
+        Alert.objects.bulk_create(to_create, batch_size=500)
+        Alert.objects.bulk_update(to_update, ['message', 'niveau'], batch_size=500)
+        resolved = Alert.objects.filter(id__in=to_resolve).update(resolue=True) if to_resolve else 0
+        if to_create or to_update or resolved:
+            # Les écritures groupées ne déclenchent pas les signaux d'invalidation
+            bump_table_version(Alert)
+            invalidate_cached_responses(Alert)
+            cache.delete(DASHBOARD_STATS_CACHE_KEY)
+
+    return {'created': to_create, 'updated': to_update, 'escalated': escalated, 'resolved': resolved}
+
+
+def notify_critical(result):
+    """Pousse sur Channels les alertes créées critiques ou passées au niveau critique."""
+    ids = [alert.id for alert in result['created'] if alert.niveau == 'critique']
+    ids += [alert.id for alert in result['escalated']]
+    if not ids:
+        return
+    alerts = Alert.objects.filter(id__in=ids).select_related('vehicle', 'driver__user_profile__user')
+    publish_alerts(AlertSerializer(alerts, many=True).data)
+
+
+def evaluate_and_notify(**scope):
+    """Évaluation (éventuellement limitée) suivie de la notification des alertes critiques."""
+    result = evaluate_alerts(**scope)
+    notify_critical(result)
+    return result
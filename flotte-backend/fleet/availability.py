@@ -0,0 +1,148 @@
+# fleet/availability.py
+
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db.models import BooleanField, CharField, DateTimeField, Exists, ExpressionWrapper, F, OuterRef, Q, Value
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from affectations.models import Affectation as Planification
+from .models import Affectation, Driver, Mission, Vehicle
+
+RESOURCE_MODELS = {'vehicle': Vehicle, 'driver': Driver}
+
+# Champ désignant la ressource dans chaque source de réservation :
+# missions, affectations (fleet, à la journée) et planning (app affectations)
+RESOURCE_FIELDS = {
+    'vehicle': {'mission': 'vehicle', 'affectation': 'vehicle', 'planning': 'vehicule'},
+    'driver': {'mission': 'driver', 'affectation': 'driver', 'planning': 'conducteur'},
+}
+
+
+def _last_day(date_fin):
+    # Dernier jour touché par une fenêtre dont la fin est exclue
+    return timezone.localdate(date_fin - timedelta(microseconds=1))
+
+
+def _sources(date_debut, date_fin):
+    """
+    (nom, modèle, filtre) des réservations qui chevauchent [date_debut, date_fin[.
+
+    Une mission sans date d'arrivée occupe la ressource sans limite tant
+    qu'elle n'est pas terminée ; une mission refusée n'occupe rien. Les
+    affectations de fleet couvrent leurs journées de début et de fin
+    (sans fin : sans limite) ; seules les affectations actives comptent,
+    comme les créneaux actifs ou planifiés du planning.
+    """
+    return [
+        ('mission', Mission, ~Q(statut='refusee') & Q(date_depart__lt=date_fin) & (
+            Q(date_arrivee__gt=date_debut) | (Q(date_arrivee__isnull=True) & ~Q(statut='terminee'))
+        )),
+        ('affectation', Affectation, Q(statut='actif', date_debut__lte=_last_day(date_fin)) & (
+            Q(date_fin__gte=timezone.localdate(date_debut)) | Q(date_fin__isnull=True)
+        )),
+        ('planning', Planification, Q(statut__in=('active', 'planifiee'), date_debut__lt=date_fin,
+                                      date_fin__gt=date_debut)),
+    ]
+
+
+def _busy(kind, date_debut, date_fin):
+    fields = RESOURCE_FIELDS[kind]
+    return [
+        Exists(model.objects.order_by().filter(condition, **{fields[name]: OuterRef('pk')}))
+        for name, model, condition in _sources(date_debut, date_fin)
+    ]
+
+
+def free_resources(kind, date_debut, date_fin, queryset=None):
+    """
+    Véhicules ou conducteurs (``kind``) libres sur toute la fenêtre : une
+    requête, NOT EXISTS par source sur les index (ressource, début, fin).
+    """
+    if queryset is None:
+        queryset = RESOURCE_MODELS[kind].objects.all()
+    for busy in _busy(kind, date_debut, date_fin):
+        queryset = queryset.filter(~busy)
+    return queryset
+
+
+def free_in_windows(kind, windows, queryset=None):
+    """
+    Ressources libres pour chacune des fenêtres (date_debut, date_fin), en une
+    seule requête (une colonne booléenne par fenêtre). Retourne une liste
+    d'ensembles d'identifiants, dans l'ordre des fenêtres.
+    """
+    if queryset is None:
+        queryset = RESOURCE_MODELS[kind].objects.all()
+    columns = {}
+    for index, (date_debut, date_fin) in enumerate(windows):
+        condition = Q()
+        for busy in _busy(kind, date_debut, date_fin):
+            condition |= Q(busy)
+        columns[f'occupe_{index}'] = ExpressionWrapper(condition, output_field=BooleanField())
+    libres = [set() for _ in windows]
+    for pk, *occupe in queryset.order_by('pk').annotate(**columns).values_list('pk', *columns):
+        for index, busy in enumerate(occupe):
+            if not busy:
+                libres[index].add(pk)
+    return libres
+
+
+def bookings(kind, resource_id, date_debut, date_fin):
+    """
+    Réservations (source, début, fin) d'une ressource qui chevauchent la
+    fenêtre, toutes sources confondues, en une requête UNION ALL. La fin vaut
+    None pour une réservation sans limite.
+    """
+    fields = RESOURCE_FIELDS[kind]
+    parts = []
+    for name, model, condition in _sources(date_debut, date_fin):
+        debut, fin = ('date_depart', 'date_arrivee') if model is Mission else ('date_debut', 'date_fin')
+        if model is Affectation:
+            start, end = Cast(debut, DateTimeField()), Cast(fin, DateTimeField())
+        else:
+            start, end = F(debut), F(fin)
+        parts.append(
+            model.objects.order_by().filter(condition, **{fields[name]: resource_id}).annotate(
+                source=Value(name, output_field=CharField()), debut=start, fin=end,
+            ).values_list('source', 'debut', 'fin')
+        )
+    rows = parts[0].union(*parts[1:], all=True)
+
+    result = []
+    for source, debut, fin in rows:
+        if source == 'affectation':
+            # Journées entières, à minuit heure locale
+            debut = _day_start(debut.astimezone(dt_timezone.utc).date())
+            if fin is not None:
+                fin = _day_start(fin.astimezone(dt_timezone.utc).date() + timedelta(days=1))
+        result.append((source, debut, fin))
+    return sorted(result, key=lambda booking: booking[1])
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def free_slots(kind, resource_id, date_debut, date_fin, duree_min=None, reservations=None):
+    """
+    Créneaux libres [début, fin[ d'une ressource dans la fenêtre, complément
+    des réservations fusionnées ; ``duree_min`` (timedelta) écarte les
+    créneaux trop courts. ``reservations`` évite de relire bookings().
+    """
+    if reservations is None:
+        reservations = bookings(kind, resource_id, date_debut, date_fin)
+    slots = []
+    cursor = date_debut
+    for _, debut, fin in reservations:
+        fin = date_fin if fin is None else min(fin, date_fin)
+        if debut > cursor:
+            slots.append((cursor, debut))
+        cursor = max(cursor, fin)
+        if cursor >= date_fin:
+            break
+    if cursor < date_fin:
+        slots.append((cursor, date_fin))
+    if duree_min:
+        slots = [(debut, fin) for debut, fin in slots if fin - debut >= duree_min]
+    return slots
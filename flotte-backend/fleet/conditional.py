@@ -0,0 +1,79 @@
+# fleet/conditional.py
+
+import hashlib
+
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework import serializers
+
+from .models import TableVersion
+
+
+def serializer_models(serializer):
+    """Modèles lus par un sérialiseur et ses sérialiseurs imbriqués."""
+    found = {serializer.Meta.model}
+    for field in serializer.fields.values():
+        if isinstance(field, serializers.ListSerializer):
+            field = field.child
+        if isinstance(field, serializers.ModelSerializer):
+            found |= serializer_models(field)
+    return found
+
+
+class ConditionalGetMixin:
+    """
+    GET conditionnels (If-None-Match, If-Modified-Since) sur list et retrieve.
+
+    L'ETag combine l'utilisateur, l'URL complète, le format et la version
+    (TableVersion) de chaque table lue par le sérialiseur ; Last-Modified est
+    la date de la dernière écriture sur ces tables. Une requête dont l'ETag
+    n'a pas changé reçoit un 304 après une seule requête SQL, sans
+    sérialisation. ``version_models`` ajoute les tables lues autrement que
+    par des sérialiseurs imbriqués (__str__, SerializerMethodField).
+    """
+    version_models = ()
+    _version_tables = {}
+
+    def get_version_tables(self):
+        cls = type(self)
+        if cls not in ConditionalGetMixin._version_tables:
+            found = serializer_models(self.get_serializer_class()())
+            found |= {self.get_queryset().model, *self.version_models}
+            ConditionalGetMixin._version_tables[cls] = sorted(model._meta.label_lower for model in found)
+        return ConditionalGetMixin._version_tables[cls]
+
+    def get_validators(self, request):
+        tables = self.get_version_tables()
+        rows = dict.fromkeys(tables, (0, None))
+        rows.update({
+            table: (version, updated_at)
+            for table, version, updated_at in TableVersion.objects.filter(table__in=tables).values_list(
+                'table', 'version', 'updated_at'
+            )
+        })
+        accepted = getattr(request, 'accepted_renderer', None)
+        key = '|'.join([
+            str(request.user.pk), request.get_full_path(), accepted.format if accepted else '',
+            *(f'{table}:{version}' for table, (version, _) in rows.items()),
+        ])
+        etag = quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+        dates = [updated_at for _, updated_at in rows.values() if updated_at is not None]
+        last_modified = int(max(dates).timestamp()) if dates else None
+        return etag, last_modified
+
+    def conditional(self, request, handler, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(request, super().retrieve, *args, **kwargs)
@@ -1,12 +1,102 @@
+import asyncio
 import json
+import logging
+import math
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from .models import VehiclePosition, Vehicle
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .geo import parse_bbox, in_bbox
+from .tracking import is_significant
+from .live import FLEET_GROUP, ALERTS_GROUP, fleet_message, vehicle_update, driver_update
+from .models import VehiclePosition, Vehicle, DriverLastPosition
+
+logger = logging.getLogger(__name__)
+
+# Bornes des champs facultatifs d'une position WebSocket : vitesse et cap
+# tiennent dans un DecimalField(5, 2), la batterie est un pourcentage
+POSITION_FIELD_BOUNDS = {
+    'speed': (0, 999.99),
+    'heading': (0, 360),
+    'battery_level': (0, 100),
+}
+
+
+def clean_position(data):
+    """
+    Position reçue d'un véhicule, nettoyée avant diffusion et enregistrement.
+
+    Latitude et longitude sont obligatoires (ValueError sinon) ; vitesse, cap
+    et batterie hors bornes ou non numériques sont remplacés par None pour
+    qu'une valeur aberrante ne fasse pas échouer l'écriture du tampon.
+    """
+    try:
+        latitude, longitude = float(data['latitude']), float(data['longitude'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('latitude et longitude numériques requises')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('coordonnées hors limites')
+    cleaned = {**data, 'latitude': latitude, 'longitude': longitude}
+    for name, (low, high) in POSITION_FIELD_BOUNDS.items():
+        value = data.get(name)
+        try:
+            value = None if value is None or isinstance(value, bool) else round(float(value), 2)
+        except (TypeError, ValueError):
+            value = None
+        if value is not None and not (math.isfinite(value) and low <= value <= high):
+            value = None
+        if name == 'battery_level' and value is not None:
+            value = round(value)
+        cleaned[name] = value
+    return cleaned
+
+
+@database_sync_to_async
+def authenticate(scope, token):
+    """Utilisateur de la session, ou à défaut du jeton JWT passé en paramètre ?token=."""
+    user = scope.get('user')
+    if user is not None and user.is_authenticated:
+        return user
+    if not token:
+        return None
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
 
 class VehicleConsumer(AsyncWebsocketConsumer):
+    """
+    Positions temps réel d'un véhicule.
+
+    Chaque position est diffusée immédiatement au groupe, puis placée dans un
+    tampon écrit en base par bulk_create dès qu'il atteint
+    VEHICLE_POSITION_BUFFER_SIZE positions ou toutes les
+    VEHICLE_POSITION_FLUSH_INTERVAL secondes, et à la déconnexion. Les positions
+    non significatives par rapport à la dernière enregistrée (voir
+    fleet.tracking.is_significant) sont diffusées mais pas enregistrées.
+    """
+
     async def connect(self):
         self.vehicle_id = self.scope['url_route']['kwargs']['vehicle_id']
         self.room_group_name = f'vehicle_{self.vehicle_id}'
+        self.buffer = []
+        self.flush_task = None
+        self.buffer_size = getattr(settings, 'VEHICLE_POSITION_BUFFER_SIZE', 50)
+        self.flush_interval = getattr(settings, 'VEHICLE_POSITION_FLUSH_INTERVAL', 2)
+
+        # Le véhicule n'est recherché qu'une fois par connexion
+        self.vehicle = await self.get_vehicle()
+        if self.vehicle is None:
+            await self.close()
+            return
+        self.last_stored = await self.get_last_stored()
+        self.stationary_since = None
 
         # Rejoindre le groupe de la salle
         await self.channel_layer.group_add(
@@ -15,8 +105,13 @@ class VehicleConsumer(AsyncWebsocketConsumer):
         )
 
         await self.accept()
+        self.flush_task = asyncio.create_task(self.periodic_flush())
 
     async def disconnect(self, close_code):
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+        await self.flush()
+
         # Quitter le groupe de la salle
         await self.channel_layer.group_discard(
             self.room_group_name,
@@ -24,12 +119,22 @@ class VehicleConsumer(AsyncWebsocketConsumer):
         )
 
     async def receive(self, text_data):
-        data = json.loads(text_data)
-        
-        # Sauvegarder la position du véhicule
-        await self.save_vehicle_position(data)
+        try:
+            data = clean_position(json.loads(text_data))
+        except ValueError as e:
+            await self.send(text_data=json.dumps({'type': 'error', 'error': str(e)}))
+            return
+        received_at = timezone.now()
+        latitude, longitude = data['latitude'], data['longitude']
+        heading = data['heading']
+        significant = is_significant(self.last_stored, latitude, longitude, received_at, heading)
+        if significant:
+            self.last_stored = (latitude, longitude, received_at, heading)
+            self.stationary_since = None
+        elif self.stationary_since is None:
+            self.stationary_since = self.last_stored[2]
 
-        # Envoyer la position à tous les clients connectés
+        # Envoyer la position à tous les clients connectés sans attendre la base
         await self.channel_layer.group_send(
             self.room_group_name,
             {
@@ -37,20 +142,192 @@ class VehicleConsumer(AsyncWebsocketConsumer):
                 'position': data
             }
         )
+        await self.channel_layer.group_send(
+            FLEET_GROUP,
+            fleet_message([vehicle_update(self.vehicle.id, data, received_at, self.stationary_since)])
+        )
+
+        if not significant:
+            return
+        self.buffer.append(VehiclePosition(
+            vehicle_id=self.vehicle.id,
+            latitude=latitude,
+            longitude=longitude,
+            timestamp=received_at,
+            speed=data['speed'],
+            heading=heading,
+            battery_level=data['battery_level'],
+            is_online=True
+        ))
+        if len(self.buffer) >= self.buffer_size:
+            await self.flush()
 
     async def vehicle_position(self, event):
         # Envoyer la position au WebSocket
         await self.send(text_data=json.dumps(event['position']))
 
+    async def periodic_flush(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        positions, self.buffer = self.buffer, []
+        try:
+            await self.save_vehicle_positions(positions)
+        except Exception:
+            logger.exception("Échec de l'enregistrement de %d positions du véhicule %s",
+                             len(positions), self.vehicle_id)
+
     @database_sync_to_async
-    def save_vehicle_position(self, data):
-        vehicle = Vehicle.objects.get(id=self.vehicle_id)
-        VehiclePosition.objects.create(
-            vehicle=vehicle,
-            latitude=data['latitude'],
-            longitude=data['longitude'],
-            speed=data.get('speed'),
-            heading=data.get('heading'),
-            battery_level=data.get('battery_level'),
-            is_online=True
-        )
\ No newline at end of file
+    def get_vehicle(self):
+        try:
+            return Vehicle.objects.filter(id=self.vehicle_id).first()
+        except ValueError:
+            return None
+
+    @database_sync_to_async
+    def get_last_stored(self):
+        return VehiclePosition.objects.filter(vehicle_id=self.vehicle.id).order_by('-timestamp').values_list(
+            'latitude', 'longitude', 'timestamp', 'heading'
+        ).first()
+
+    @database_sync_to_async
+    def save_vehicle_positions(self, positions):
+        try:
+            with transaction.atomic():
+                VehiclePosition.objects.bulk_create(positions)
+            return
+        except Exception:
+            logger.warning("Échec de l'écriture groupée de %d positions du véhicule %s, reprise ligne à ligne",
+                           len(positions), self.vehicle_id, exc_info=True)
+        # Une ligne en erreur ne doit pas faire perdre le reste du tampon
+        for position in positions:
+            position.pk = None
+            try:
+                with transaction.atomic():
+                    VehiclePosition.objects.bulk_create([position])
+            except Exception:
+                logger.exception('Position ignorée du véhicule %s : %s', self.vehicle_id, position.timestamp)
+
+
+class FleetConsumer(AsyncWebsocketConsumer):
+    """
+    Positions de toute la flotte sur un seul WebSocket (ws/fleet/).
+
+    Paramètres de connexion : token (JWT, à défaut de session), bbox
+    (min_lon,min_lat,max_lon,max_lat) et rate (envois par seconde, plafonné
+    par FLEET_LIVE_MAX_RATE). Les positions reçues entre deux envois sont
+    fusionnées : seule la dernière de chaque conducteur ou véhicule part.
+    Le client peut changer d'emprise en envoyant {"bbox": "..."} ou
+    {"bbox": null}.
+    """
+
+    async def connect(self):
+        self.pending = {}
+        self.send_task = None
+        params = parse_qs(self.scope.get('query_string', b'').decode())
+
+        self.user = await authenticate(self.scope, params.get('token', [None])[0])
+        if self.user is None:
+            await self.close()
+            return
+        try:
+            self.bbox = parse_bbox(params['bbox'][0]) if params.get('bbox') else None
+            self.send_interval = self.get_send_interval(params.get('rate', [None])[0])
+        except ValueError:
+            await self.close()
+            return
+
+        await self.channel_layer.group_add(FLEET_GROUP, self.channel_name)
+        await self.accept()
+        await self.send_snapshot()
+        self.send_task = asyncio.create_task(self.send_loop())
+
+    async def disconnect(self, close_code):
+        if self.send_task is not None:
+            self.send_task.cancel()
+        await self.channel_layer.group_discard(FLEET_GROUP, self.channel_name)
+
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+            if not isinstance(data, dict):
+                raise ValueError('Objet JSON attendu')
+            if 'bbox' not in data:
+                return
+            self.bbox = parse_bbox(data['bbox']) if data['bbox'] else None
+        except (ValueError, TypeError, AttributeError) as e:
+            # Message invalide : le client est prévenu sans que le WebSocket soit fermé
+            await self.send(text_data=json.dumps({'type': 'error', 'error': str(e)}))
+            return
+        self.pending = {}
+        await self.send_snapshot()
+
+    async def fleet_positions(self, event):
+        # Fusion : la position la plus récente de chaque objet remplace la précédente
+        for update in event['positions']:
+            if self.bbox is not None and (
+                update['latitude'] is None or update['longitude'] is None
+                or not in_bbox(self.bbox, float(update['latitude']), float(update['longitude']))
+            ):
+                continue
+            self.pending[(update['kind'], update['id'])] = update
+
+    async def send_loop(self):
+        while True:
+            await asyncio.sleep(self.send_interval)
+            if self.pending:
+                updates, self.pending = list(self.pending.values()), {}
+                await self.send(text_data=json.dumps({'type': 'positions', 'positions': updates}))
+
+    async def send_snapshot(self):
+        positions = await self.get_snapshot()
+        await self.send(text_data=json.dumps({'type': 'snapshot', 'positions': positions}))
+
+    def get_send_interval(self, rate):
+        max_rate = getattr(settings, 'FLEET_LIVE_MAX_RATE', 1)
+        rate = float(rate) if rate else max_rate
+        if rate <= 0:
+            raise ValueError('rate doit être positif')
+        return 1 / min(rate, max_rate)
+
+    @database_sync_to_async
+    def get_snapshot(self):
+        queryset = DriverLastPosition.objects.all()
+        if self.bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = self.bbox
+            queryset = queryset.filter(
+                longitude__gte=min_lon, longitude__lte=max_lon,
+                latitude__gte=min_lat, latitude__lte=max_lat,
+            )
+        return [
+            driver_update(driver_id, latitude, longitude, timestamp)
+            for driver_id, latitude, longitude, timestamp in queryset.values_list(
+                'driver_id', 'latitude', 'longitude', 'timestamp'
+            )
+        ]
+
+
+class AlertConsumer(AsyncWebsocketConsumer):
+    """
+    Notifications des nouvelles alertes critiques (ws/alerts/?token=...),
+    poussées par fleet.alerts.notify_critical.
+    """
+
+    async def connect(self):
+        params = parse_qs(self.scope.get('query_string', b'').decode())
+        self.user = await authenticate(self.scope, params.get('token', [None])[0])
+        if self.user is None:
+            await self.close()
+            return
+        await self.channel_layer.group_add(ALERTS_GROUP, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        await self.channel_layer.group_discard(ALERTS_GROUP, self.channel_name)
+
+    async def alerts_new(self, event):
+        await self.send(text_data=json.dumps({'type': 'alerts', 'alerts': event['alerts']}))
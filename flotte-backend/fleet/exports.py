@@ -0,0 +1,266 @@
+# fleet/exports.py
+
+import csv
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.renderers import BaseRenderer
+
+# Taille des paquets envoyés au client : les lignes sont accumulées jusqu'à ce seuil
+STREAM_BUFFER_SIZE = 64 * 1024
+
+# Caractères interdits en XML 1.0 (contrôles hors tabulation et sauts de ligne)
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+# Début de texte interprété comme une formule par les tableurs à l'ouverture d'un CSV
+_FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+
+def _csv_text(value):
+    """
+    Texte d'une cellule CSV : une chaîne libre commençant comme une formule est
+    préfixée d'une apostrophe pour être affichée telle quelle. Les nombres et
+    les dates ne sont pas concernés, un montant négatif reste un nombre.
+    """
+    text = _text(value)
+    if isinstance(value, str) and text.startswith(_FORMULA_PREFIXES):
+        return "'" + text
+    return text
+
+
+class _Echo:
+    """Pseudo-fichier de csv.writer : write() renvoie la ligne au lieu de la stocker."""
+
+    def write(self, value):
+        return value
+
+
+def csv_stream(headers, rows):
+    """Lignes CSV (UTF-8 avec BOM, pour Excel) regroupées en paquets d'environ 64 Ko."""
+    writer = csv.writer(_Echo())
+    buffer = ['\ufeff', writer.writerow(headers)]
+    size = 0
+    for row in rows:
+        line = writer.writerow([_csv_text(value) for value in row])
+        buffer.append(line)
+        size += len(line)
+        if size >= STREAM_BUFFER_SIZE:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    yield ''.join(buffer).encode()
+
+
+class _Sink:
+    """
+    Flux non positionnable dans lequel zipfile écrit l'archive : sans seek(),
+    zipfile écrit les tailles après chaque fichier (descripteurs de données),
+    ce qui permet d'envoyer l'archive au fur et à mesure.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks, self.size = [], 0
+        return data
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML.sub('', _text(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def xlsx_stream(headers, rows, sheet_name='Export'):
+    """
+    Classeur XLSX d'une feuille écrit en flux : les parties fixes, puis la
+    feuille ligne par ligne (chaînes en ligne, sans table partagée), compressée
+    au fil de l'eau. La mémoire utilisée ne dépend pas du nombre de lignes.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        archive.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        yield sink.pop()
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                '<row>' + ''.join(_cell(header) for header in headers) + '</row>'
+            ).encode())
+            buffer, size = [], 0
+            for row in rows:
+                line = '<row>' + ''.join(_cell(value) for value in row) + '</row>'
+                buffer.append(line)
+                size += len(line)
+                if size >= STREAM_BUFFER_SIZE:
+                    sheet.write(''.join(buffer).encode())
+                    buffer, size = [], 0
+                    if sink.size:
+                        yield sink.pop()
+            sheet.write((''.join(buffer) + '</sheetData></worksheet>').encode())
+    yield sink.pop()
+
+
+class CSVExportRenderer(BaseRenderer):
+    """
+    Format 'csv' des actions export (?format=csv ou Accept: text/csv) ; les
+    données sont envoyées par csv_stream, ce rendu ne sert qu'aux erreurs.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b''.join(csv_stream(['champ', 'message'], _error_rows(data)))
+
+
+class XLSXExportRenderer(BaseRenderer):
+    """Format 'xlsx' des actions export ; comme CSVExportRenderer, ne rend que les erreurs."""
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b''.join(xlsx_stream(['champ', 'message'], _error_rows(data)))
+
+
+def _error_rows(data):
+    if not isinstance(data, dict):
+        data = {'': data}
+    return [
+        (key, ' '.join(map(str, value)) if isinstance(value, list) else str(value))
+        for key, value in data.items()
+    ]
+
+
+class ExportMixin:
+    """
+    Action GET export/ : les lignes de la liste (mêmes get_queryset et
+    filter_queryset, plus ``export_filters`` et ?date_debut=/?date_fin= sur
+    ``export_date_field``) lues par .values_list().iterator() et écrites en CSV
+    (par défaut) ou en XLSX (?format=xlsx) dans une StreamingHttpResponse.
+
+    ``export_columns`` liste les colonnes (en-tête, lookup) ; ``export_filters``
+    associe un paramètre de requête à un lookup.
+    """
+    export_columns = ()
+    export_filters = {}
+    export_date_field = 'date'
+    export_name = 'export'
+
+    def get_export_queryset(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        filters = {
+            lookup: request.query_params[param]
+            for param, lookup in self.export_filters.items() if request.query_params.get(param)
+        }
+        for param, lookup in (('date_debut', 'gte'), ('date_fin', 'lte')):
+            value = request.query_params.get(param)
+            if value:
+                parsed = parse_date(value)
+                if parsed is None:
+                    raise serializers.ValidationError({param: 'Date attendue au format AAAA-MM-JJ.'})
+                field = queryset.model._meta.get_field(self.export_date_field)
+                transform = '__date' if field.get_internal_type() == 'DateTimeField' else ''
+                filters[f'{self.export_date_field}{transform}__{lookup}'] = parsed
+        return queryset.filter(**filters).order_by(self.export_date_field, 'pk')
+
+    @action(detail=False, methods=['get'], renderer_classes=[CSVExportRenderer, XLSXExportRenderer])
+    def export(self, request):
+        headers = [header for header, _ in self.export_columns]
+        rows = self.get_export_queryset(request).values_list(
+            *(lookup for _, lookup in self.export_columns)
+        ).iterator(chunk_size=getattr(settings, 'EXPORT_CHUNK_SIZE', 2000))
+        fmt = request.accepted_renderer.format
+        if fmt == 'xlsx':
+            content = xlsx_stream(headers, rows, sheet_name=self.export_name)
+        else:
+            content = csv_stream(headers, rows)
+        response = StreamingHttpResponse(content, content_type=request.accepted_renderer.media_type
+                                         + ('; charset=utf-8' if fmt == 'csv' else ''))
+        filename = f'{self.export_name}-{timezone.localdate():%Y%m%d}.{fmt}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Cache-Control'] = 'no-cache'
+        return response
@@ -0,0 +1,112 @@
+# fleet/fuel.py
+
+from datetime import timedelta
+
+from django.db.models import Count, F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+from .models import FuelLog, VehicleFuelStats
+
+# Un kilométrage nul signifie « non saisi » : il n'entre pas dans l'étendue du compteur
+ODOMETER = Q(kilometrage__gt=0)
+
+
+def _aggregate(queryset):
+    return queryset.aggregate(
+        litres=Sum('litres'),
+        cout=Sum('cout'),
+        pleins=Count('id'),
+        prix_litre_total=Sum('prix_litre'),
+        kilometrage_min=Min('kilometrage', filter=ODOMETER),
+        kilometrage_max=Max('kilometrage', filter=ODOMETER),
+    )
+
+
+def record_fuel_log(fuel_log):
+    """Ajoute un nouveau plein aux totaux de son véhicule (une requête UPDATE)."""
+    kilometrage = fuel_log.kilometrage if fuel_log.kilometrage and fuel_log.kilometrage > 0 else None
+    values = {
+        'litres': F('litres') + fuel_log.litres,
+        'cout': F('cout') + fuel_log.cout,
+        'pleins': F('pleins') + 1,
+        'prix_litre_total': F('prix_litre_total') + fuel_log.prix_litre,
+    }
+    if kilometrage is not None:
+        km = Value(kilometrage)
+        values['kilometrage_min'] = Least(Coalesce(F('kilometrage_min'), km), km)
+        values['kilometrage_max'] = Greatest(Coalesce(F('kilometrage_max'), km), km)
+    if not VehicleFuelStats.objects.filter(vehicle_id=fuel_log.vehicle_id).update(**values):
+        recompute_fuel_stats([fuel_log.vehicle_id])
+
+
+def recompute_fuel_stats(vehicle_ids=None):
+    """
+    Recalcule les totaux depuis FuelLog pour ces véhicules (tous si None), après
+    une modification ou une suppression de plein. Retourne le nombre de lignes écrites.
+    """
+    queryset = FuelLog.objects.order_by()
+    if vehicle_ids is not None:
+        queryset = queryset.filter(vehicle_id__in=vehicle_ids)
+    rows = {
+        item['vehicle_id']: item
+        for item in queryset.values('vehicle_id').annotate(
+            litres=Sum('litres'),
+            cout=Sum('cout'),
+            pleins=Count('id'),
+            prix_litre_total=Sum('prix_litre'),
+            kilometrage_min=Min('kilometrage', filter=ODOMETER),
+            kilometrage_max=Max('kilometrage', filter=ODOMETER),
+        )
+    }
+    stale = VehicleFuelStats.objects.all()
+    if vehicle_ids is not None:
+        stale = stale.filter(vehicle_id__in=vehicle_ids)
+    stale.exclude(vehicle_id__in=rows).delete()
+    VehicleFuelStats.objects.bulk_create(
+        [
+            VehicleFuelStats(
+                vehicle_id=vehicle_id,
+                litres=item['litres'] or 0,
+                cout=item['cout'] or 0,
+                pleins=item['pleins'],
+                prix_litre_total=item['prix_litre_total'] or 0,
+                kilometrage_min=item['kilometrage_min'],
+                kilometrage_max=item['kilometrage_max'],
+            )
+            for vehicle_id, item in rows.items()
+        ],
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['vehicle'],
+        update_fields=['litres', 'cout', 'pleins', 'prix_litre_total', 'kilometrage_min', 'kilometrage_max'],
+    )
+    return len(rows)
+
+
+def consumption(litres, pleins, kilometrage_min, kilometrage_max):
+    """Consommation en L/100 km ; 0 sans au moins deux pleins sur une distance non nulle."""
+    if pleins < 2 or kilometrage_min is None or kilometrage_max is None:
+        return 0
+    distance = kilometrage_max - kilometrage_min
+    if distance <= 0:
+        return 0
+    return (litres * 100) / distance
+
+
+def fuel_summary(litres, cout, pleins, prix_litre_total, kilometrage_min, kilometrage_max):
+    return {
+        'consommation_moyenne': consumption(litres or 0, pleins, kilometrage_min, kilometrage_max),
+        'total_carburant': cout or 0,
+        'total_litres': litres or 0,
+        'prix_moyen': prix_litre_total / pleins if pleins else 0,
+        'pleins': pleins,
+        'kilometrage_min': kilometrage_min,
+        'kilometrage_max': kilometrage_max,
+    }
+
+
+def window_summary(vehicle_id, days, today=None):
+    """Totaux des pleins des ``days`` derniers jours, une requête sur l'index (vehicle, date)."""
+    since = (today or timezone.localdate()) - timedelta(days=days)
+    return fuel_summary(**_aggregate(FuelLog.objects.filter(vehicle_id=vehicle_id, date__gt=since)))
@@ -0,0 +1,186 @@
+# fleet/geo.py
+
+from math import radians, cos, sin, asin, sqrt
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+EARTH_RADIUS_KM = 6371
+EARTH_RADIUS_M = EARTH_RADIUS_KM * 1000
+# Mètres par pixel à l'équateur au niveau de zoom 0 (tuiles 256 px Web Mercator)
+METERS_PER_PIXEL_Z0 = 156543.03
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Distance orthodromique entre deux points GPS, en km."""
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+
+
+def segment_distances_km(points, start=None):
+    """
+    Distances successives (en km) entre les points d'un trajet, itérable de
+    couples latitude, longitude.
+
+    ``start`` est le dernier point déjà comptabilisé : le segment jusqu'au
+    premier point est alors inclus, ce qui permet de tenir un cumul
+    incrémental sans relire la trace. Calcul vectorisé avec NumPy s'il est
+    installé, boucle Python sinon.
+    """
+    points = list(points)
+    if start is not None:
+        points.insert(0, tuple(start))
+    if len(points) < 2:
+        return []
+
+    if np is None:
+        return [
+            haversine(a[0], a[1], b[0], b[1])
+            for a, b in zip(points, points[1:])
+        ]
+
+    coords = np.radians(np.asarray(points, dtype=float))
+    lat, lon = coords[:, 0], coords[:, 1]
+    dlat = np.diff(lat)
+    dlon = np.diff(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))).tolist()
+
+
+def path_distance_km(points, start=None):
+    """Longueur d'un trajet en km (voir segment_distances_km pour ``start``)."""
+    return float(sum(segment_distances_km(points, start)))
+
+
+def parse_bbox(value):
+    """Lit une emprise "min_lon,min_lat,max_lon,max_lat" ; lève ValueError si invalide."""
+    try:
+        min_lon, min_lat, max_lon, max_lat = [float(v) for v in value.split(',')]
+    except ValueError:
+        raise ValueError('bbox doit être min_lon,min_lat,max_lon,max_lat')
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def in_bbox(bbox, latitude, longitude):
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return min_lon <= longitude <= max_lon and min_lat <= latitude <= max_lat
+
+
+def tolerance_for_zoom(zoom):
+    """Tolérance de simplification (en mètres) équivalente à un pixel au zoom donné."""
+    return METERS_PER_PIXEL_Z0 / (2 ** zoom)
+
+
+def douglas_peucker(points, tolerance):
+    """
+    Simplifie une polyligne (liste de tuples commençant par latitude, longitude)
+    avec l'algorithme de Douglas-Peucker, tolérance en mètres.
+
+    Les distances sont calculées dans une projection équirectangulaire locale,
+    largement suffisante pour des traces de véhicules. Version itérative pour
+    ne pas dépasser la profondeur de récursion sur les longues traces.
+    """
+    n = len(points)
+    if n < 3 or tolerance <= 0:
+        return list(points)
+
+    lat0 = radians(sum(p[0] for p in points) / n)
+    kx = EARTH_RADIUS_M * cos(lat0)
+    ky = EARTH_RADIUS_M
+    xy = [(radians(p[1]) * kx, radians(p[0]) * ky) for p in points]
+
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    tolerance_sq = tolerance * tolerance
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = xy[first]
+        x2, y2 = xy[last]
+        dx, dy = x2 - x1, y2 - y1
+        length_sq = dx * dx + dy * dy
+        max_dist_sq = 0.0
+        index = None
+        for i in range(first + 1, last):
+            px, py = xy[i]
+            if length_sq == 0:
+                dist_sq = (px - x1) ** 2 + (py - y1) ** 2
+            else:
+                t = ((px - x1) * dx + (py - y1) * dy) / length_sq
+                t = max(0.0, min(1.0, t))
+                dist_sq = (px - x1 - t * dx) ** 2 + (py - y1 - t * dy) ** 2
+            if dist_sq > max_dist_sq:
+                max_dist_sq = dist_sq
+                index = i
+        if index is not None and max_dist_sq > tolerance_sq:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [p for p, kept in zip(points, keep) if kept]
+
+
+def encode_polyline(points, precision=5):
+    """Encode une liste de (latitude, longitude, ...) au format Google Encoded Polyline."""
+    factor = 10 ** precision
+    result = []
+    prev_lat = prev_lon = 0
+    for point in points:
+        lat = int(round(point[0] * factor))
+        lon = int(round(point[1] * factor))
+        for delta in (lat - prev_lat, lon - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                result.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            result.append(chr(value + 63))
+        prev_lat, prev_lon = lat, lon
+    return ''.join(result)
+
+
+def track_payload(points, params, timestamp_field=None):
+    """
+    Construit la réponse d'une trace simplifiée à partir de tuples
+    (latitude, longitude, timestamp) triés chronologiquement.
+
+    Paramètres reconnus : tolerance (mètres), zoom (0-22) et
+    encoding=polyline. Lève ValueError si un paramètre est invalide.
+    """
+    tolerance = 0.0
+    if params.get('tolerance'):
+        try:
+            tolerance = float(params['tolerance'])
+        except ValueError:
+            raise ValueError('tolerance doit être un nombre (en mètres)')
+    elif params.get('zoom'):
+        try:
+            zoom = int(params['zoom'])
+        except ValueError:
+            raise ValueError('zoom doit être un entier')
+        if not 0 <= zoom <= 22:
+            raise ValueError('zoom doit être compris entre 0 et 22')
+        tolerance = tolerance_for_zoom(zoom)
+
+    simplified = douglas_peucker(points, tolerance)
+    payload = {
+        'points_count': len(points),
+        'simplified_count': len(simplified),
+        'tolerance': tolerance,
+    }
+    if params.get('encoding') == 'polyline':
+        payload['polyline'] = encode_polyline(simplified)
+    else:
+        payload['points'] = [
+            {
+                'latitude': lat,
+                'longitude': lon,
+                'timestamp': timestamp_field.to_representation(ts) if timestamp_field else ts,
+            }
+            for lat, lon, ts in simplified
+        ]
+    return payload
@@ -0,0 +1,65 @@
+# fleet/live.py
+
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+logger = logging.getLogger(__name__)
+
+# Groupe Channels suivi par les cartes temps réel de toute la flotte (FleetConsumer)
+FLEET_GROUP = 'fleet'
+# Groupe des clients notifiés des nouvelles alertes critiques (AlertConsumer)
+ALERTS_GROUP = 'alerts'
+
+
+def driver_update(driver_id, latitude, longitude, timestamp):
+    return {
+        'kind': 'driver',
+        'id': driver_id,
+        'latitude': latitude,
+        'longitude': longitude,
+        'timestamp': timestamp.isoformat() if timestamp else None,
+    }
+
+
+def vehicle_update(vehicle_id, data, timestamp, stationary_since=None):
+    return {
+        'kind': 'vehicle',
+        'id': vehicle_id,
+        'latitude': data.get('latitude'),
+        'longitude': data.get('longitude'),
+        'speed': data.get('speed'),
+        'heading': data.get('heading'),
+        'timestamp': timestamp.isoformat() if timestamp else None,
+        'stationary_since': stationary_since.isoformat() if stationary_since else None,
+    }
+
+
+def fleet_message(updates):
+    return {'type': 'fleet.positions', 'positions': updates}
+
+
+def publish_positions(updates):
+    """
+    Diffuse des mises à jour de position au groupe de la flotte depuis du code
+    synchrone (vues HTTP). Une couche Channels indisponible ne doit pas faire
+    échouer l'enregistrement des positions : l'erreur est seulement journalisée.
+    """
+    if updates:
+        _group_send(FLEET_GROUP, fleet_message(updates), 'des positions à la flotte')
+
+
+def publish_alerts(alerts):
+    """Pousse des alertes (déjà sérialisées) aux clients abonnés à ws/alerts/."""
+    if alerts:
+        _group_send(ALERTS_GROUP, {'type': 'alerts.new', 'alerts': alerts}, 'des alertes')
+
+
+def _group_send(group, message, label):
+    try:
+        channel_layer = get_channel_layer()
+        if channel_layer is not None:
+            async_to_sync(channel_layer.group_send)(group, message)
+    except Exception:
+        logger.exception('Diffusion %s impossible', label)
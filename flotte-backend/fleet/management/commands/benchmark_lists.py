@@ -0,0 +1,88 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from fleet import views
+from fleet.models import Driver, Expense, FuelLog, Mission, Position, Vehicle
+
+
+class Command(BaseCommand):
+    help = (
+        'Mesure le nombre de requêtes par seconde des grandes listes (missions, '
+        'pleins, dépenses, historique GPS) avec et sans le chemin rapide .values(). '
+        'Les données de test sont créées dans une transaction annulée à la fin'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000,
+                            help='Nombre de lignes créées par table (2000 par défaut)')
+        parser.add_argument('--requests', type=int, default=20,
+                            help='Nombre de requêtes par mesure (20 par défaut)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            driver = self.seed(options['rows'])
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(user=User.objects.create_superuser(username='benchmark_lists'))
+            endpoints = [
+                ('/api/missions/', views.MissionViewSet, {}),
+                ('/api/fuel-logs/', views.FuelLogViewSet, {}),
+                ('/api/expenses/', views.ExpenseViewSet, {}),
+                ('/api/positions/history/', views.PositionHistoryAPIView,
+                 {'driver': driver.id, 'page_size': options['rows']}),
+            ]
+            for url, view, params in endpoints:
+                before = self.measure(client, url, params, view, options['requests'], fast=False)
+                after = self.measure(client, url, params, view, options['requests'], fast=True)
+                self.stdout.write(
+                    f'{url:<28} avant {before:8.1f} req/s   après {after:8.1f} req/s   x{after / before:.1f}'
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, rows):
+        user = User.objects.create_user(username='benchmark_conducteur', first_name='Bench')
+        driver = Driver.objects.create(user_profile=user.profile, numero_permis='BENCH-0001')
+        vehicle = Vehicle.objects.create(marque='Toyota', modele='Hilux', immatriculation='BENCH-001', kilometrage=0)
+        now = timezone.now()
+        today = timezone.localdate()
+        Mission.objects.bulk_create([
+            Mission(vehicle=vehicle, driver=driver, raison=f'Mission {i}', distance_km=i,
+                    date_depart=now - timedelta(hours=i))
+            for i in range(rows)
+        ], batch_size=500)
+        FuelLog.objects.bulk_create([
+            FuelLog(vehicle=vehicle, driver=driver, date=today - timedelta(days=i), litres=40,
+                    cout=Decimal('3000.00'), prix_litre=Decimal('75.000'))
+            for i in range(rows)
+        ], batch_size=500)
+        Expense.objects.bulk_create([
+            Expense(vehicle=vehicle, type='peage', montant=Decimal('1500.00'), date=today - timedelta(days=i))
+            for i in range(rows)
+        ], batch_size=500)
+        Position.objects.bulk_create([
+            Position(driver=driver, latitude=5.3 + i / 10000, longitude=-4.0, timestamp=now - timedelta(seconds=i))
+            for i in range(rows)
+        ], batch_size=500)
+        return driver
+
+    def measure(self, client, url, params, view, count, fast):
+        saved = view.fast_list, view.renderer_classes
+        view.fast_list = fast
+        if not fast:
+            view.renderer_classes = [JSONRenderer]
+        try:
+            client.get(url, params)
+            start = time.perf_counter()
+            for _ in range(count):
+                response = client.get(url, params)
+                assert response.status_code == 200, response.status_code
+            return count / (time.perf_counter() - start)
+        finally:
+            view.fast_list, view.renderer_classes = saved
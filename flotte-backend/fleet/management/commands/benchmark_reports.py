@@ -0,0 +1,99 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from fleet.models import Entretien, Expense, FuelLog, Vehicle
+from fleet.reports import report_totals
+
+
+def legacy_report_totals(vehicle_id, date_debut, date_fin):
+    """Ancien calcul de generate_report (une requête par type de dépense), gardé pour comparaison."""
+    vehicle = Vehicle.objects.get(id=vehicle_id)
+    totals = {}
+    for type_depense, field in (('carburant', 'total_carburant'), ('peage', 'total_peages'),
+                                ('amende', 'total_amendes'), ('autre', 'total_autre')):
+        totals[field] = Expense.objects.filter(
+            vehicle=vehicle, type=type_depense, date__range=[date_debut, date_fin]
+        ).aggregate(Sum('montant'))['montant__sum'] or 0
+    totals['total_entretien'] = Entretien.objects.filter(
+        vehicle=vehicle, date_entretien__range=[date_debut, date_fin]
+    ).aggregate(Sum('cout'))['cout__sum'] or 0
+    fuel_logs = FuelLog.objects.filter(vehicle=vehicle, date__range=[date_debut, date_fin]).order_by('date', 'kilometrage')
+    kilometrage_debut = fuel_logs.first().kilometrage if fuel_logs.exists() else vehicle.kilometrage
+    kilometrage_fin = fuel_logs.last().kilometrage if fuel_logs.exists() else vehicle.kilometrage
+    total_litres = fuel_logs.aggregate(Sum('litres'))['litres__sum'] or 0
+    kilometrage_parcouru = kilometrage_fin - kilometrage_debut
+    totals.update(
+        kilometrage_debut=kilometrage_debut,
+        kilometrage_fin=kilometrage_fin,
+        consommation_moyenne=(total_litres * 100) / kilometrage_parcouru if kilometrage_parcouru > 0 else 0,
+    )
+    return vehicle, totals
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare le calcul des rapports financiers (generate_report) avant et après '
+        'l\'agrégation groupée : requêtes par rapport et rapports par seconde. '
+        'Les données de test sont créées dans une transaction annulée à la fin'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicles', type=int, default=50,
+                            help='Nombre de véhicules créés (50 par défaut)')
+        parser.add_argument('--rows', type=int, default=400,
+                            help='Nombre de dépenses et de pleins par véhicule (400 par défaut)')
+        parser.add_argument('--days', type=int, default=90,
+                            help='Longueur de la période de chaque rapport, en jours (90 par défaut)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            vehicle_ids = self.seed(options['vehicles'], options['rows'])
+            date_fin = timezone.localdate()
+            date_debut = date_fin - timedelta(days=options['days'])
+            for vehicle_id in vehicle_ids:
+                before = legacy_report_totals(vehicle_id, date_debut, date_fin)[1]
+                after = report_totals(vehicle_id, date_debut, date_fin)[1]
+                if before != after:
+                    raise AssertionError(f'Totaux différents pour le véhicule {vehicle_id} : {before} != {after}')
+            for label, compute in (('avant', legacy_report_totals), ('après', report_totals)):
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    for vehicle_id in vehicle_ids:
+                        compute(vehicle_id, date_debut, date_fin)
+                    elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f'{label:<6} {len(queries) / len(vehicle_ids):5.1f} requêtes/rapport   '
+                    f'{len(vehicle_ids) / elapsed:8.1f} rapports/s'
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, vehicles, rows):
+        today = timezone.localdate()
+        types = ['carburant', 'entretien', 'assurance', 'peage', 'amende', 'autre']
+        created = Vehicle.objects.bulk_create([
+            Vehicle(marque='Toyota', modele='Hilux', immatriculation=f'BENCH-R{i:04d}', kilometrage=1000)
+            for i in range(vehicles)
+        ])
+        Expense.objects.bulk_create([
+            Expense(vehicle=vehicle, type=types[i % len(types)], montant=Decimal('1500.00'),
+                    date=today - timedelta(days=i % 365), description='benchmark')
+            for vehicle in created for i in range(rows)
+        ], batch_size=1000)
+        FuelLog.objects.bulk_create([
+            FuelLog(vehicle=vehicle, date=today - timedelta(days=i % 365), litres=40,
+                    cout=Decimal('3000.00'), prix_litre=Decimal('75.000'), kilometrage=100000 - i * 250)
+            for vehicle in created for i in range(rows)
+        ], batch_size=1000)
+        Entretien.objects.bulk_create([
+            Entretien(vehicle=vehicle, type_entretien='vidange', date_entretien=today - timedelta(days=i * 30),
+                      cout=Decimal('25000.00'), commentaires='benchmark', kilometrage=1000, garage='Garage')
+            for vehicle in created for i in range(12)
+        ])
+        return [vehicle.pk for vehicle in created]
@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from fleet.models import Position, PositionCompaction, VehiclePosition
+
+
+class Command(BaseCommand):
+    help = (
+        'Sous-échantillonne les historiques GPS anciens (Position, VehiclePosition) '
+        'et supprime ceux qui dépassent la durée de rétention. Chaque passage ne relit '
+        'que les journées devenues anciennes depuis le précédent (PositionCompaction)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--downsample-after-days', type=int, default=30,
+                            help='Âge (en jours) à partir duquel les traces sont sous-échantillonnées')
+        parser.add_argument('--interval', type=int, default=60,
+                            help='Intervalle (en secondes) conservé entre deux positions sous-échantillonnées')
+        parser.add_argument('--retention-days', type=int, default=365,
+                            help='Âge (en jours) au-delà duquel les positions sont supprimées')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Affiche le nombre de positions concernées sans rien supprimer')
+        parser.add_argument('--full', action='store_true',
+                            help='Relit toute la période de rétention (positions anciennes reçues en retard)')
+
+    def handle(self, *args, **options):
+        if options['retention_days'] <= options['downsample_after_days']:
+            self.stderr.write('--retention-days doit être supérieur à --downsample-after-days')
+            return
+
+        now = timezone.now()
+        retention_cutoff = now - timedelta(days=options['retention_days'])
+        downsample_cutoff = now - timedelta(days=options['downsample_after_days'])
+
+        for model, owner_field in ((Position, 'driver_id'), (VehiclePosition, 'vehicle_id')):
+            label = model.__name__
+            deleted = self._delete_expired(model, retention_cutoff, options)
+            self.stdout.write(f'{label}: {deleted} positions expirées supprimées')
+
+            removed = 0
+            day = self._downsample_start(model, retention_cutoff, options)
+            while day < downsample_cutoff:
+                day_end = min(day + timedelta(days=1), downsample_cutoff)
+                removed += self._downsample_window(model, owner_field, day, day_end, options)
+                day = day_end
+            if not options['dry_run']:
+                PositionCompaction.objects.update_or_create(
+                    table=model._meta.label_lower,
+                    defaults={'compacte_jusqu_a': downsample_cutoff, 'intervalle': options['interval']},
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f'{label}: {removed} positions supprimées par sous-échantillonnage'
+            ))
+
+    def _downsample_start(self, model, retention_cutoff, options):
+        """
+        Début de la période à sous-échantillonner : la fin du passage précédent,
+        sauf avec --full ou si l'intervalle a changé (toute la rétention est relue).
+        """
+        start = retention_cutoff.replace(hour=0, minute=0, second=0, microsecond=0)
+        if options['full']:
+            return start
+        state = PositionCompaction.objects.filter(
+            table=model._meta.label_lower, intervalle=options['interval']
+        ).first()
+        if state is None:
+            return start
+        return max(start, state.compacte_jusqu_a)
+
+    def _downsample_window(self, model, owner_field, start, end, options):
+        """Garde la première position de chaque intervalle, par propriétaire, sur une journée."""
+        interval = options['interval']
+        rows = model.objects.filter(
+            timestamp__gte=start, timestamp__lt=end
+        ).order_by(owner_field, 'timestamp').values_list('id', owner_field, 'timestamp')
+
+        to_delete = []
+        last_owner = None
+        last_kept = None
+        for pk, owner, timestamp in rows.iterator(chunk_size=options['batch_size']):
+            if owner != last_owner or (timestamp - last_kept).total_seconds() >= interval:
+                last_owner = owner
+                last_kept = timestamp
+                continue
+            to_delete.append(pk)
+        return self._delete_ids(model, to_delete, options)
+
+    def _delete_expired(self, model, cutoff, options):
+        expired = model.objects.filter(timestamp__lt=cutoff)
+        if options['dry_run']:
+            return expired.count()
+        deleted = 0
+        while True:
+            ids = list(expired.order_by().values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                return deleted
+            model.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+
+    def _delete_ids(self, model, ids, options):
+        if options['dry_run']:
+            return len(ids)
+        batch_size = options['batch_size']
+        for i in range(0, len(ids), batch_size):
+            model.objects.filter(id__in=ids[i:i + batch_size]).delete()
+        return len(ids)
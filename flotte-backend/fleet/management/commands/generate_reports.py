@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from fleet.models import ReportBatch
+from fleet.reports import reclaim_stale_batches, run_report_batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Génère les rapports financiers d\'une période pour toute la flotte ou les '
+        'véhicules indiqués (clôture mensuelle), dans un lot suivi comme ceux créés '
+        'par l\'API /api/report-batches/. Avec --pending, exécute les lots en attente, '
+        'y compris ceux sans progression depuis plus de REPORT_BATCH_STALE_AFTER secondes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-debut', help='Début de la période (AAAA-MM-JJ)')
+        parser.add_argument('--date-fin', help='Fin de la période (AAAA-MM-JJ)')
+        parser.add_argument('--vehicle', type=int, action='append', dest='vehicles',
+                            help='Limite le lot à ce véhicule (option répétable)')
+        parser.add_argument('--actifs', action='store_true', help='Ne traite que les véhicules actifs')
+        parser.add_argument('--workers', type=int,
+                            help='Nombre de processus de calcul (REPORT_BATCH_WORKERS par défaut)')
+        parser.add_argument('--chunk-size', type=int,
+                            help='Véhicules par paquet (REPORT_BATCH_CHUNK_SIZE par défaut)')
+        parser.add_argument('--pending', action='store_true',
+                            help='Exécute les lots en attente (et reprend les lots abandonnés) au lieu d\'en créer un')
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            reclaimed = reclaim_stale_batches()
+            if reclaimed:
+                self.stdout.write(f'{reclaimed} lot(s) abandonné(s) remis en attente')
+            batch_ids = list(ReportBatch.objects.filter(statut='en_attente').order_by('pk').values_list('pk', flat=True))
+        else:
+            date_debut = parse_date(options['date_debut'] or '')
+            date_fin = parse_date(options['date_fin'] or '')
+            if date_debut is None or date_fin is None:
+                raise CommandError('--date-debut et --date-fin (AAAA-MM-JJ) sont obligatoires')
+            if date_debut > date_fin:
+                raise CommandError('La date de fin précède la date de début')
+            batch_ids = [ReportBatch.objects.create(
+                date_debut=date_debut, date_fin=date_fin, vehicle_ids=options['vehicles'],
+                actifs_seulement=options['actifs'],
+            ).pk]
+        for batch_id in batch_ids:
+            batch = run_report_batch(batch_id, workers=options['workers'], chunk_size=options['chunk_size'])
+            if batch is None:
+                continue
+            if batch.statut == 'echec':
+                raise CommandError(f'Lot {batch.pk} en échec : {batch.erreur}')
+            self.stdout.write(self.style.SUCCESS(
+                f'Lot {batch.pk} : {batch.traites} rapports générés ({batch.date_debut} - {batch.date_fin})'
+            ))
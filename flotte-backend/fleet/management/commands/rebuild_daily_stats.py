@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from fleet.response_cache import local_cache_warning
+from fleet.rollup import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruit les totaux journaliers par véhicule (VehicleDailyStats). '
+        'À lancer après la migration, puis chaque nuit avec --days pour rattraper '
+        'les écritures qui ne déclenchent pas de signaux (update, bulk_create)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help='Ne reconstruit que les N derniers jours (tout l\'historique par défaut)')
+        parser.add_argument('--vehicle', type=int, action='append', dest='vehicles',
+                            help='Limite la reconstruction à ce véhicule (option répétable)')
+
+    def handle(self, *args, **options):
+        warning = local_cache_warning()
+        if warning:
+            self.stderr.write(self.style.WARNING(warning))
+        start = None
+        if options['days'] is not None:
+            start = timezone.localdate() - timedelta(days=options['days'])
+        count = rebuild_daily_stats(start=start, vehicle_ids=options['vehicles'])
+        self.stdout.write(self.style.SUCCESS(f'{count} lignes journalières reconstruites'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from fleet.fuel import recompute_fuel_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcule les totaux carburant cumulés par véhicule (VehicleFuelStats) '
+        'depuis les pleins, pour rattraper les écritures qui ne déclenchent pas '
+        'de signaux (update, bulk_create)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicle', type=int, action='append', dest='vehicles',
+                            help='Limite le recalcul à ce véhicule (option répétable)')
+
+    def handle(self, *args, **options):
+        count = recompute_fuel_stats(options['vehicles'])
+        self.stdout.write(self.style.SUCCESS(f'{count} véhicules recalculés'))
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from fleet.alerts import evaluate_and_notify
+from fleet.response_cache import local_cache_warning
+
+
+class Command(BaseCommand):
+    help = (
+        'Évalue périodiquement les alertes d\'échéance de toute la flotte et pousse '
+        'les nouvelles alertes critiques sur ws/alerts/. Les modifications de véhicules, '
+        'conducteurs et documents sont déjà réévaluées à l\'enregistrement ; ce passage '
+        'complet prend en compte l\'écoulement du temps (niveaux qui changent, échéances qui arrivent)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=3600,
+                            help='Délai (en secondes) entre deux évaluations complètes')
+        parser.add_argument('--once', action='store_true',
+                            help='Effectue une seule évaluation puis s\'arrête (tâche cron)')
+
+    def handle(self, *args, **options):
+        warning = local_cache_warning()
+        if warning:
+            self.stderr.write(self.style.WARNING(warning))
+        while True:
+            close_old_connections()
+            try:
+                result = evaluate_and_notify()
+            except Exception as e:
+                if options['once']:
+                    raise
+                self.stderr.write(f'Échec de l\'évaluation des alertes : {e}')
+            else:
+                self.stdout.write(
+                    f"Alertes : {len(result['created'])} créées, {len(result['updated'])} mises à jour, "
+                    f"{result['resolved']} résolues"
+                )
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0012_merge_20250923_0859'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='position',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
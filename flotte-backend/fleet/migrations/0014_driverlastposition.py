@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_last_positions(apps, schema_editor):
+    Driver = apps.get_model('fleet', 'Driver')
+    Position = apps.get_model('fleet', 'Position')
+    DriverLastPosition = apps.get_model('fleet', 'DriverLastPosition')
+    rows = []
+    for driver_id in Driver.objects.values_list('id', flat=True):
+        last = Position.objects.filter(driver_id=driver_id).order_by('-timestamp').first()
+        if last:
+            rows.append(DriverLastPosition(
+                driver_id=driver_id,
+                latitude=last.latitude,
+                longitude=last.longitude,
+                timestamp=last.timestamp,
+            ))
+    DriverLastPosition.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0013_position_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverLastPosition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('longitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('timestamp', models.DateTimeField()),
+                ('driver', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='last_position', to='fleet.driver')),
+            ],
+        ),
+        migrations.RunPython(backfill_last_positions, migrations.RunPython.noop),
+    ]
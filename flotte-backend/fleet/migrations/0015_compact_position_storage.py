@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0014_driverlastposition'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='driverlastposition',
+            name='latitude',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='driverlastposition',
+            name='longitude',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='position',
+            name='latitude',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='position',
+            name='longitude',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='vehicleposition',
+            name='latitude',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='vehicleposition',
+            name='longitude',
+            field=models.FloatField(),
+        ),
+        migrations.AddIndex(
+            model_name='position',
+            index=models.Index(fields=['driver', '-timestamp'], name='fleet_pos_driver_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='position',
+            index=models.Index(fields=['timestamp'], name='fleet_pos_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicleposition',
+            index=models.Index(fields=['vehicle', '-timestamp'], name='fleet_vpos_vehicle_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicleposition',
+            index=models.Index(fields=['timestamp'], name='fleet_vpos_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:56
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0015_compact_position_storage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vehicleposition',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
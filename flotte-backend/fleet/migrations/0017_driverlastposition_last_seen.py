@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:00
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_last_seen(apps, schema_editor):
+    DriverLastPosition = apps.get_model('fleet', 'DriverLastPosition')
+    DriverLastPosition.objects.update(last_seen=F('timestamp'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0016_vehicleposition_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driverlastposition',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='driverlastposition',
+            name='stationary_since',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_last_seen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:04
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+EXPENSE_TYPES = ('carburant', 'entretien', 'assurance', 'peage', 'amende', 'autre')
+
+
+def backfill_daily_stats(apps, schema_editor):
+    # Même agrégation que fleet.rollup.rebuild_daily_stats, sur les modèles historiques
+    FuelLog = apps.get_model('fleet', 'FuelLog')
+    Expense = apps.get_model('fleet', 'Expense')
+    Entretien = apps.get_model('fleet', 'Entretien')
+    Maintenance = apps.get_model('fleet', 'Maintenance')
+    Mission = apps.get_model('fleet', 'Mission')
+    VehicleDailyStats = apps.get_model('fleet', 'VehicleDailyStats')
+    totals = {}
+
+    def row(vehicle_id, day):
+        return totals.setdefault((vehicle_id, day), {})
+
+    for item in FuelLog.objects.order_by().values('vehicle_id', 'date').annotate(
+        litres=Sum('litres'), cout=Sum('cout'), pleins=Count('id'), prix=Sum('prix_litre')
+    ):
+        values = row(item['vehicle_id'], item['date'])
+        values['carburant_litres'] = item['litres'] or 0
+        values['carburant_cout'] = item['cout'] or 0
+        values['carburant_pleins'] = item['pleins']
+        values['carburant_prix_litre_total'] = item['prix'] or 0
+
+    for item in Expense.objects.order_by().values('vehicle_id', 'date', 'type').annotate(montant=Sum('montant')):
+        field = f"depense_{item['type'] if item['type'] in EXPENSE_TYPES else 'autre'}"
+        values = row(item['vehicle_id'], item['date'])
+        values[field] = values.get(field, 0) + (item['montant'] or 0)
+
+    for item in Entretien.objects.order_by().values('vehicle_id', 'date_entretien').annotate(cout=Sum('cout')):
+        values = row(item['vehicle_id'], item['date_entretien'])
+        values['entretien_cout'] = values.get('entretien_cout', 0) + (item['cout'] or 0)
+
+    for item in Maintenance.objects.order_by().values('vehicle_id', 'date').annotate(cout=Sum('cout')):
+        values = row(item['vehicle_id'], item['date'])
+        values['entretien_cout'] = values.get('entretien_cout', 0) + Decimal(str(item['cout'] or 0))
+
+    missions = Mission.objects.annotate(jour=TruncDate('date_depart')).order_by()
+    for item in missions.values('vehicle_id', 'jour').annotate(distance=Sum('distance_km')):
+        row(item['vehicle_id'], item['jour'])['kilometres'] = item['distance'] or 0
+
+    VehicleDailyStats.objects.bulk_create([
+        VehicleDailyStats(vehicle_id=vehicle_id, date=day, **values)
+        for (vehicle_id, day), values in totals.items() if vehicle_id is not None and day is not None
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0017_driverlastposition_last_seen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('carburant_litres', models.FloatField(default=0)),
+                ('carburant_cout', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('carburant_pleins', models.PositiveIntegerField(default=0)),
+                ('carburant_prix_litre_total', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('depense_carburant', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('depense_entretien', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('depense_assurance', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('depense_peage', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('depense_amende', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('depense_autre', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('kilometres', models.FloatField(default=0)),
+                ('entretien_cout', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='fleet.vehicle')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='fleet_vdstats_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('vehicle', 'date'), name='unique_vehicle_daily_stats')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
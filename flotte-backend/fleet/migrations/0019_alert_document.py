@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Préfixe des messages des alertes de documents créées avant le lien vers le document
+LEGACY_DOCUMENT_MESSAGE = 'Le document '
+
+
+def link_document_alerts(apps, schema_editor):
+    """
+    Rattache les alertes de documents non résolues à leur document, retrouvé par
+    véhicule, type et date d'échéance (fin du message) ; celles dont le document
+    n'existe plus ou a changé d'échéance sont résolues. Sans document_id, elles
+    ne seraient jamais reprises par fleet.alerts et doubleraient les nouvelles.
+    """
+    Alert = apps.get_model('fleet', 'Alert')
+    DocumentAdministratif = apps.get_model('fleet', 'DocumentAdministratif')
+    legacy = list(Alert.objects.filter(
+        resolue=False, document__isnull=True, driver__isnull=True, vehicle__isnull=False,
+        message__startswith=LEGACY_DOCUMENT_MESSAGE,
+    ).only('id', 'vehicle_id', 'type_alerte', 'message'))
+    if not legacy:
+        return
+    documents = {}
+    for doc in DocumentAdministratif.objects.filter(
+        vehicle_id__in={alert.vehicle_id for alert in legacy}
+    ).order_by('-id').only('id', 'vehicle_id', 'type_document', 'date_expiration'):
+        documents[(doc.vehicle_id, doc.type_document, doc.date_expiration.isoformat())] = doc.id
+
+    to_update, to_resolve = [], []
+    for alert in legacy:
+        expiration = alert.message.rsplit(' ', 1)[-1]
+        document_id = documents.get((alert.vehicle_id, alert.type_alerte, expiration))
+        if document_id is None:
+            to_resolve.append(alert.id)
+        else:
+            alert.document_id = document_id
+            to_update.append(alert)
+    Alert.objects.bulk_update(to_update, ['document'], batch_size=500)
+    Alert.objects.filter(id__in=to_resolve).update(resolue=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0018_vehicledailystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='document',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='alertes', to='fleet.documentadministratif'),
+        ),
+        migrations.RunPython(link_document_alerts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+# Tables suivies par fleet.models.update_table_version : une ligne par table,
+# pour que chaque écriture ne coûte qu'un UPDATE
+VERSIONED_TABLES = [
+    'auth.user', 'fleet.userprofile', 'fleet.vehicle', 'fleet.driver', 'fleet.assignment',
+    'fleet.maintenance', 'fleet.fuellog', 'fleet.alert', 'fleet.mission', 'fleet.expense',
+    'fleet.financialreport', 'fleet.documentadministratif', 'fleet.entretien', 'fleet.rapport',
+    'fleet.commentaireecart', 'fleet.historique',
+]
+
+
+def create_versions(apps, schema_editor):
+    TableVersion = apps.get_model('fleet', 'TableVersion')
+    TableVersion.objects.bulk_create(
+        [TableVersion(table=table) for table in VERSIONED_TABLES], ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0019_alert_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=100, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
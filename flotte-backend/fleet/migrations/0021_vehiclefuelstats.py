@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+
+
+def backfill_fuel_stats(apps, schema_editor):
+    FuelLog = apps.get_model('fleet', 'FuelLog')
+    VehicleFuelStats = apps.get_model('fleet', 'VehicleFuelStats')
+    odometer = Q(kilometrage__gt=0)
+    VehicleFuelStats.objects.bulk_create([
+        VehicleFuelStats(
+            vehicle_id=item['vehicle_id'],
+            litres=item['litres'] or 0,
+            cout=item['cout'] or 0,
+            pleins=item['pleins'],
+            prix_litre_total=item['prix'] or 0,
+            kilometrage_min=item['km_min'],
+            kilometrage_max=item['km_max'],
+        )
+        for item in FuelLog.objects.order_by().values('vehicle_id').annotate(
+            litres=Sum('litres'), cout=Sum('cout'), pleins=Count('id'), prix=Sum('prix_litre'),
+            km_min=Min('kilometrage', filter=odometer), km_max=Max('kilometrage', filter=odometer),
+        )
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0020_tableversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleFuelStats',
+            fields=[
+                ('vehicle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fuel_stats', serialize=False, to='fleet.vehicle')),
+                ('litres', models.FloatField(default=0)),
+                ('cout', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pleins', models.PositiveIntegerField(default=0)),
+                ('prix_litre_total', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+                ('kilometrage_min', models.FloatField(blank=True, null=True)),
+                ('kilometrage_max', models.FloatField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='fuellog',
+            index=models.Index(fields=['vehicle', 'date'], name='fleet_fuel_vehicle_date_idx'),
+        ),
+        migrations.RunPython(backfill_fuel_stats, migrations.RunPython.noop),
+    ]
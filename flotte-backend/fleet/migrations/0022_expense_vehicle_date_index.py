@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0021_vehiclefuelstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['vehicle', 'date'], name='fleet_expense_vehicle_date_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:49
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0022_expense_vehicle_date_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_debut', models.DateField()),
+                ('date_fin', models.DateField()),
+                ('vehicle_ids', models.JSONField(blank=True, null=True)),
+                ('actifs_seulement', models.BooleanField(default=False)),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('terminee', 'Terminée'), ('echec', 'Échec')], default='en_attente', max_length=20)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('traites', models.PositiveIntegerField(default=0)),
+                ('erreur', models.TextField(blank=True)),
+                ('date_creation', models.DateTimeField(default=django.utils.timezone.now)),
+                ('demarre_le', models.DateTimeField(blank=True, null=True)),
+                ('termine_le', models.DateTimeField(blank=True, null=True)),
+                ('cree_par', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='financialreport',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rapports', to='fleet.reportbatch'),
+        ),
+    ]
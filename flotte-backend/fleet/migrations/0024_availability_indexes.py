@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0023_reportbatch'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='affectation',
+            index=models.Index(fields=['vehicle', 'date_debut', 'date_fin'], name='fleet_affect_vehicle_span_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='affectation',
+            index=models.Index(fields=['driver', 'date_debut', 'date_fin'], name='fleet_affect_driver_span_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['vehicle', 'date_depart', 'date_arrivee'], name='fleet_mission_vehicle_span_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['driver', 'date_depart', 'date_arrivee'], name='fleet_mission_driver_span_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0024_availability_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PositionCompaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=100, unique=True)),
+                ('compacte_jusqu_a', models.DateTimeField()),
+                ('intervalle', models.PositiveIntegerField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0025_positioncompaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportbatch',
+            name='maj_le',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
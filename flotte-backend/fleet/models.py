@@ -2,7 +2,9 @@
 
 from django.db import models
 from django.contrib.auth.models import User, Group
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db import transaction
+from django.core.cache import cache
 from django.dispatch import receiver
 from django.utils import timezone
 import uuid
@@ -89,14 +91,11 @@ class Vehicle(models.Model):
 
     @property
     def consommation_moyenne(self):
-        pleins = FuelLog.objects.filter(vehicle=self).order_by('date')
-        if len(pleins) < 2:
+        # Lue dans les totaux cumulés (VehicleFuelStats) plutôt que sur tous les pleins
+        try:
+            return self.fuel_stats.consommation
+        except VehicleFuelStats.DoesNotExist:
             return 0
-        total_km = pleins.last().kilometrage - pleins.first().kilometrage
-        total_litres = sum(plein.litres for plein in pleins)
-        if total_km == 0:
-            return 0
-        return (total_litres * 100) / total_km
 
 class Driver(models.Model):
     user_profile = models.OneToOneField(UserProfile, on_delete=models.CASCADE, related_name='driver')
@@ -168,6 +167,11 @@ class Expense(models.Model):
     justificatif = models.FileField(upload_to='expenses/', null=True, blank=True)
     kilometrage = models.FloatField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['vehicle', 'date'], name='fleet_expense_vehicle_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.vehicle} - {self.type} ({self.date})"
 
@@ -182,6 +186,11 @@ class FuelLog(models.Model):
     station = models.CharField(max_length=100, blank=True)
     commentaire = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['vehicle', 'date'], name='fleet_fuel_vehicle_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.vehicle} - {self.litres}L le {self.date}"
 
@@ -194,6 +203,9 @@ class Alert(models.Model):
     code = models.CharField(max_length=8, default=generate_code, unique=True)
     vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='alertes', null=True, blank=True)
     driver = models.ForeignKey(Driver, on_delete=models.CASCADE, related_name='alertes', null=True, blank=True)
+    # Document à l'origine de l'alerte ; DocumentAdministratif est déclaré plus bas dans ce module
+    document = models.ForeignKey('DocumentAdministratif', on_delete=models.CASCADE, related_name='alertes',
+                                 null=True, blank=True)
     type_alerte = models.CharField(max_length=50, choices=[
         ('entretien', 'Entretien à venir'),
         ('assurance', 'Assurance expirée'),
@@ -253,6 +265,13 @@ class Mission(models.Model):
         default='en_attente',
     )
 
+    class Meta:
+        # Chevauchements par ressource (fleet.availability)
+        indexes = [
+            models.Index(fields=['vehicle', 'date_depart', 'date_arrivee'], name='fleet_mission_vehicle_span_idx'),
+            models.Index(fields=['driver', 'date_depart', 'date_arrivee'], name='fleet_mission_driver_span_idx'),
+        ]
+
     def __str__(self):
         return f"{self.raison} ({self.date_depart.date()})"
 
@@ -268,6 +287,9 @@ class FinancialReport(models.Model):
     kilometrage_debut = models.FloatField()
     kilometrage_fin = models.FloatField()
     consommation_moyenne = models.FloatField()
+    # Lot de génération à l'origine du rapport ; ReportBatch est déclaré juste en dessous
+    batch = models.ForeignKey('ReportBatch', on_delete=models.SET_NULL, related_name='rapports',
+                              null=True, blank=True)
 
     def __str__(self):
         return f"Rapport {self.vehicle} ({self.date_debut} - {self.date_fin})"
@@ -281,6 +303,45 @@ class FinancialReport(models.Model):
     def kilometrage_total(self):
         return self.kilometrage_fin - self.kilometrage_debut
 
+class ReportBatch(models.Model):
+    """
+    Génération des rapports financiers d'une période pour toute la flotte ou
+    une sélection de véhicules, exécutée hors requête par
+    fleet.reports.run_report_batch ; ``traites`` sur ``total`` donne l'avancement.
+    """
+    STATUT_CHOICES = [
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('terminee', 'Terminée'),
+        ('echec', 'Échec'),
+    ]
+    date_debut = models.DateField()
+    date_fin = models.DateField()
+    # Véhicules à traiter ; None pour toute la flotte
+    vehicle_ids = models.JSONField(null=True, blank=True)
+    actifs_seulement = models.BooleanField(default=False)
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='en_attente')
+    total = models.PositiveIntegerField(default=0)
+    traites = models.PositiveIntegerField(default=0)
+    erreur = models.TextField(blank=True)
+    cree_par = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    date_creation = models.DateTimeField(default=timezone.now)
+    demarre_le = models.DateTimeField(null=True, blank=True)
+    # Signe de vie de l'exécutant, mis à jour à chaque paquet enregistré
+    maj_le = models.DateTimeField(null=True, blank=True)
+    termine_le = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Lot de rapports {self.date_debut} - {self.date_fin} ({self.statut})"
+
+    def vehicles(self):
+        queryset = Vehicle.objects.order_by('pk')
+        if self.vehicle_ids is not None:
+            queryset = queryset.filter(pk__in=self.vehicle_ids)
+        if self.actifs_seulement:
+            queryset = queryset.filter(actif=True)
+        return queryset
+
 class DocumentAdministratif(models.Model):
     code = models.CharField(max_length=8, default=generate_code, unique=True)
     vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='documents')
@@ -329,6 +390,12 @@ class Affectation(models.Model):
     date_affectation = models.DateTimeField(auto_now_add=True)
     heure_affectation = models.TimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['vehicle', 'date_debut', 'date_fin'], name='fleet_affect_vehicle_span_idx'),
+            models.Index(fields=['driver', 'date_debut', 'date_fin'], name='fleet_affect_driver_span_idx'),
+        ]
+
     def __str__(self):
         return f"{self.vehicle} ➝ {self.driver} ({self.date_debut})"
 
@@ -376,9 +443,10 @@ class Historique(models.Model):
 
 class VehiclePosition(models.Model):
     vehicle = models.ForeignKey('Vehicle', on_delete=models.CASCADE, related_name='positions')
-    latitude = models.DecimalField(max_digits=9, decimal_places=6)
-    longitude = models.DecimalField(max_digits=9, decimal_places=6)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    # Horodatage de réception : les positions WebSocket sont écrites en différé
+    timestamp = models.DateTimeField(default=timezone.now)
     speed = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     heading = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     battery_level = models.IntegerField(null=True, blank=True)
@@ -386,18 +454,251 @@ class VehiclePosition(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['vehicle', '-timestamp'], name='fleet_vpos_vehicle_ts_idx'),
+            models.Index(fields=['timestamp'], name='fleet_vpos_ts_idx'),
+        ]
 
     def __str__(self):
         return f"{self.vehicle} - {self.timestamp}"
 
 class Position(models.Model):
     driver = models.ForeignKey(Driver, on_delete=models.CASCADE, related_name='positions')
-    latitude = models.DecimalField(max_digits=9, decimal_places=6)
-    longitude = models.DecimalField(max_digits=9, decimal_places=6)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    # Horodatage fourni par l'appareil quand les positions sont envoyées par lots
+    timestamp = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['driver', '-timestamp'], name='fleet_pos_driver_ts_idx'),
+            models.Index(fields=['timestamp'], name='fleet_pos_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.driver} - {self.latitude}, {self.longitude} @ {self.timestamp}"
+
+class DriverLastPosition(models.Model):
+    """Dernière position enregistrée de chaque conducteur, mise à jour à chaque réception."""
+    driver = models.OneToOneField(Driver, on_delete=models.CASCADE, related_name='last_position')
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    timestamp = models.DateTimeField()
+    # Dernière position reçue, même si elle a été écartée par le filtre d'ingestion
+    last_seen = models.DateTimeField(null=True, blank=True)
+    # Renseigné tant que les positions reçues restent autour de la dernière enregistrée
+    stationary_since = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.driver} - {self.latitude}, {self.longitude} @ {self.timestamp}"
+
+class PositionCompaction(models.Model):
+    """
+    Avancement de compact_positions par table d'historique : les positions
+    antérieures à ``compacte_jusqu_a`` ont déjà été sous-échantillonnées avec
+    l'intervalle ``intervalle`` (secondes) et ne sont pas relues.
+    """
+    table = models.CharField(max_length=100, unique=True)
+    compacte_jusqu_a = models.DateTimeField()
+    intervalle = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.table} : {self.compacte_jusqu_a}"
+
+class VehicleDailyStats(models.Model):
+    """
+    Totaux journaliers par véhicule (carburant, dépenses par type, kilomètres
+    de mission, entretien), recalculés par fleet.rollup à chaque modification
+    des données sources et lus par les endpoints de statistiques.
+    """
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    carburant_litres = models.FloatField(default=0)
+    carburant_cout = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    carburant_pleins = models.PositiveIntegerField(default=0)
+    # Somme des prix au litre des pleins, pour la moyenne non pondérée de consumption_stats
+    carburant_prix_litre_total = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    depense_carburant = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    depense_entretien = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    depense_assurance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    depense_peage = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    depense_amende = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    depense_autre = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    kilometres = models.FloatField(default=0)
+    entretien_cout = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['vehicle', 'date'], name='unique_vehicle_daily_stats'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='fleet_vdstats_date_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.driver} - {self.latitude}, {self.longitude} @ {self.timestamp}"
\ No newline at end of file
+        return f"{self.vehicle} - {self.date}"
+
+    @property
+    def total_depenses(self):
+        return (self.depense_carburant + self.depense_entretien + self.depense_assurance +
+                self.depense_peage + self.depense_amende + self.depense_autre)
+
+class VehicleFuelStats(models.Model):
+    """
+    Totaux carburant cumulés d'un véhicule, tenus à jour à chaque plein par
+    fleet.fuel : la consommation se lit en une requête quel que soit
+    l'historique. Les kilométrages nuls (non saisis) sont ignorés.
+    """
+    vehicle = models.OneToOneField(Vehicle, on_delete=models.CASCADE, primary_key=True, related_name='fuel_stats')
+    litres = models.FloatField(default=0)
+    cout = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pleins = models.PositiveIntegerField(default=0)
+    prix_litre_total = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+    kilometrage_min = models.FloatField(null=True, blank=True)
+    kilometrage_max = models.FloatField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.vehicle} - {self.litres}L ({self.pleins} pleins)"
+
+    @property
+    def consommation(self):
+        from .fuel import consumption
+        return consumption(self.litres, self.pleins, self.kilometrage_min, self.kilometrage_max)
+
+class TableVersion(models.Model):
+    """
+    Compteur de version par table, incrémenté à chaque écriture (signaux) et
+    lu par fleet.conditional pour calculer ETag et Last-Modified des listes.
+    """
+    table = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
+
+def bump_table_version(model):
+    """Incrémente la version de la table de ``model`` (à appeler après un update ou bulk_create)."""
+    table = model._meta.label_lower
+    now = timezone.now()
+    updated = TableVersion.objects.filter(table=table).update(version=models.F('version') + 1, updated_at=now)
+    if not updated:
+        TableVersion.objects.bulk_create(
+            [TableVersion(table=table, version=1, updated_at=now)], ignore_conflicts=True
+        )
+
+# Cache de l'instantané renvoyé par dashboard_stats, vidé à chaque modification des tables comptées
+DASHBOARD_STATS_CACHE_KEY = 'fleet:dashboard_stats'
+
+@receiver([post_save, post_delete], sender=Vehicle)
+@receiver([post_save, post_delete], sender=Driver)
+@receiver([post_save, post_delete], sender=Mission)
+@receiver([post_save, post_delete], sender=Alert)
+@receiver([post_save, post_delete], sender=Expense)
+@receiver([post_save, post_delete], sender=FuelLog)
+def invalidate_dashboard_stats(sender, **kwargs):
+    cache.delete(DASHBOARD_STATS_CACHE_KEY)
+
+# Tables agrégées dans VehicleDailyStats : la ligne du jour est recalculée après le commit
+@receiver(pre_save, sender=FuelLog)
+@receiver(pre_save, sender=Expense)
+@receiver(pre_save, sender=Entretien)
+@receiver(pre_save, sender=Maintenance)
+@receiver(pre_save, sender=Mission)
+def remember_daily_stats_key(sender, instance, **kwargs):
+    from .rollup import rollup_key
+    previous = sender.objects.filter(pk=instance.pk).first() if instance.pk else None
+    instance._previous_rollup_key = rollup_key(previous) if previous else None
+
+@receiver([post_save, post_delete], sender=FuelLog)
+@receiver([post_save, post_delete], sender=Expense)
+@receiver([post_save, post_delete], sender=Entretien)
+@receiver([post_save, post_delete], sender=Maintenance)
+@receiver([post_save, post_delete], sender=Mission)
+def update_daily_stats(sender, instance, **kwargs):
+    from .rollup import recompute_daily_stats, rollup_key
+    keys = {rollup_key(instance), getattr(instance, '_previous_rollup_key', None)} - {None}
+    transaction.on_commit(lambda: recompute_daily_stats(keys))
+
+# Champs dont dépendent les alertes d'échéance (voir fleet.alerts) : seule une
+# modification de ces champs déclenche une réévaluation limitée à l'objet
+ALERT_FIELDS = {
+    Vehicle: ('assurance_expiration', 'visite_technique', 'marque', 'modele', 'immatriculation'),
+    Driver: ('date_expiration_permis', 'statut'),
+    DocumentAdministratif: ('date_expiration', 'type_document', 'vehicle_id'),
+}
+ALERT_SCOPES = {Vehicle: 'vehicles', Driver: 'drivers', DocumentAdministratif: 'documents'}
+
+@receiver(pre_save, sender=Vehicle)
+@receiver(pre_save, sender=Driver)
+@receiver(pre_save, sender=DocumentAdministratif)
+def remember_alert_fields(sender, instance, **kwargs):
+    fields = ALERT_FIELDS[sender]
+    instance._previous_alert_fields = (
+        sender.objects.filter(pk=instance.pk).values_list(*fields).first() if instance.pk else None
+    )
+
+@receiver(post_save, sender=Vehicle)
+@receiver(post_save, sender=Driver)
+@receiver(post_save, sender=DocumentAdministratif)
+def reevaluate_alerts(sender, instance, **kwargs):
+    current = tuple(getattr(instance, field) for field in ALERT_FIELDS[sender])
+    if current == getattr(instance, '_previous_alert_fields', None):
+        return
+    from .alerts import evaluate_and_notify
+    scope = {'vehicles': [], 'drivers': [], 'documents': []}
+    scope[ALERT_SCOPES[sender]] = [instance.pk]
+    transaction.on_commit(lambda: evaluate_and_notify(**scope))
+
+# Tables servies par les viewsets de fleet : leur version change à chaque écriture
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=UserProfile)
+@receiver([post_save, post_delete], sender=Vehicle)
+@receiver([post_save, post_delete], sender=Driver)
+@receiver([post_save, post_delete], sender=Assignment)
+@receiver([post_save, post_delete], sender=Maintenance)
+@receiver([post_save, post_delete], sender=FuelLog)
+@receiver([post_save, post_delete], sender=Alert)
+@receiver([post_save, post_delete], sender=Mission)
+@receiver([post_save, post_delete], sender=Expense)
+@receiver([post_save, post_delete], sender=FinancialReport)
+@receiver([post_save, post_delete], sender=DocumentAdministratif)
+@receiver([post_save, post_delete], sender=Entretien)
+@receiver([post_save, post_delete], sender=Rapport)
+@receiver([post_save, post_delete], sender=CommentaireEcart)
+@receiver([post_save, post_delete], sender=Historique)
+def update_table_version(sender, **kwargs):
+    bump_table_version(sender)
+
+# Réponses mises en cache par fleet.response_cache : invalidées à chaque écriture
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=UserProfile)
+@receiver([post_save, post_delete], sender=Vehicle)
+@receiver([post_save, post_delete], sender=Driver)
+@receiver([post_save, post_delete], sender=Mission)
+@receiver([post_save, post_delete], sender=Expense)
+@receiver([post_save, post_delete], sender=Alert)
+@receiver([post_save, post_delete], sender=Affectation)
+# Planning de l'app affectations, qui importe ce module : référence paresseuse
+@receiver([post_save, post_delete], sender='affectations.Affectation')
+def invalidate_response_cache(sender, **kwargs):
+    from .response_cache import invalidate_cached_responses
+    invalidate_cached_responses(sender)
+
+# Totaux carburant par véhicule : un nouveau plein s'ajoute, une modification ou
+# une suppression recalcule le véhicule (et l'ancien véhicule si le plein a changé)
+@receiver(post_save, sender=FuelLog)
+def update_fuel_stats(sender, instance, created, **kwargs):
+    from .fuel import record_fuel_log, recompute_fuel_stats
+    if created:
+        record_fuel_log(instance)
+        return
+    previous = getattr(instance, '_previous_rollup_key', None)
+    recompute_fuel_stats({instance.vehicle_id, previous[0] if previous else instance.vehicle_id})
+
+@receiver(post_delete, sender=FuelLog)
+def remove_fuel_stats(sender, instance, **kwargs):
+    from .fuel import recompute_fuel_stats
+    recompute_fuel_stats([instance.vehicle_id])
@@ -0,0 +1,31 @@
+# fleet/pagination.py
+
+from rest_framework.pagination import CursorPagination
+
+
+class PositionHistoryPagination(CursorPagination):
+    """Pagination par curseur de l'historique GPS, du plus ancien au plus récent."""
+    page_size = 500
+    page_size_query_param = 'page_size'
+    max_page_size = 5000
+    ordering = 'timestamp'
+
+
+class ApiCursorPagination(CursorPagination):
+    """
+    Pagination par défaut des listes de l'API, activée à la demande.
+
+    Les applications existantes attendent une liste complète : la pagination
+    ne s'applique que si la requête porte ?cursor= ou ?page_size=. La réponse
+    devient alors {"next", "previous", "results"}.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = '-pk'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
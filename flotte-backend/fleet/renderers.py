@@ -0,0 +1,41 @@
+# fleet/renderers.py
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def dumps(data):
+    """
+    Encode ``data`` en JSON compact (bytes), avec orjson s'il est installé.
+
+    Les dates, Decimal et autres types non natifs passent par l'encodeur de
+    DRF : le texte produit est identique à celui de JSONRenderer.
+    """
+    if orjson is None:
+        return JSONRenderer().render(data)
+    ret = orjson.dumps(
+        data,
+        default=_encoder.default,
+        option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+    )
+    # Comme JSONRenderer : U+2028 et U+2029 sont échappés pour rester du JavaScript valide
+    return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer rendu par orjson, sauf si une indentation est demandée."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if orjson is None or self.get_indent(accepted_media_type or '', renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
@@ -0,0 +1,225 @@
+# fleet/reports.py
+
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import DecimalField, F, FloatField, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .models import Entretien, Expense, FinancialReport, FuelLog, ReportBatch, Vehicle, bump_table_version
+
+logger = logging.getLogger(__name__)
+
+# Colonne de FinancialReport alimentée par chaque type de dépense ; les types
+# absents (entretien, assurance) ne figurent pas dans le rapport
+REPORT_EXPENSE_FIELDS = {
+    'carburant': 'total_carburant',
+    'peage': 'total_peages',
+    'amende': 'total_amendes',
+    'autre': 'total_autre',
+}
+
+
+def _window_sum(queryset, field, output_field):
+    return Subquery(
+        queryset.order_by().values('vehicle').annotate(total=Sum(field)).values('total'),
+        output_field=output_field,
+    )
+
+
+def _window_kilometrage(fuel_logs, ordering):
+    return Subquery(fuel_logs.order_by(*ordering).values('kilometrage')[:1], output_field=FloatField())
+
+
+def report_totals_many(vehicles, date_debut, date_fin):
+    """
+    Totaux des rapports financiers de plusieurs véhicules en deux requêtes : les
+    véhicules annotés de la fenêtre carburant et de l'entretien, puis les
+    dépenses groupées par véhicule et par type. ``vehicles`` est un queryset
+    de Vehicle ; retourne {véhicule: champs du rapport}.
+    """
+    fuel_logs = FuelLog.objects.filter(vehicle=OuterRef('pk'), date__range=[date_debut, date_fin])
+    entretiens = Entretien.objects.filter(vehicle=OuterRef('pk'), date_entretien__range=[date_debut, date_fin])
+    vehicles = list(vehicles.annotate(
+        window_litres=_window_sum(fuel_logs, 'litres', FloatField()),
+        window_debut=_window_kilometrage(fuel_logs, ('date', 'kilometrage')),
+        window_fin=_window_kilometrage(fuel_logs, ('-date', '-kilometrage')),
+        window_entretien=_window_sum(entretiens, 'cout', DecimalField(max_digits=12, decimal_places=2)),
+    ))
+    if not vehicles:
+        return {}
+
+    expenses = {}
+    for row in Expense.objects.filter(
+        vehicle_id__in=[vehicle.pk for vehicle in vehicles], type__in=REPORT_EXPENSE_FIELDS,
+        date__range=[date_debut, date_fin],
+    ).order_by().values('vehicle_id', 'type').annotate(total=Sum('montant')):
+        expenses.setdefault(row['vehicle_id'], {})[REPORT_EXPENSE_FIELDS[row['type']]] = row['total'] or 0
+
+    results = {}
+    for vehicle in vehicles:
+        # Sans plein sur la période, le compteur du véhicule sert de début et de fin
+        kilometrage_debut = vehicle.window_debut if vehicle.window_debut is not None else vehicle.kilometrage
+        kilometrage_fin = vehicle.window_fin if vehicle.window_fin is not None else vehicle.kilometrage
+        kilometrage_parcouru = kilometrage_fin - kilometrage_debut
+        total_litres = vehicle.window_litres or 0
+        results[vehicle] = {
+            **dict.fromkeys(REPORT_EXPENSE_FIELDS.values(), 0),
+            **expenses.get(vehicle.pk, {}),
+            'total_entretien': vehicle.window_entretien or 0,
+            'kilometrage_debut': kilometrage_debut,
+            'kilometrage_fin': kilometrage_fin,
+            'consommation_moyenne': (total_litres * 100) / kilometrage_parcouru if kilometrage_parcouru > 0 else 0,
+        }
+    return results
+
+
+def report_totals(vehicle_id, date_debut, date_fin):
+    """Retourne (véhicule, champs du rapport), ou None si le véhicule n'existe pas."""
+    results = report_totals_many(Vehicle.objects.filter(pk=vehicle_id), date_debut, date_fin)
+    return next(iter(results.items()), None)
+
+
+def generate_report(vehicle_id, date_debut, date_fin):
+    """Crée le FinancialReport de la période (trois requêtes) ; None si le véhicule n'existe pas."""
+    result = report_totals(vehicle_id, date_debut, date_fin)
+    if result is None:
+        return None
+    vehicle, totals = result
+    return FinancialReport.objects.create(vehicle=vehicle, date_debut=date_debut, date_fin=date_fin, **totals)
+
+
+def _chunk_totals(vehicle_ids, date_debut, date_fin):
+    results = report_totals_many(Vehicle.objects.filter(pk__in=vehicle_ids), date_debut, date_fin)
+    return [(vehicle.pk, totals) for vehicle, totals in results.items()]
+
+
+def _init_worker():
+    django.setup()
+
+
+def _worker_chunk_totals(vehicle_ids, date_debut, date_fin):
+    """Calcul d'un paquet de véhicules dans un processus du pool (lecture seule)."""
+    try:
+        return _chunk_totals(vehicle_ids, date_debut, date_fin)
+    finally:
+        connections.close_all()
+
+
+def _chunks(vehicle_ids, size):
+    for start in range(0, len(vehicle_ids), size):
+        yield vehicle_ids[start:start + size]
+
+
+def run_report_batch(batch_id, workers=None, chunk_size=None):
+    """
+    Exécute un ReportBatch en attente : les totaux sont calculés par paquets de
+    ``chunk_size`` véhicules (deux requêtes par paquet), éventuellement répartis
+    sur ``workers`` processus, puis les rapports de chaque paquet sont insérés
+    en un bulk_create et l'avancement mis à jour. Retourne le lot, ou None s'il
+    n'était plus en attente (déjà pris par un autre exécutant).
+    """
+    workers = workers or getattr(settings, 'REPORT_BATCH_WORKERS', 1)
+    chunk_size = chunk_size or getattr(settings, 'REPORT_BATCH_CHUNK_SIZE', 200)
+    now = timezone.now()
+    if not ReportBatch.objects.filter(pk=batch_id, statut='en_attente').update(
+        statut='en_cours', demarre_le=now, maj_le=now
+    ):
+        return None
+    batch = ReportBatch.objects.get(pk=batch_id)
+    try:
+        vehicle_ids = list(batch.vehicles().values_list('pk', flat=True))
+        ReportBatch.objects.filter(pk=batch_id).update(total=len(vehicle_ids))
+        chunks = list(_chunks(vehicle_ids, chunk_size))
+        if workers > 1 and len(chunks) > 1:
+            # Les processus fils ouvrent leurs propres connexions
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [
+                    pool.submit(_worker_chunk_totals, chunk, batch.date_debut, batch.date_fin) for chunk in chunks
+                ]
+                for future in futures:
+                    _save_chunk(batch, future.result())
+        else:
+            for chunk in chunks:
+                _save_chunk(batch, _chunk_totals(chunk, batch.date_debut, batch.date_fin))
+    except BatchReclaimed:
+        logger.warning('Lot de rapports %s repris par un autre exécutant', batch_id)
+    except Exception as e:
+        logger.exception('Échec du lot de rapports %s', batch_id)
+        _running(batch).update(statut='echec', erreur=str(e), termine_le=timezone.now())
+    else:
+        _running(batch).update(statut='terminee', termine_le=timezone.now())
+    batch.refresh_from_db()
+    return batch
+
+
+class BatchReclaimed(Exception):
+    """Le lot a été remis en attente (voir reclaim_stale_batches) pendant son exécution."""
+
+
+def _running(batch):
+    # L'exécution en cours est identifiée par son heure de démarrage : un lot
+    # repris puis relancé ailleurs n'est plus modifié par l'exécutant d'origine
+    return ReportBatch.objects.filter(pk=batch.pk, statut='en_cours', demarre_le=batch.demarre_le)
+
+
+def _save_chunk(batch, rows):
+    with transaction.atomic():
+        if not _running(batch).update(traites=F('traites') + len(rows), maj_le=timezone.now()):
+            raise BatchReclaimed(batch.pk)
+        FinancialReport.objects.bulk_create([
+            FinancialReport(vehicle_id=vehicle_id, batch=batch, date_debut=batch.date_debut,
+                            date_fin=batch.date_fin, **totals)
+            for vehicle_id, totals in rows
+        ], batch_size=500)
+        # bulk_create ne déclenche pas les signaux qui versionnent la table
+        bump_table_version(FinancialReport)
+
+
+def reclaim_stale_batches():
+    """
+    Remet en attente les lots en cours dont l'exécutant ne donne plus signe de
+    vie (thread perdu au redémarrage du serveur) : aucun paquet enregistré
+    depuis REPORT_BATCH_STALE_AFTER secondes. Un lot long qui progresse n'est
+    pas repris. Les rapports déjà insérés sont supprimés et la reprise repart
+    de zéro. Retourne le nombre de lots remis en attente.
+    """
+    limit = timezone.now() - timedelta(seconds=getattr(settings, 'REPORT_BATCH_STALE_AFTER', 3600))
+    with transaction.atomic():
+        batch_ids = list(ReportBatch.objects.select_for_update().filter(
+            # Lots démarrés avant l'ajout de maj_le : seule l'heure de démarrage est connue
+            Q(maj_le__lt=limit) | Q(maj_le__isnull=True, demarre_le__lt=limit), statut='en_cours',
+        ).values_list('pk', flat=True))
+        if not batch_ids:
+            return 0
+        FinancialReport.objects.filter(batch_id__in=batch_ids).delete()
+        ReportBatch.objects.filter(pk__in=batch_ids).update(
+            statut='en_attente', traites=0, demarre_le=None, maj_le=None
+        )
+    return len(batch_ids)
+
+
+def start_report_batch(batch):
+    """
+    Lance le lot après le commit de sa création : dans un thread si
+    REPORT_BATCH_ASYNC est vrai (par défaut), sinon immédiatement.
+    """
+    def run():
+        try:
+            run_report_batch(batch.pk)
+        finally:
+            connections.close_all()
+
+    def start():
+        if getattr(settings, 'REPORT_BATCH_ASYNC', True):
+            threading.Thread(target=run, name=f'report-batch-{batch.pk}', daemon=True).start()
+        else:
+            run_report_batch(batch.pk)
+
+    transaction.on_commit(start)
@@ -0,0 +1,154 @@
+# fleet/response_cache.py
+
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+# Tables lues par chaque endpoint mis en cache : une écriture sur l'une d'elles
+# (signaux de fleet.models, écritures en masse) invalide toutes ses réponses
+RESPONSE_CACHE_DEPENDENCIES = {
+    'available_vehicles': ('fleet.mission', 'fleet.affectation', 'affectations.affectation', 'fleet.vehicle'),
+    'available_drivers': ('fleet.mission', 'fleet.affectation', 'affectations.affectation', 'fleet.driver',
+                          'fleet.userprofile', 'auth.user'),
+    'recent_activities': ('fleet.mission', 'fleet.alert', 'fleet.expense', 'fleet.vehicle',
+                          'fleet.driver', 'auth.user'),
+    'vehicle_statistiques': ('fleet.vehicle', 'fleet.vehicledailystats'),
+}
+
+PREFIX = 'fleet:response'
+
+
+def _namespace_key(endpoint):
+    return f'{PREFIX}:ns:{endpoint}'
+
+
+def _namespaces(endpoints):
+    """
+    Version courante de chaque endpoint. Une version absente (jamais créée ou
+    évincée du cache) est réinitialisée à une valeur neuve, pour ne jamais
+    retomber sur des réponses enregistrées sous une ancienne version.
+    """
+    keys = {_namespace_key(endpoint): endpoint for endpoint in endpoints}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        cache.add(key, time.time_ns(), timeout=None)
+        found[key] = cache.get(key)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def _role(user):
+    if not user.is_authenticated:
+        return 'anonyme'
+    if user.is_superuser:
+        return 'admin'
+    profile = getattr(user, 'profile', None)
+    return profile.role if profile is not None else ''
+
+
+def response_key(endpoint, request):
+    """Clé d'une réponse : endpoint, version de l'endpoint, rôle et paramètres de requête."""
+    params = sorted((key, value) for key in request.query_params for value in request.query_params.getlist(key))
+    digest = hashlib.md5(repr(params).encode(), usedforsecurity=False).hexdigest()
+    version = _namespaces([endpoint])[endpoint]
+    return f'{PREFIX}:{endpoint}:{version}:{_role(request.user)}:{digest}'
+
+
+def _count(endpoint, outcome):
+    key = f'{PREFIX}:stats:{endpoint}:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def cached_response(endpoint):
+    """
+    Met en cache les réponses 200 d'une vue GET (fonction @api_view ou action de
+    viewset) pendant RESPONSE_CACHE_TTL secondes ; les tables dont dépend
+    l'endpoint sont déclarées dans RESPONSE_CACHE_DEPENDENCIES.
+    """
+    if endpoint not in RESPONSE_CACHE_DEPENDENCIES:
+        raise ValueError(f'Dépendances non déclarées pour {endpoint}')
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            request = next(arg for arg in args if isinstance(arg, Request))
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+            key = response_key(endpoint, request)
+            data = cache.get(key)
+            if data is not None:
+                _count(endpoint, 'hits')
+                return Response(data)
+            _count(endpoint, 'misses')
+            response = view(*args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, getattr(settings, 'RESPONSE_CACHE_TTL', 300))
+            return response
+        return wrapper
+    return decorator
+
+
+def invalidate_cached_responses(model):
+    """
+    Invalide les réponses des endpoints qui lisent la table de ``model``, après
+    le commit de la transaction en cours (immédiatement hors transaction) : une
+    requête lue avant le commit ne peut pas remettre l'ancien état en cache
+    sous la nouvelle version.
+    """
+    table = model._meta.label_lower
+    endpoints = [endpoint for endpoint, tables in RESPONSE_CACHE_DEPENDENCIES.items() if table in tables]
+    if endpoints:
+        transaction.on_commit(lambda: _bump_namespaces(endpoints))
+
+
+def _bump_namespaces(endpoints):
+    for endpoint in endpoints:
+        key = _namespace_key(endpoint)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def local_cache_warning():
+    """
+    Avertissement des commandes qui écrivent hors du serveur web : avec
+    LocMemCache, chaque processus a son propre cache et leurs invalidations
+    n'atteignent pas celui du serveur. None si le cache est partagé.
+    """
+    if isinstance(caches['default'], LocMemCache):
+        return (
+            'Cache local au processus (LocMemCache) : les réponses et le tableau de bord mis en cache '
+            'par le serveur web ne seront pas invalidés par cette commande. Définir CACHE_REDIS_URL '
+            'pour partager le cache.'
+        )
+    return None
+
+
+def cache_statistics():
+    """Succès et échecs du cache par endpoint, depuis le démarrage du cache."""
+    keys = [
+        f'{PREFIX}:stats:{endpoint}:{outcome}'
+        for endpoint in RESPONSE_CACHE_DEPENDENCIES for outcome in ('hits', 'misses')
+    ]
+    counters = cache.get_many(keys)
+    stats = {}
+    for endpoint in RESPONSE_CACHE_DEPENDENCIES:
+        hits = counters.get(f'{PREFIX}:stats:{endpoint}:hits', 0)
+        misses = counters.get(f'{PREFIX}:stats:{endpoint}:misses', 0)
+        stats[endpoint] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+    return stats
@@ -0,0 +1,155 @@
+# fleet/rollup.py
+
+import operator
+from decimal import Decimal
+from functools import reduce
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import DASHBOARD_STATS_CACHE_KEY, Entretien, Expense, FuelLog, Maintenance, Mission, VehicleDailyStats
+from .response_cache import invalidate_cached_responses
+
+# Colonne de VehicleDailyStats pour chaque type de dépense
+EXPENSE_FIELDS = {type_depense: f'depense_{type_depense}' for type_depense, _ in Expense.TYPE_CHOICES}
+# Expression du total des dépenses d'une ligne journalière, tous types confondus
+EXPENSES_TOTAL = reduce(operator.add, (F(field) for field in EXPENSE_FIELDS.values()))
+TOTAL_FIELDS = [
+    'carburant_litres', 'carburant_cout', 'carburant_pleins', 'carburant_prix_litre_total',
+    *EXPENSE_FIELDS.values(), 'kilometres', 'entretien_cout',
+]
+
+
+def rollup_key(instance):
+    """(vehicle_id, date) de la ligne journalière concernée par un enregistrement source."""
+    if isinstance(instance, Mission):
+        value = instance.date_depart
+        if isinstance(value, str):
+            value = parse_datetime(value)
+        if value is not None and timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return instance.vehicle_id, value.date() if value is not None else None
+    value = instance.date_entretien if isinstance(instance, Entretien) else instance.date
+    if isinstance(value, str):
+        value = parse_date(value)
+    return instance.vehicle_id, value
+
+
+def _collect(vehicle_ids=None, dates=None, start=None, end=None):
+    """
+    Agrège les tables sources par (vehicle_id, date), une requête groupée par
+    table. Les filtres sont optionnels : liste de véhicules, liste de dates ou
+    intervalle [start, end].
+    """
+    def scope(date_field):
+        q = Q()
+        if vehicle_ids is not None:
+            q &= Q(vehicle_id__in=vehicle_ids)
+        if dates is not None:
+            q &= Q(**{f'{date_field}__in': dates})
+        if start is not None:
+            q &= Q(**{f'{date_field}__gte': start})
+        if end is not None:
+            q &= Q(**{f'{date_field}__lte': end})
+        return q
+
+    totals = {}
+
+    def row(vehicle_id, day):
+        return totals.setdefault((vehicle_id, day), {})
+
+    for item in FuelLog.objects.filter(scope('date')).order_by().values('vehicle_id', 'date').annotate(
+        litres=Sum('litres'), cout=Sum('cout'), pleins=Count('id'), prix=Sum('prix_litre')
+    ):
+        values = row(item['vehicle_id'], item['date'])
+        values['carburant_litres'] = item['litres'] or 0
+        values['carburant_cout'] = item['cout'] or 0
+        values['carburant_pleins'] = item['pleins']
+        values['carburant_prix_litre_total'] = item['prix'] or 0
+
+    for item in Expense.objects.filter(scope('date')).order_by().values('vehicle_id', 'date', 'type').annotate(
+        montant=Sum('montant')
+    ):
+        field = EXPENSE_FIELDS.get(item['type'], 'depense_autre')
+        values = row(item['vehicle_id'], item['date'])
+        values[field] = values.get(field, 0) + (item['montant'] or 0)
+
+    for item in Entretien.objects.filter(scope('date_entretien')).order_by().values(
+        'vehicle_id', 'date_entretien'
+    ).annotate(cout=Sum('cout')):
+        values = row(item['vehicle_id'], item['date_entretien'])
+        values['entretien_cout'] = values.get('entretien_cout', 0) + (item['cout'] or 0)
+
+    for item in Maintenance.objects.filter(scope('date')).order_by().values('vehicle_id', 'date').annotate(
+        cout=Sum('cout')
+    ):
+        values = row(item['vehicle_id'], item['date'])
+        values['entretien_cout'] = values.get('entretien_cout', 0) + Decimal(str(item['cout'] or 0))
+
+    missions = Mission.objects.annotate(jour=TruncDate('date_depart')).filter(scope('jour'))
+    for item in missions.order_by().values('vehicle_id', 'jour').annotate(distance=Sum('distance_km')):
+        row(item['vehicle_id'], item['jour'])['kilometres'] = item['distance'] or 0
+
+    return totals
+
+
+def _upsert(totals):
+    VehicleDailyStats.objects.bulk_create(
+        [
+            VehicleDailyStats(vehicle_id=vehicle_id, date=day, **values)
+            for (vehicle_id, day), values in totals.items()
+        ],
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['vehicle', 'date'],
+        update_fields=TOTAL_FIELDS,
+    )
+
+
+def recompute_daily_stats(keys):
+    """Recalcule les lignes journalières des couples (vehicle_id, date) donnés."""
+    keys = {key for key in keys if key[0] is not None and key[1] is not None}
+    if not keys:
+        return
+    totals = _collect(
+        vehicle_ids={vehicle_id for vehicle_id, _ in keys},
+        dates={day for _, day in keys},
+    )
+    totals = {key: {field: values.get(field, 0) for field in TOTAL_FIELDS}
+              for key, values in totals.items() if key in keys}
+    empty = keys - totals.keys()
+    if empty:
+        query = Q()
+        for vehicle_id, day in empty:
+            query |= Q(vehicle_id=vehicle_id, date=day)
+        VehicleDailyStats.objects.filter(query).delete()
+    _upsert(totals)
+    _invalidate()
+
+
+def rebuild_daily_stats(start=None, end=None, vehicle_ids=None):
+    """Reconstruit toutes les lignes d'une période ; retourne le nombre de lignes écrites."""
+    existing = VehicleDailyStats.objects.all()
+    if vehicle_ids is not None:
+        existing = existing.filter(vehicle_id__in=vehicle_ids)
+    if start is not None:
+        existing = existing.filter(date__gte=start)
+    if end is not None:
+        existing = existing.filter(date__lte=end)
+    totals = _collect(vehicle_ids=vehicle_ids, start=start, end=end)
+    with transaction.atomic():
+        existing.delete()
+        _upsert({key: {field: values.get(field, 0) for field in TOTAL_FIELDS} for key, values in totals.items()})
+    _invalidate()
+    return len(totals)
+
+
+def _invalidate():
+    # Le tableau de bord lit les lignes journalières : son instantané, mis en
+    # cache entre l'écriture source et ce recalcul, est vidé une fois les lignes à jour
+    invalidate_cached_responses(VehicleDailyStats)
+    cache.delete(DASHBOARD_STATS_CACHE_KEY)
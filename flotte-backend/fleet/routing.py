@@ -5,4 +5,6 @@ from . import consumers
 
 websocket_urlpatterns = [
     re_path(r'ws/vehicle/(?P<vehicle_id>\w+)/$', consumers.VehicleConsumer.as_asgi()),
+    re_path(r'ws/fleet/$', consumers.FleetConsumer.as_asgi()),
+    re_path(r'ws/alerts/$', consumers.AlertConsumer.as_asgi()),
 ] 
\ No newline at end of file
@@ -18,11 +18,45 @@ from .models import (
     Rapport,
     CommentaireEcart,
     Historique,
-    Position
+    Position,
+    ReportBatch
 )
 from django.contrib.auth.models import User, Group
 from django.core.exceptions import ObjectDoesNotExist
 
+class SparseFieldsMixin:
+    """
+    Réponses allégées à la demande, pour les requêtes GET uniquement.
+
+    ?fields=id,statut ne garde que les champs listés. ?expand=vehicle_details
+    ne garde, parmi les champs imbriqués, que ceux listés (?expand= vide
+    renvoie seulement les identifiants). Sans ces paramètres la réponse est
+    inchangée. Seul le sérialiseur racine de la vue est concerné.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        params = request.query_params
+        fields = _split_param(params.get('fields'))
+        expand = _split_param(params.get('expand'))
+        if fields is None and expand is None:
+            return
+        for name, field in list(self.fields.items()):
+            nested = isinstance(field, serializers.BaseSerializer)
+            if fields is not None and name not in fields and not (nested and expand and name in expand):
+                self.fields.pop(name)
+            elif nested and expand is not None and name not in expand:
+                self.fields.pop(name)
+
+
+def _split_param(value):
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -54,27 +88,34 @@ class UserSerializer(serializers.ModelSerializer):
             instance.set_password(password)
         return super().update(instance, validated_data)
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class ProfilePhotoField(serializers.ImageField):
+    """URL absolue de la photo de profil, chaîne vide sans photo (lecture seule)."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return ''
+        request = self.context.get('request')
+        url = value.url
+        if request is not None:
+            if not url.startswith('http'):
+                return request.build_absolute_uri(url)
+            return url
+        if url.startswith('/'):
+            return f'http://localhost:8000{url}'
+        return url
+
+class UserProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer()
-    photo = serializers.SerializerMethodField()
+    photo = ProfilePhotoField()
 
     class Meta:
         model = UserProfile
         fields = ['id', 'user', 'telephone', 'adresse', 'photo', 'role']
 
-    def get_photo(self, obj):
-        request = self.context.get('request')
-        if obj.photo:
-            url = obj.photo.url
-            if request is not None:
-                if not url.startswith('http'):
-                    return request.build_absolute_uri(url)
-                return url
-            if url.startswith('/'):
-                return f'http://localhost:8000{url}'
-            return url
-        return ''
-
     def create(self, validated_data):
         user_data = validated_data.pop('user')
         user = UserSerializer().create(user_data)
@@ -113,7 +154,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         user.save()
         return instance
 
-class DriverSerializer(serializers.ModelSerializer):
+class DriverSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user_profile = UserProfileSerializer(read_only=True)
     user_profile_id = serializers.PrimaryKeyRelatedField(
         queryset=UserProfile.objects.all(), write_only=True, required=False
@@ -182,7 +223,7 @@ class DriverSerializer(serializers.ModelSerializer):
         else:
             raise serializers.ValidationError("user Powered by xAIprofile_id ou user_profile_data requis")
 
-class VehicleSerializer(serializers.ModelSerializer):
+class VehicleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Vehicle
         fields = [
@@ -193,7 +234,7 @@ class VehicleSerializer(serializers.ModelSerializer):
             'photo', 'notes', 'traccar_id'
         ]
 
-class DocumentAdministratifSerializer(serializers.ModelSerializer):
+class DocumentAdministratifSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     vehicle_details = VehicleSerializer(source='vehicle', read_only=True)
 
     class Meta:
@@ -201,7 +242,7 @@ class DocumentAdministratifSerializer(serializers.ModelSerializer):
         fields = ['id', 'code', 'vehicle', 'vehicle_details', 'numero_document',
                  'type_document', 'date_emission', 'date_expiration', 'fichier']
 
-class EntretienSerializer(serializers.ModelSerializer):
+class EntretienSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     vehicle_details = VehicleSerializer(source='vehicle', read_only=True)
 
     class Meta:
@@ -209,7 +250,7 @@ class EntretienSerializer(serializers.ModelSerializer):
         fields = ['id', 'code', 'vehicle', 'vehicle_details', 'type_entretien',
                  'date_entretien', 'cout', 'commentaires', 'kilometrage', 'garage']
 
-class AlertSerializer(serializers.ModelSerializer):
+class AlertSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     vehicle = serializers.SerializerMethodField()
     driver = serializers.SerializerMethodField()
 
@@ -227,7 +268,7 @@ class AlertSerializer(serializers.ModelSerializer):
             return str(obj.driver)
         return None
 
-class AffectationSerializer(serializers.ModelSerializer):
+class AffectationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     vehicle_details = VehicleSerializer(source='vehicle', read_only=True)
     driver_details = DriverSerializer(source='driver', read_only=True)
 
@@ -237,7 +278,7 @@ class AffectationSerializer(serializers.ModelSerializer):
                  'driver_details', 'date_debut', 'date_fin', 'statut',
                  'date_affectation', 'heure_affectation']
 
-class MissionSerializer(serializers.ModelSerializer):
+class MissionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     vehicle_details = VehicleSerializer(source='vehicle', read_only=True)
     driver_details = DriverSerializer(source='driver', read_only=True)
 
@@ -283,7 +324,7 @@ class MissionSerializer(serializers.ModelSerializer):
 
         return data
 
-class RapportSerializer(serializers.ModelSerializer):
+class RapportSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     auteur_details = UserProfileSerializer(source='auteur', read_only=True)
 
     class Meta:
@@ -291,7 +332,7 @@ class RapportSerializer(serializers.ModelSerializer):
         fields = ['id', 'code', 'titre', 'description', 'type_rapport',
                  'date_rapport', 'auteur', 'auteur_details', 'fichier']
 
-class CommentaireEcartSerializer(serializers.ModelSerializer):
+class CommentaireEcartSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     mission_details = MissionSerializer(source='mission', read_only=True)
     utilisateur_details = UserProfileSerializer(source='utilisateur', read_only=True)
 
@@ -300,7 +341,7 @@ class CommentaireEcartSerializer(serializers.ModelSerializer):
         fields = ['id', 'code', 'mission', 'mission_details', 'utilisateur',
                  'utilisateur_details', 'commentaire', 'date_commentaire']
 
-class HistoriqueSerializer(serializers.ModelSerializer):
+class HistoriqueSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     vehicle_details = VehicleSerializer(source='vehicle', read_only=True)
     utilisateur_details = UserProfileSerializer(source='utilisateur', read_only=True)
 
@@ -315,17 +356,17 @@ class AssignmentSerializer(serializers.ModelSerializer):
         model = Assignment
         fields = '__all__'
 
-class MaintenanceSerializer(serializers.ModelSerializer):
+class MaintenanceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Maintenance
         fields = '__all__'
 
-class ExpenseSerializer(serializers.ModelSerializer):
+class ExpenseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Expense
         fields = '__all__'
 
-class FuelLogSerializer(serializers.ModelSerializer):
+class FuelLogSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     prix_litre = serializers.DecimalField(max_digits=5, decimal_places=3, read_only=True)
     vehicle_details = VehicleSerializer(source='vehicle', read_only=True)
     driver_details = DriverSerializer(source='driver', read_only=True)
@@ -334,7 +375,7 @@ class FuelLogSerializer(serializers.ModelSerializer):
         model = FuelLog
         fields = '__all__'
 
-class FinancialReportSerializer(serializers.ModelSerializer):
+class FinancialReportSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     total_depenses = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     kilometrage_total = serializers.FloatField(read_only=True)
     vehicle_details = VehicleSerializer(source='vehicle', read_only=True)
@@ -343,7 +384,41 @@ class FinancialReportSerializer(serializers.ModelSerializer):
         model = FinancialReport
         fields = '__all__'
 
+class ReportBatchSerializer(serializers.ModelSerializer):
+    vehicle_ids = serializers.ListField(child=serializers.IntegerField(), allow_null=True, required=False,
+                                        allow_empty=False)
+    progression = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportBatch
+        fields = '__all__'
+        read_only_fields = ['statut', 'total', 'traites', 'erreur', 'cree_par', 'date_creation',
+                            'demarre_le', 'maj_le', 'termine_le']
+
+    def get_progression(self, obj):
+        return round(obj.traites / obj.total, 3) if obj.total else None
+
+    def validate(self, data):
+        if data['date_debut'] > data['date_fin']:
+            raise serializers.ValidationError({'date_fin': "La date de fin précède la date de début."})
+        return data
+
+POSITION_COORDINATES_KWARGS = {
+    'latitude': {'min_value': -90, 'max_value': 90},
+    'longitude': {'min_value': -180, 'max_value': 180},
+}
+
 class PositionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Position
-        fields = ['id', 'driver', 'latitude', 'longitude', 'timestamp']
\ No newline at end of file
+        fields = ['id', 'driver', 'latitude', 'longitude', 'timestamp']
+        extra_kwargs = POSITION_COORDINATES_KWARGS
+
+class PositionBulkItemSerializer(serializers.ModelSerializer):
+    """Position d'un lot : le conducteur est validé en une seule requête par la vue."""
+    driver = serializers.IntegerField(source='driver_id', required=False)
+
+    class Meta:
+        model = Position
+        fields = ['driver', 'latitude', 'longitude', 'timestamp']
+        extra_kwargs = POSITION_COORDINATES_KWARGS
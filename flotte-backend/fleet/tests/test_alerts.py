@@ -0,0 +1,110 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from io import StringIO
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from fleet.alerts import evaluate_alerts
+from fleet.models import DASHBOARD_STATS_CACHE_KEY, Vehicle, Driver, Alert, DocumentAdministratif
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username='admin1', password='testpass123', first_name='Awa', last_name='Koné')
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+@pytest.fixture
+def today():
+    return timezone.localdate()
+
+@pytest.fixture
+def vehicle(today):
+    return Vehicle.objects.create(
+        marque='Toyota', modele='Hilux', immatriculation='AB-123-CD', kilometrage=0,
+        assurance_expiration=today + timedelta(days=20),
+        visite_technique=today + timedelta(days=200),
+    )
+
+@pytest.mark.django_db
+class TestAlertEngine:
+    def test_creates_expected_alerts(self, user, vehicle, today, settings, tmp_path,
+                                     django_assert_max_num_queries):
+        settings.MEDIA_ROOT = tmp_path
+        Driver.objects.create(user_profile=user.profile, numero_permis='P-0001',
+                              date_expiration_permis=today + timedelta(days=3))
+        DocumentAdministratif.objects.create(
+            vehicle=vehicle, numero_document='D-1', type_document='carte_grise',
+            date_emission=today - timedelta(days=365), date_expiration=today - timedelta(days=1),
+            fichier=ContentFile(b'x', name='carte.pdf'),
+        )
+        # 8 requêtes pour l'évaluation, plus la version de la table des alertes
+        with django_assert_max_num_queries(9):
+            result = evaluate_alerts(today)
+        assert len(result['created']) == 3
+        alerts = {a.type_alerte: a for a in Alert.objects.filter(resolue=False)}
+        assert alerts['assurance'].niveau == 'warning'
+        assert alerts['permis'].niveau == 'critique'
+        assert 'Awa Koné' in alerts['permis'].message
+        assert alerts['carte_grise'].document is not None
+
+    def test_regeneration_keeps_and_resolves(self, vehicle, today):
+        evaluate_alerts(today)
+        alert = Alert.objects.get(type_alerte='assurance', resolue=False)
+
+        result = evaluate_alerts(today + timedelta(days=15))
+        assert result['created'] == [] and result['resolved'] == 0
+        alert.refresh_from_db()
+        assert alert.niveau == 'critique' and not alert.resolue
+
+        vehicle.assurance_expiration = today + timedelta(days=365)
+        vehicle.save()
+        result = evaluate_alerts(today)
+        assert result['resolved'] == 1
+        alert.refresh_from_db()
+        assert alert.resolue
+
+    def test_clears_dashboard_stats(self, vehicle, today):
+        cache.set(DASHBOARD_STATS_CACHE_KEY, {'alertes_actives': 0})
+        evaluate_alerts(today)
+        assert cache.get(DASHBOARD_STATS_CACHE_KEY) is None
+
+    def test_manual_alerts_untouched(self, vehicle, today):
+        manual = Alert.objects.create(vehicle=vehicle, type_alerte='entretien', message='Vidange à prévoir')
+        evaluate_alerts(today)
+        manual.refresh_from_db()
+        assert not manual.resolue
+
+    def test_generate_requires_post(self, api_client, vehicle):
+        assert api_client.get('/api/alerts/generate/').status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+        response = api_client.post('/api/alerts/generate/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['created'] == 1
+
+@pytest.mark.django_db
+class TestAlertScheduling:
+    def test_save_reevaluates_only_changed_vehicle(self, vehicle, today, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            vehicle.notes = 'RAS'
+            vehicle.save()
+        # Seule l'invalidation du cache de réponses suit le commit : aucune réévaluation
+        assert not Alert.objects.exists()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            vehicle.visite_technique = today + timedelta(days=2)
+            vehicle.save()
+        alert = Alert.objects.get(type_alerte='controle_technique', resolue=False)
+        assert alert.vehicle == vehicle and alert.niveau == 'critique'
+
+    def test_run_alerts_once(self, vehicle):
+        out = StringIO()
+        call_command('run_alerts', once=True, stdout=out)
+        assert '1 créées' in out.getvalue()
+        assert Alert.objects.filter(resolue=False).count() == 1
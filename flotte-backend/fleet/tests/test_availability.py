@@ -0,0 +1,133 @@
+import pytest
+from datetime import date, datetime, timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from affectations.models import Affectation as Planification
+from fleet.availability import bookings, free_in_windows, free_resources, free_slots
+from fleet.models import Vehicle, Driver, Mission, Affectation
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+@pytest.fixture
+def admin():
+    return User.objects.create_superuser(username='admin1', password='testpass123')
+
+@pytest.fixture
+def api_client(admin):
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    return client
+
+@pytest.fixture
+def vehicles():
+    return [
+        Vehicle.objects.create(marque='Toyota', modele='Hilux', immatriculation=f'AB-{i:03d}-CD', kilometrage=0)
+        for i in range(4)
+    ]
+
+@pytest.fixture
+def driver():
+    user = User.objects.create_user(username='conducteur1', password='testpass123')
+    return Driver.objects.create(user_profile=user.profile, numero_permis='P-0001')
+
+def at(day, hour=0):
+    return timezone.make_aware(datetime(2030, 1, day, hour))
+
+@pytest.mark.django_db
+class TestAvailability:
+    def test_all_booking_sources(self, vehicles, driver):
+        v_mission, v_open, v_affectation, v_planning = vehicles
+        Mission.objects.create(vehicle=v_mission, driver=driver, date_depart=at(10, 8), date_arrivee=at(10, 12))
+        Mission.objects.create(vehicle=v_open, driver=driver, date_depart=at(5), date_arrivee=None)
+        Affectation.objects.create(vehicle=v_affectation, driver=driver, date_debut=date(2030, 1, 10),
+                                   date_fin=date(2030, 1, 10))
+        Planification.objects.create(vehicule=v_planning, conducteur=driver, date_debut=at(10, 11),
+                                     date_fin=at(10, 14))
+
+        libres = set(free_resources('vehicle', at(10, 9), at(10, 10)).values_list('pk', flat=True))
+        assert libres == {v_planning.pk}
+        # Après la mission, hors de l'affectation à la journée
+        libres = set(free_resources('vehicle', at(11, 9), at(11, 10)).values_list('pk', flat=True))
+        assert libres == {v_mission.pk, v_affectation.pk, v_planning.pk}
+        assert not free_resources('driver', at(10, 9), at(10, 10)).exists()
+
+    def test_ignored_bookings(self, vehicles, driver):
+        Mission.objects.create(vehicle=vehicles[0], driver=driver, date_depart=at(10, 8), date_arrivee=at(10, 12),
+                               statut='refusee')
+        Mission.objects.create(vehicle=vehicles[1], driver=driver, date_depart=at(1), statut='terminee')
+        Affectation.objects.create(vehicle=vehicles[2], driver=driver, date_debut=date(2030, 1, 1), statut='termine')
+        assert free_resources('vehicle', at(10, 9), at(10, 10)).count() == 4
+
+    def test_many_windows_single_query(self, vehicles, driver, django_assert_num_queries):
+        Mission.objects.create(vehicle=vehicles[0], driver=driver, date_depart=at(10, 8), date_arrivee=at(10, 12))
+        Planification.objects.create(vehicule=vehicles[1], conducteur=driver, date_debut=at(12, 8),
+                                     date_fin=at(12, 12))
+        windows = [(at(10, 9), at(10, 10)), (at(12, 9), at(12, 10)), (at(15), at(16))]
+        with django_assert_num_queries(1):
+            libres = free_in_windows('vehicle', windows)
+        ids = {v.pk for v in vehicles}
+        assert libres == [ids - {vehicles[0].pk}, ids - {vehicles[1].pk}, ids]
+
+    def test_slots(self, vehicles, driver, django_assert_num_queries):
+        vehicle = vehicles[0]
+        Mission.objects.create(vehicle=vehicle, driver=driver, date_depart=at(10, 8), date_arrivee=at(10, 12))
+        Planification.objects.create(vehicule=vehicle, conducteur=driver, date_debut=at(10, 11), date_fin=at(10, 14))
+        Affectation.objects.create(vehicle=vehicle, driver=driver, date_debut=date(2030, 1, 12),
+                                   date_fin=date(2030, 1, 12))
+        Mission.objects.create(vehicle=vehicle, driver=driver, date_depart=at(13, 20), date_arrivee=None)
+
+        with django_assert_num_queries(1):
+            reservations = bookings('vehicle', vehicle.pk, at(10), at(15))
+        assert [source for source, _, _ in reservations] == ['mission', 'planning', 'affectation', 'mission']
+        assert reservations[2][1:] == (at(12), at(13))
+        assert free_slots('vehicle', vehicle.pk, at(10), at(15)) == [
+            (at(10), at(10, 8)), (at(10, 14), at(12)), (at(13), at(13, 20)),
+        ]
+        assert free_slots('vehicle', vehicle.pk, at(10), at(15), timedelta(hours=21)) == [(at(10, 14), at(12))]
+
+    def test_available_endpoints_use_engine(self, api_client, vehicles, driver):
+        params = {'date_debut': at(10, 9).isoformat(), 'date_fin': at(10, 10).isoformat()}
+        assert len(api_client.get(reverse('available_vehicles'), params).data) == 4
+        Planification.objects.create(vehicule=vehicles[0], conducteur=driver, date_debut=at(10, 8),
+                                     date_fin=at(10, 12))
+        response = api_client.get(reverse('available_vehicles'), {**params, 'fields': 'id'})
+        assert response.data == [{'id': v.pk} for v in vehicles[1:]]
+        # Le planning invalide aussi le cache des conducteurs
+        assert api_client.get(reverse('available_drivers'), params).data == []
+        response = api_client.get(reverse('available_vehicles'), {'date_debut': params['date_fin'],
+                                                                  'date_fin': params['date_debut']})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_availability_endpoint(self, api_client, vehicles, driver):
+        Mission.objects.create(vehicle=vehicles[0], driver=driver, date_depart=at(10, 8), date_arrivee=at(10, 12))
+        url = reverse('availability', kwargs={'kind': 'vehicle'})
+        response = api_client.get(url + '?fenetre={},{}&fenetre={},{}'.format(
+            at(10, 9).isoformat().replace('+', '%2B'), at(10, 10).isoformat().replace('+', '%2B'),
+            at(11).isoformat().replace('+', '%2B'), at(12).isoformat().replace('+', '%2B'),
+        ))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data[0]['libres'] == [v.pk for v in vehicles[1:]]
+        assert response.data[1]['libres'] == [v.pk for v in vehicles]
+        assert api_client.get(url).status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get(url, {'fenetre': 'x,y'}).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_slots_endpoint(self, api_client, vehicles, driver):
+        now = timezone.now()
+        Mission.objects.create(vehicle=vehicles[0], driver=driver, date_depart=now + timedelta(days=1),
+                               date_arrivee=now + timedelta(days=2))
+        url = reverse('availability_slots', kwargs={'kind': 'vehicle', 'pk': vehicles[0].pk})
+        response = api_client.get(url, {'days': 3})
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['reservations']) == 1
+        assert len(response.data['creneaux']) == 2
+        missing = reverse('availability_slots', kwargs={'kind': 'driver', 'pk': driver.pk + 100})
+        assert api_client.get(missing).status_code == status.HTTP_404_NOT_FOUND
+        assert api_client.get(url, {'days': 0}).status_code == status.HTTP_400_BAD_REQUEST
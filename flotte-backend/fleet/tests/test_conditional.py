@@ -0,0 +1,74 @@
+import pytest
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APIClient
+from fleet.alerts import evaluate_alerts
+from fleet.models import Vehicle, Driver, Mission, TableVersion
+from django.utils import timezone
+
+@pytest.fixture
+def admin():
+    return User.objects.create_superuser(username='admin1', password='testpass123')
+
+@pytest.fixture
+def api_client(admin):
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    return client
+
+@pytest.fixture
+def vehicle():
+    return Vehicle.objects.create(marque='Toyota', modele='Hilux', immatriculation='AB-123-CD', kilometrage=0)
+
+@pytest.fixture
+def driver():
+    user = User.objects.create_user(username='conducteur1', password='testpass123')
+    return Driver.objects.create(user_profile=user.profile, numero_permis='P-0001')
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    def test_unchanged_list_returns_304_in_one_query(self, api_client, vehicle, django_assert_num_queries):
+        response = api_client.get('/api/vehicles/')
+        assert response.status_code == status.HTTP_200_OK
+        etag = response['ETag']
+        assert response['Last-Modified']
+
+        with django_assert_num_queries(1):
+            response = api_client.get('/api/vehicles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+        assert not response.content
+
+    def test_write_changes_etag(self, api_client, vehicle):
+        etag = api_client.get('/api/vehicles/')['ETag']
+        vehicle.kilometrage = 1000
+        vehicle.save()
+        response = api_client.get('/api/vehicles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+    def test_nested_tables_invalidate(self, api_client, vehicle, driver):
+        Mission.objects.create(vehicle=vehicle, driver=driver, raison='Livraison')
+        etag = api_client.get('/api/missions/')['ETag']
+        user = driver.user_profile.user
+        user.first_name = 'Awa'
+        user.save()
+        assert api_client.get('/api/missions/', HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_etag_depends_on_query_and_user(self, api_client, vehicle, driver):
+        etag = api_client.get('/api/vehicles/')['ETag']
+        assert api_client.get('/api/vehicles/', {'fields': 'id'})['ETag'] != etag
+        other = APIClient()
+        other.force_authenticate(user=driver.user_profile.user)
+        assert other.get('/api/vehicles/', HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_retrieve_and_if_modified_since(self, api_client, vehicle):
+        response = api_client.get(f'/api/vehicles/{vehicle.id}/')
+        response = api_client.get(f'/api/vehicles/{vehicle.id}/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_bulk_alert_evaluation_bumps_version(self, vehicle):
+        before = TableVersion.objects.filter(table='fleet.alert').values_list('version', flat=True).first() or 0
+        Vehicle.objects.filter(pk=vehicle.pk).update(assurance_expiration=timezone.localdate())
+        evaluate_alerts()
+        assert TableVersion.objects.get(table='fleet.alert').version > before
@@ -0,0 +1,205 @@
+import pytest
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from fleet.live import FLEET_GROUP, fleet_message, driver_update
+from fleet.alerts import evaluate_and_notify
+from fleet.models import Vehicle, VehiclePosition, Driver, DriverLastPosition
+from fleet.routing import websocket_urlpatterns
+from fleet.consumers import VehicleConsumer
+
+@pytest.fixture
+def in_memory_layer(settings):
+    settings.CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+@pytest.fixture
+def vehicle():
+    return Vehicle.objects.create(marque='Toyota', modele='Hilux', immatriculation='AB-123-CD', kilometrage=0)
+
+def communicator(path):
+    return WebsocketCommunicator(URLRouter(websocket_urlpatterns), path)
+
+@pytest.mark.django_db(transaction=True)
+class TestVehicleConsumer:
+    def test_broadcast_then_write_behind(self, in_memory_layer, settings, vehicle):
+        settings.VEHICLE_POSITION_BUFFER_SIZE = 100
+        settings.VEHICLE_POSITION_FLUSH_INTERVAL = 60
+
+        async def scenario():
+            ws = communicator(f'/ws/vehicle/{vehicle.id}/')
+            connected, _ = await ws.connect()
+            assert connected
+            for i in range(3):
+                await ws.send_json_to({'latitude': 5.0 + i, 'longitude': -4.0, 'speed': 30})
+                assert (await ws.receive_json_from())['latitude'] == 5.0 + i
+            stored_before_disconnect = await VehiclePosition.objects.acount()
+            await ws.disconnect()
+            return stored_before_disconnect
+
+        assert async_to_sync(scenario)() == 0
+        positions = VehiclePosition.objects.filter(vehicle=vehicle).order_by('timestamp')
+        assert [p.latitude for p in positions] == [5.0, 6.0, 7.0]
+
+    def test_flush_when_buffer_full(self, in_memory_layer, settings, vehicle):
+        settings.VEHICLE_POSITION_BUFFER_SIZE = 2
+        settings.VEHICLE_POSITION_FLUSH_INTERVAL = 60
+
+        async def scenario():
+            ws = communicator(f'/ws/vehicle/{vehicle.id}/')
+            await ws.connect()
+            for i in range(2):
+                await ws.send_json_to({'latitude': 5.0 + i, 'longitude': -4.0})
+                await ws.receive_json_from()
+            await ws.receive_nothing()
+            stored = await VehiclePosition.objects.acount()
+            await ws.disconnect()
+            return stored
+
+        assert async_to_sync(scenario)() == 2
+
+    def test_stationary_fixes_broadcast_but_not_stored(self, in_memory_layer, vehicle):
+        async def scenario():
+            ws = communicator(f'/ws/vehicle/{vehicle.id}/')
+            await ws.connect()
+            for i in range(5):
+                await ws.send_json_to({'latitude': 5.0 + i * 0.00001, 'longitude': -4.0})
+                await ws.receive_json_from()
+            await ws.disconnect()
+
+        async_to_sync(scenario)()
+        assert VehiclePosition.objects.filter(vehicle=vehicle).count() == 1
+
+    def test_invalid_fields_nulled_or_rejected(self, in_memory_layer, vehicle):
+        async def scenario():
+            ws = communicator(f'/ws/vehicle/{vehicle.id}/')
+            await ws.connect()
+            await ws.send_json_to({'latitude': 'nord', 'longitude': -4.0})
+            error = await ws.receive_json_from()
+            await ws.send_json_to({'latitude': 5.0, 'longitude': -4.0, 'speed': 123456,
+                                   'heading': 'est', 'battery_level': 87.6})
+            position = await ws.receive_json_from()
+            await ws.disconnect()
+            return error, position
+
+        error, position = async_to_sync(scenario)()
+        assert error['type'] == 'error'
+        assert position['speed'] is None and position['heading'] is None
+        stored = VehiclePosition.objects.get(vehicle=vehicle)
+        assert stored.speed is None and stored.heading is None
+        assert stored.battery_level == 88
+
+    def test_failed_batch_retried_row_by_row(self, vehicle):
+        consumer = VehicleConsumer()
+        consumer.vehicle_id = vehicle.id
+        now = timezone.now()
+        positions = [
+            VehiclePosition(vehicle_id=vehicle.id, latitude=5.0, longitude=-4.0, timestamp=now),
+            VehiclePosition(vehicle_id=vehicle.id, latitude=None, longitude=-4.0, timestamp=now),
+            VehiclePosition(vehicle_id=vehicle.id, latitude=5.2, longitude=-4.0, timestamp=now),
+        ]
+        async_to_sync(consumer.save_vehicle_positions)(positions)
+        assert sorted(VehiclePosition.objects.values_list('latitude', flat=True)) == [5.0, 5.2]
+
+    def test_unknown_vehicle_rejected(self, in_memory_layer):
+        async def scenario():
+            connected, _ = await communicator('/ws/vehicle/999999/').connect()
+            return connected
+
+        assert async_to_sync(scenario)() is False
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username='dispatcher', password='testpass123')
+
+@pytest.mark.django_db(transaction=True)
+class TestFleetConsumer:
+    def test_snapshot_and_coalesced_updates(self, in_memory_layer, settings, user, vehicle):
+        driver = Driver.objects.create(user_profile=user.profile, numero_permis='P-0001')
+        DriverLastPosition.objects.create(driver=driver, latitude=5.3, longitude=-4.0, timestamp=timezone.now())
+        token = str(RefreshToken.for_user(user).access_token)
+
+        async def scenario():
+            ws = communicator(f'/ws/fleet/?token={token}&bbox=-4.5,5.0,-3.5,5.5')
+            connected, _ = await ws.connect()
+            assert connected
+            snapshot = await ws.receive_json_from()
+
+            layer = get_channel_layer()
+            for latitude in (5.31, 5.32, 5.33):
+                await layer.group_send(FLEET_GROUP, fleet_message(
+                    [driver_update(driver.id, latitude, -4.0, timezone.now())]
+                ))
+            await layer.group_send(FLEET_GROUP, fleet_message(
+                [driver_update(driver.id + 1, 48.8, 2.3, timezone.now())]
+            ))
+            # Position envoyée par un véhicule sur son propre WebSocket
+            vehicle_ws = communicator(f'/ws/vehicle/{vehicle.id}/')
+            await vehicle_ws.connect()
+            await vehicle_ws.send_json_to({'latitude': 5.4, 'longitude': -4.1})
+            await vehicle_ws.receive_json_from()
+
+            update = await ws.receive_json_from(timeout=2)
+            await vehicle_ws.disconnect()
+            await ws.disconnect()
+            return snapshot, update
+
+        snapshot, update = async_to_sync(scenario)()
+        assert snapshot['type'] == 'snapshot'
+        assert [p['id'] for p in snapshot['positions']] == [driver.id]
+        assert update['type'] == 'positions'
+        by_kind = {p['kind']: p for p in update['positions']}
+        assert len(update['positions']) == 2
+        assert by_kind['driver']['latitude'] == 5.33
+        assert by_kind['vehicle']['id'] == vehicle.id
+
+    def test_invalid_messages_keep_socket_open(self, in_memory_layer, user):
+        token = str(RefreshToken.for_user(user).access_token)
+
+        async def scenario():
+            ws = communicator(f'/ws/fleet/?token={token}')
+            await ws.connect()
+            await ws.receive_json_from()
+            replies = []
+            for message in ('pas du json', '5', '{"bbox": 5}', '{"bbox": "1,2"}'):
+                await ws.send_to(text_data=message)
+                replies.append(await ws.receive_json_from())
+            await ws.send_json_to({'bbox': '-4.5,5.0,-3.5,5.5'})
+            snapshot = await ws.receive_json_from()
+            await ws.disconnect()
+            return replies, snapshot
+
+        replies, snapshot = async_to_sync(scenario)()
+        assert [reply['type'] for reply in replies] == ['error'] * 4
+        assert snapshot['type'] == 'snapshot'
+
+    def test_anonymous_rejected(self, in_memory_layer):
+        async def scenario():
+            connected, _ = await communicator('/ws/fleet/').connect()
+            return connected
+
+        assert async_to_sync(scenario)() is False
+
+@pytest.mark.django_db(transaction=True)
+class TestAlertConsumer:
+    def test_critical_alerts_pushed(self, in_memory_layer, user, vehicle):
+        token = str(RefreshToken.for_user(user).access_token)
+        # update() ne déclenche pas la réévaluation : l'alerte est créée par le passage complet
+        Vehicle.objects.filter(pk=vehicle.pk).update(assurance_expiration=timezone.localdate())
+
+        async def scenario():
+            ws = communicator(f'/ws/alerts/?token={token}')
+            connected, _ = await ws.connect()
+            assert connected
+            await database_sync_to_async(evaluate_and_notify)()
+            message = await ws.receive_json_from(timeout=2)
+            await ws.disconnect()
+            return message
+
+        message = async_to_sync(scenario)()
+        assert message['type'] == 'alerts'
+        assert [a['type_alerte'] for a in message['alerts']] == ['assurance']
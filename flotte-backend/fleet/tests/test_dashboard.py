@@ -0,0 +1,114 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from django.core.management import call_command
+from io import StringIO
+from fleet.models import DASHBOARD_STATS_CACHE_KEY, Vehicle, Driver, Alert, Expense, FuelLog, Entretien, VehicleDailyStats
+from fleet.rollup import rebuild_daily_stats
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username='admin1', password='testpass123')
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+@pytest.fixture
+def vehicle():
+    return Vehicle.objects.create(marque='Toyota', modele='Hilux', immatriculation='AB-123-CD', kilometrage=0)
+
+@pytest.mark.django_db
+class TestDashboardStats:
+    def test_aggregates_in_two_queries(self, api_client, user, vehicle, django_assert_num_queries,
+                                       django_capture_on_commit_callbacks):
+        Vehicle.objects.create(marque='Renault', modele='Clio', immatriculation='EF-456-GH', kilometrage=0, actif=False)
+        Driver.objects.create(user_profile=user.profile, numero_permis='P-0001')
+        Alert.objects.create(vehicle=vehicle, type_alerte='assurance', message='Assurance expirée', niveau='critique')
+        today = timezone.localdate()
+        with django_capture_on_commit_callbacks(execute=True):
+            Expense.objects.create(vehicle=vehicle, type='peage', montant=Decimal('1500.00'), date=today)
+            Expense.objects.create(vehicle=vehicle, type='peage', montant=Decimal('900.00'),
+                                   date=today - timedelta(days=60))
+            FuelLog.objects.create(vehicle=vehicle, date=today, litres=40, cout=Decimal('3000.00'), kilometrage=1000)
+
+        with django_assert_num_queries(2):
+            response = api_client.get(reverse('dashboard_stats'))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['vehicles'] == {'total': 2, 'active': 1}
+        assert response.data['drivers'] == {'total': 1, 'active': 1}
+        assert response.data['alerts'] == {'total': 1, 'critical': 1}
+        assert response.data['finances']['recent_expenses'] == 1500.0
+        assert response.data['finances']['recent_fuel'] == 3000.0
+
+        with django_assert_num_queries(0):
+            api_client.get(reverse('dashboard_stats'))
+
+    def test_cache_invalidated_on_save(self, api_client, vehicle):
+        assert api_client.get(reverse('dashboard_stats')).data['vehicles']['total'] == 1
+        Vehicle.objects.create(marque='Renault', modele='Clio', immatriculation='EF-456-GH', kilometrage=0)
+        assert api_client.get(reverse('dashboard_stats')).data['vehicles']['total'] == 2
+
+@pytest.mark.django_db
+class TestVehicleDailyStats:
+    def test_rollup_follows_source_changes(self, vehicle, django_capture_on_commit_callbacks):
+        today = timezone.localdate()
+        with django_capture_on_commit_callbacks(execute=True):
+            FuelLog.objects.create(vehicle=vehicle, date=today, litres=40, cout=Decimal('3000.00'))
+            FuelLog.objects.create(vehicle=vehicle, date=today, litres=20, cout=Decimal('1600.00'))
+            expense = Expense.objects.create(vehicle=vehicle, type='amende', montant=Decimal('500.00'), date=today)
+            Entretien.objects.create(vehicle=vehicle, type_entretien='vidange', date_entretien=today,
+                                     cout=Decimal('250.00'), commentaires='', kilometrage=0, garage='Garage')
+        row = VehicleDailyStats.objects.get(vehicle=vehicle, date=today)
+        assert row.carburant_litres == 60
+        assert row.carburant_cout == Decimal('4600.00')
+        assert row.depense_amende == Decimal('500.00')
+        assert row.entretien_cout == Decimal('250.00')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            expense.date = today - timedelta(days=1)
+            expense.save()
+        row.refresh_from_db()
+        assert row.depense_amende == 0
+        assert VehicleDailyStats.objects.get(date=today - timedelta(days=1)).depense_amende == Decimal('500.00')
+
+    def test_recompute_clears_dashboard_stats(self, vehicle, django_capture_on_commit_callbacks):
+        today = timezone.localdate()
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            FuelLog.objects.create(vehicle=vehicle, date=today, litres=40, cout=Decimal('3000.00'))
+        # Instantané recalculé entre l'écriture et le recalcul des lignes journalières
+        cache.set(DASHBOARD_STATS_CACHE_KEY, {'finances': {}})
+        for callback in callbacks:
+            callback()
+        assert cache.get(DASHBOARD_STATS_CACHE_KEY) is None
+
+        cache.set(DASHBOARD_STATS_CACHE_KEY, {'finances': {}})
+        rebuild_daily_stats()
+        assert cache.get(DASHBOARD_STATS_CACHE_KEY) is None
+
+    def test_statistics_endpoints_read_rollup(self, api_client, vehicle):
+        today = timezone.localdate()
+        FuelLog.objects.create(vehicle=vehicle, date=today, litres=40, cout=Decimal('3000.00'))
+        FuelLog.objects.create(vehicle=vehicle, date=today, litres=20, cout=Decimal('1600.00'))
+        Expense.objects.create(vehicle=vehicle, type='peage', montant=Decimal('700.00'), date=today)
+        call_command('rebuild_daily_stats', stdout=StringIO())
+
+        response = api_client.get('/api/vehicles/statistiques/')
+        assert response.data['total_depenses'] == Decimal('700.00')
+        response = api_client.get('/api/fuel-logs/consumption_stats/', {'vehicle_id': vehicle.id})
+        assert response.data['total_litres'] == 60
+        assert float(response.data['prix_moyen']) == pytest.approx(77.5)
@@ -0,0 +1,136 @@
+import csv
+import io
+import zipfile
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from xml.etree import ElementTree
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from fleet.exports import csv_stream, xlsx_stream
+from fleet.models import Vehicle, Driver, Expense, FuelLog, Mission
+
+@pytest.fixture
+def admin():
+    return User.objects.create_superuser(username='admin1', password='testpass123')
+
+@pytest.fixture
+def api_client(admin):
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    return client
+
+@pytest.fixture
+def vehicle():
+    return Vehicle.objects.create(marque='Toyota', modele='Hilux', immatriculation='AB-123-CD', kilometrage=0)
+
+@pytest.fixture
+def driver():
+    user = User.objects.create_user(username='conducteur1', password='testpass123', first_name='Awa', last_name='Koné')
+    return Driver.objects.create(user_profile=user.profile, numero_permis='P-0001')
+
+def read_csv(response):
+    assert response.streaming
+    content = b''.join(response.streaming_content).decode('utf-8-sig')
+    return list(csv.reader(io.StringIO(content)))
+
+def read_csv_body(response):
+    return list(csv.reader(io.StringIO(response.content.decode('utf-8-sig'))))
+
+SHEET_NS = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+def read_sheet(content):
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        assert archive.testzip() is None
+        root = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+    return [
+        [cell.findtext('m:v', namespaces=SHEET_NS) or cell.findtext('m:is/m:t', namespaces=SHEET_NS)
+         for cell in row.findall('m:c', SHEET_NS)]
+        for row in root.iterfind('m:sheetData/m:row', SHEET_NS)
+    ]
+
+@pytest.mark.django_db
+class TestExports:
+    def test_expenses_csv_with_filters(self, api_client, vehicle):
+        other = Vehicle.objects.create(marque='Renault', modele='Kangoo', immatriculation='EF-456-GH', kilometrage=0)
+        Expense.objects.create(vehicle=vehicle, type='peage', montant=Decimal('1500.00'), date=date(2024, 3, 2),
+                               description='Péage, autoroute "nord"')
+        Expense.objects.create(vehicle=vehicle, type='amende', montant=Decimal('10000.00'), date=date(2024, 3, 1),
+                               description='')
+        Expense.objects.create(vehicle=vehicle, type='peage', montant=Decimal('500.00'), date=date(2023, 12, 31),
+                               description='')
+        Expense.objects.create(vehicle=other, type='peage', montant=Decimal('700.00'), date=date(2024, 3, 5),
+                               description='')
+
+        response = api_client.get('/api/expenses/export/', {'vehicle_id': vehicle.id, 'date_debut': '2024-01-01'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'text/csv; charset=utf-8'
+        assert response['Content-Disposition'].startswith('attachment; filename="depenses-')
+        rows = read_csv(response)
+        assert rows[0] == ['id', 'date', 'immatriculation', 'type', 'montant', 'kilometrage', 'description']
+        assert [row[1:5] for row in rows[1:]] == [
+            ['2024-03-01', 'AB-123-CD', 'amende', '10000.00'],
+            ['2024-03-02', 'AB-123-CD', 'peage', '1500.00'],
+        ]
+        assert rows[2][6] == 'Péage, autoroute "nord"'
+
+        rows = read_csv(api_client.get('/api/expenses/export/', {'type': 'peage', 'date_fin': '2024-03-31'}))
+        assert len(rows) == 1 + 3
+
+    def test_csv_neutralises_formulas(self):
+        rows = list(csv.reader(io.StringIO(b''.join(csv_stream(
+            ['description', 'montant'],
+            [('=HYPERLINK("http://x")', Decimal('-5.00')), ('+1', 3), ('-2', None), ('@SUM(A1)', 1), ('Péage', 2)],
+        )).decode('utf-8-sig'))))
+        assert [row[0] for row in rows[1:]] == ["'=HYPERLINK(\"http://x\")", "'+1", "'-2", "'@SUM(A1)", 'Péage']
+        assert rows[1][1] == '-5.00'
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(xlsx_stream(['description'], [('=1+1',)]))))
+        assert '>=1+1<' in archive.read('xl/worksheets/sheet1.xml').decode()
+
+    def test_iterates_in_chunks(self, api_client, vehicle, driver, settings, django_assert_max_num_queries):
+        settings.EXPORT_CHUNK_SIZE = 2
+        for day in range(5):
+            FuelLog.objects.create(vehicle=vehicle, driver=driver, date=date(2024, 3, day + 1), litres=40,
+                                   cout=Decimal('3000.00'), kilometrage=1000 + day * 100)
+        with django_assert_max_num_queries(2):
+            rows = read_csv(api_client.get('/api/fuel-logs/export/'))
+        assert [row[3:5] for row in rows[1:]] == [['Awa', 'Koné']] * 5
+
+    def test_missions_xlsx_and_driver_scope(self, api_client, vehicle, driver):
+        now = timezone.now()
+        Mission.objects.create(vehicle=vehicle, driver=driver, raison='Livraison\x01 <urgente>',
+                               date_depart=now, distance_km=12.5)
+        other_user = User.objects.create_user(username='conducteur2', password='testpass123')
+        other = Driver.objects.create(user_profile=other_user.profile, numero_permis='P-0002')
+        Mission.objects.create(vehicle=vehicle, driver=other, raison='Retour', date_depart=now - timedelta(days=1))
+
+        response = api_client.get('/api/missions/export/', {'format': 'xlsx'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        rows = read_sheet(b''.join(response.streaming_content))
+        assert rows[0][:3] == ['id', 'code', 'date_depart']
+        assert [row[-1] for row in rows[1:]] == ['Retour', 'Livraison <urgente>']
+        assert rows[2][9] == '12.5'
+
+        client = APIClient()
+        client.force_authenticate(user=driver.user_profile.user)
+        rows = read_csv(client.get('/api/missions/export/'))
+        assert [row[-1] for row in rows[1:]] == ['Livraison\x01 <urgente>']
+
+    def test_invalid_date(self, api_client):
+        response = api_client.get('/api/expenses/export/', {'date_debut': 'mars'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert read_csv_body(response)[1][0] == 'date_debut'
+
+    def test_xlsx_readable_by_openpyxl(self):
+        openpyxl = pytest.importorskip('openpyxl')
+        rows = [(i, f'ligne {i}', Decimal('1.50'), date(2024, 1, 1), None, True) for i in range(3000)]
+        content = b''.join(xlsx_stream(['id', 'libelle', 'montant', 'date', 'vide', 'ok'], iter(rows)))
+        sheet = openpyxl.load_workbook(io.BytesIO(content), read_only=True).active
+        values = list(sheet.iter_rows(values_only=True))
+        assert values[0] == ('id', 'libelle', 'montant', 'date', 'vide', 'ok')
+        assert values[-1] == (2999, 'ligne 2999', 1.5, '2024-01-01', None, True)
+        assert len(values) == 3001
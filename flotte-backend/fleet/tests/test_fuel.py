@@ -0,0 +1,84 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from fleet.models import Vehicle, FuelLog, VehicleFuelStats
+
+@pytest.fixture
+def admin():
+    return User.objects.create_superuser(username='admin1', password='testpass123')
+
+@pytest.fixture
+def api_client(admin):
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    return client
+
+@pytest.fixture
+def vehicle():
+    return Vehicle.objects.create(marque='Toyota', modele='Hilux', immatriculation='AB-123-CD', kilometrage=0)
+
+def plein(vehicle, days_ago, litres, kilometrage):
+    # FuelLog.save recalcule prix_litre = cout / litres (5 chiffres au plus)
+    return FuelLog.objects.create(vehicle=vehicle, date=timezone.localdate() - timedelta(days=days_ago),
+                                  litres=litres, cout=Decimal(litres * 75), kilometrage=kilometrage)
+
+@pytest.mark.django_db
+class TestFuelStats:
+    def test_create_increments_totals(self, vehicle):
+        plein(vehicle, 10, 40, 1000)
+        plein(vehicle, 5, 30, 1500)
+        plein(vehicle, 1, 20, 0)  # kilométrage non saisi
+        stats = VehicleFuelStats.objects.get(vehicle=vehicle)
+        assert (stats.litres, stats.pleins, stats.cout) == (90, 3, Decimal('6750.00'))
+        assert (stats.kilometrage_min, stats.kilometrage_max) == (1000, 1500)
+        assert vehicle.consommation_moyenne == pytest.approx(90 * 100 / 500)
+
+    def test_update_and_delete_recompute(self, vehicle):
+        other = Vehicle.objects.create(marque='Renault', modele='Kangoo', immatriculation='EF-456-GH', kilometrage=0)
+        first = plein(vehicle, 10, 40, 1000)
+        second = plein(vehicle, 5, 30, 1500)
+        second.vehicle = other
+        second.save()
+        assert VehicleFuelStats.objects.get(vehicle=vehicle).litres == 40
+        assert VehicleFuelStats.objects.get(vehicle=other).litres == 30
+        first.delete()
+        assert not VehicleFuelStats.objects.filter(vehicle=vehicle).exists()
+        assert Vehicle.objects.get(pk=vehicle.pk).consommation_moyenne == 0
+
+    def test_rebuild_command(self, vehicle):
+        plein(vehicle, 3, 40, 1000)
+        VehicleFuelStats.objects.all().delete()
+        call_command('rebuild_fuel_stats', stdout=StringIO())
+        assert VehicleFuelStats.objects.get(vehicle=vehicle).pleins == 1
+
+    def test_endpoint_with_windows(self, api_client, vehicle, django_assert_max_num_queries):
+        plein(vehicle, 60, 50, 1000)
+        plein(vehicle, 20, 40, 2000)
+        plein(vehicle, 2, 30, 2500)
+        with django_assert_max_num_queries(6):
+            response = api_client.get('/api/fuel-logs/consumption_stats/', {'vehicle_id': vehicle.id})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['total_litres'] == 120
+        assert response.data['consommation_moyenne'] == pytest.approx(120 * 100 / 1500)
+        assert response.data['periodes']['30']['pleins'] == 2
+        assert response.data['periodes']['30']['consommation_moyenne'] == pytest.approx(70 * 100 / 500)
+        assert response.data['periodes']['90']['total_litres'] == 120
+
+    def test_endpoint_errors(self, api_client, vehicle):
+        url = '/api/fuel-logs/consumption_stats/'
+        response = api_client.get(url, {'vehicle_id': vehicle.id, 'days': '7'})
+        assert response.data['consommation_moyenne'] == 0
+        assert list(response.data['periodes']) == ['7']
+        assert api_client.get(url, {'vehicle_id': vehicle.id, 'days': '0'}).status_code == status.HTTP_400_BAD_REQUEST
+        response = api_client.get(url, {'vehicle_id': vehicle.id, 'days': '999999999'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = api_client.get(url, {'vehicle_id': vehicle.id, 'days': ','.join(['30'] * 11)})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get(url, {'vehicle_id': 'x'}).status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get(url, {'vehicle_id': vehicle.id + 100}).status_code == status.HTTP_404_NOT_FOUND
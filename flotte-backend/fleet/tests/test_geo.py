@@ -0,0 +1,42 @@
+import pytest
+from fleet.geo import douglas_peucker, encode_polyline, tolerance_for_zoom, track_payload
+
+def test_encode_polyline_reference():
+    points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode_polyline(points) == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+
+def test_douglas_peucker_drops_collinear_points():
+    points = [(5.0 + i * 0.001, -4.0) for i in range(100)]
+    assert douglas_peucker(points, 1.0) == [points[0], points[-1]]
+
+def test_douglas_peucker_keeps_corners():
+    points = [(5.0 + i * 0.001, -4.0) for i in range(50)]
+    points += [(5.049, -4.0 + i * 0.001) for i in range(1, 50)]
+    simplified = douglas_peucker(points, 5.0)
+    assert simplified == [points[0], points[49], points[-1]]
+
+def test_track_payload_zoom_and_encoding():
+    points = [(5.0 + i * 0.001, -4.0, None) for i in range(100)]
+    payload = track_payload(points, {'zoom': '15', 'encoding': 'polyline'})
+    assert payload['points_count'] == 100
+    assert payload['simplified_count'] == 2
+    assert payload['tolerance'] == pytest.approx(tolerance_for_zoom(15))
+    assert 'polyline' in payload and 'points' not in payload
+
+def test_track_payload_invalid_zoom():
+    with pytest.raises(ValueError):
+        track_payload([], {'zoom': '40'})
+
+def test_path_distance_matches_pairwise_haversine(monkeypatch):
+    from fleet import geo
+    points = [(5.3 + i * 0.002, -4.0 + (i % 7) * 0.001) for i in range(500)]
+    expected = sum(geo.haversine(*a, *b) for a, b in zip(points, points[1:]))
+    assert geo.path_distance_km(points) == pytest.approx(expected)
+    monkeypatch.setattr(geo, 'np', None)
+    assert geo.path_distance_km(points) == pytest.approx(expected)
+
+def test_path_distance_incremental():
+    from fleet.geo import path_distance_km
+    points = [(5.3 + i * 0.01, -4.0) for i in range(10)]
+    total = path_distance_km(points[:4]) + path_distance_km(points[4:], start=points[3])
+    assert total == pytest.approx(path_distance_km(points))
@@ -0,0 +1,73 @@
+import pytest
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APIClient
+from fleet.models import Vehicle, Driver, Mission
+
+@pytest.fixture
+def admin():
+    return User.objects.create_superuser(username='admin1', password='testpass123')
+
+@pytest.fixture
+def api_client(admin):
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    return client
+
+@pytest.fixture
+def missions():
+    user = User.objects.create_user(username='conducteur1', password='testpass123')
+    driver = Driver.objects.create(user_profile=user.profile, numero_permis='P-0001')
+    vehicle = Vehicle.objects.create(marque='Toyota', modele='Hilux', immatriculation='AB-123-CD', kilometrage=0)
+    return [Mission.objects.create(vehicle=vehicle, driver=driver, raison=f'Livraison {i}') for i in range(5)]
+
+@pytest.mark.django_db
+class TestCursorPagination:
+    def test_list_unpaginated_by_default(self, api_client, missions):
+        response = api_client.get('/api/missions/')
+        assert response.status_code == status.HTTP_200_OK
+        assert isinstance(response.data, list)
+        assert len(response.data) == 5
+
+    def test_page_size_enables_cursor(self, api_client, missions):
+        response = api_client.get('/api/missions/', {'page_size': 2})
+        assert response.status_code == status.HTTP_200_OK
+        assert [m['id'] for m in response.data['results']] == [missions[4].id, missions[3].id]
+        assert response.data['previous'] is None
+
+        seen = [m['id'] for m in response.data['results']]
+        next_url = response.data['next']
+        while next_url:
+            response = api_client.get(next_url)
+            seen += [m['id'] for m in response.data['results']]
+            next_url = response.data['next']
+        assert seen == sorted((m.id for m in missions), reverse=True)
+
+    def test_router_endpoints_paginate(self, api_client, missions):
+        response = api_client.get('/api/vehicles/', {'page_size': 10})
+        assert response.data['results'][0]['immatriculation'] == 'AB-123-CD'
+
+@pytest.mark.django_db
+class TestSparseFields:
+    def test_fields_restricts_columns(self, api_client, missions):
+        response = api_client.get('/api/missions/', {'fields': 'id,statut'})
+        assert set(response.data[0]) == {'id', 'statut'}
+
+    def test_empty_expand_returns_flat_ids(self, api_client, missions):
+        response = api_client.get('/api/missions/', {'expand': ''})
+        mission = response.data[0]
+        assert 'vehicle_details' not in mission and 'driver_details' not in mission
+        assert mission['vehicle'] == missions[0].vehicle_id
+
+    def test_expand_selects_nested(self, api_client, missions):
+        response = api_client.get('/api/missions/', {'fields': 'id', 'expand': 'vehicle_details'})
+        assert set(response.data[0]) == {'id', 'vehicle_details'}
+        assert response.data[0]['vehicle_details']['immatriculation'] == 'AB-123-CD'
+
+    def test_nested_serializers_untouched(self, api_client, missions):
+        response = api_client.get('/api/missions/', {'fields': 'id,driver_details'})
+        assert 'numero_permis' in response.data[0]['driver_details']
+
+    def test_default_response_unchanged(self, api_client, missions):
+        response = api_client.get('/api/conducteur/missions/')
+        assert 'vehicle_details' in response.data[0] and 'odometre' in response.data[0]
@@ -0,0 +1,247 @@
+import pytest
+from django.urls import reverse
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APIClient
+from django.contrib.auth.models import User
+from fleet.models import Driver, Position, PositionCompaction, DriverLastPosition
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+import json
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(
+        username='conducteur1',
+        email='conducteur1@example.com',
+        password='testpass123'
+    )
+
+@pytest.fixture
+def driver(user):
+    return Driver.objects.create(user_profile=user.profile, numero_permis='P-0001')
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+@pytest.mark.django_db
+class TestPositionBulkAPI:
+    def test_bulk_create_positions(self, api_client, driver):
+        start = timezone.now() - timedelta(minutes=5)
+        data = {
+            'driver': driver.id,
+            'positions': [
+                {
+                    'latitude': 5.345 + i * 0.001,
+                    'longitude': '-4.024000',
+                    'timestamp': (start + timedelta(seconds=10 * i)).isoformat(),
+                }
+                for i in range(20)
+            ]
+        }
+        response = api_client.post(reverse('positions-bulk-create'), data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['created'] == 20
+        assert response.data['errors'] == []
+        first = Position.objects.filter(driver=driver).order_by('timestamp').first()
+        assert first.timestamp == start
+
+    def test_bulk_reports_item_errors(self, api_client, driver):
+        data = [
+            {'driver': driver.id, 'latitude': '5.1', 'longitude': '-4.1'},
+            {'driver': driver.id, 'latitude': 'abc', 'longitude': '-4.1'},
+            {'driver': 999999, 'latitude': '5.1', 'longitude': '-4.1'},
+        ]
+        response = api_client.post(reverse('positions-bulk-create'), data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['created'] == 1
+        assert [e['index'] for e in response.data['errors']] == [1, 2]
+        assert 'latitude' in response.data['errors'][0]['errors']
+        assert 'driver' in response.data['errors'][1]['errors']
+
+    def test_bulk_defaults_to_current_driver(self, api_client, driver):
+        data = [{'latitude': '5.1', 'longitude': '-4.1'}]
+        response = api_client.post(reverse('positions-bulk-create'), data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Position.objects.filter(driver=driver).count() == 1
+
+    def test_bulk_rejects_empty_payload(self, api_client, driver):
+        response = api_client.post(reverse('positions-bulk-create'), [], format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.django_db
+class TestDriverLastPosition:
+    def test_ingest_updates_last_position(self, api_client, driver):
+        now = timezone.now()
+        data = {
+            'driver': driver.id,
+            'positions': [
+                {'latitude': '5.2', 'longitude': '-4.2', 'timestamp': now.isoformat()},
+                {'latitude': '5.1', 'longitude': '-4.1', 'timestamp': (now - timedelta(minutes=1)).isoformat()},
+            ]
+        }
+        api_client.post(reverse('positions-bulk-create'), data, format='json')
+        last = DriverLastPosition.objects.get(driver=driver)
+        assert float(last.latitude) == 5.2
+
+        api_client.post(
+            reverse('positions-list-create'),
+            {'driver': driver.id, 'latitude': '5.3', 'longitude': '-4.3'},
+            format='json'
+        )
+        last.refresh_from_db()
+        assert float(last.latitude) == 5.3
+
+    def test_all_drivers_positions_query_count(self, api_client, driver, django_assert_max_num_queries):
+        for i in range(5):
+            other = User.objects.create_user(username=f'autre{i}', password='x')
+            other_driver = Driver.objects.create(user_profile=other.profile, numero_permis=f'P-1{i}')
+            DriverLastPosition.objects.create(
+                driver=other_driver, latitude='5.0', longitude='-4.0', timestamp=timezone.now()
+            )
+        with django_assert_max_num_queries(2):
+            response = api_client.get(reverse('all-drivers-positions'))
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 6
+        online = [d for d in response.data if d['last_position']]
+        assert len(online) == 5 and all(d['is_online'] for d in online)
+
+@pytest.mark.django_db
+class TestIngestFilter:
+    def test_stationary_fixes_are_not_stored(self, api_client, driver):
+        start = timezone.now() - timedelta(minutes=10)
+        positions = [
+            {'latitude': 5.3, 'longitude': -4.0, 'timestamp': (start + timedelta(seconds=10 * i)).isoformat()}
+            for i in range(10)
+        ]
+        positions.append({'latitude': 5.31, 'longitude': -4.0,
+                          'timestamp': (start + timedelta(seconds=100)).isoformat()})
+        response = api_client.post(reverse('positions-bulk-create'),
+                                   {'driver': driver.id, 'positions': positions}, format='json')
+        assert response.data['created'] == 2
+        assert response.data['filtered'] == 9
+        last = DriverLastPosition.objects.get(driver=driver)
+        assert last.latitude == 5.31 and last.stationary_since is None
+
+        response = api_client.post(
+            reverse('positions-list-create'),
+            {'driver': driver.id, 'latitude': 5.31002, 'longitude': -4.0,
+             'timestamp': (start + timedelta(seconds=130)).isoformat()},
+            format='json'
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['id'] is None and response.data['filtered'] is True
+        last.refresh_from_db()
+        assert last.stationary_since == start + timedelta(seconds=100)
+        assert last.last_seen == start + timedelta(seconds=130)
+        assert Position.objects.filter(driver=driver).count() == 2
+
+    def test_heartbeat_after_max_interval(self, settings):
+        from fleet.tracking import is_significant
+        now = timezone.now()
+        last = (5.3, -4.0, now, 90)
+        assert not is_significant(last, 5.3, -4.0, now + timedelta(seconds=60))
+        assert is_significant(last, 5.3, -4.0, now + timedelta(seconds=settings.POSITION_FILTER_MAX_INTERVAL))
+        assert is_significant(last, 5.3, -4.0, now + timedelta(seconds=60), heading=180)
+
+@pytest.mark.django_db
+class TestCompactPositions:
+    def test_downsample_and_retention(self, driver):
+        start = timezone.now() - timedelta(days=40)
+        Position.objects.bulk_create([
+            Position(driver=driver, latitude=5.0, longitude=-4.0, timestamp=start + timedelta(seconds=10 * i))
+            for i in range(30)
+        ])
+        Position.objects.create(driver=driver, latitude=5.0, longitude=-4.0,
+                                timestamp=timezone.now() - timedelta(days=400))
+        recent = Position.objects.create(driver=driver, latitude=5.0, longitude=-4.0)
+
+        call_command('compact_positions', interval=60, stdout=StringIO())
+
+        assert Position.objects.filter(timestamp__lt=timezone.now() - timedelta(days=365)).count() == 0
+        assert Position.objects.filter(timestamp__lt=timezone.now() - timedelta(days=30)).count() == 5
+        assert Position.objects.filter(pk=recent.pk).exists()
+
+    def test_next_run_reads_only_newly_aged_days(self, driver, django_assert_max_num_queries):
+        call_command('compact_positions', interval=60, stdout=StringIO())
+        state = PositionCompaction.objects.get(table='fleet.position')
+        assert state.compacte_jusqu_a <= timezone.now() - timedelta(days=30)
+
+        # Positions anciennes reçues après le passage : ignorées, sauf avec --full
+        late = state.compacte_jusqu_a - timedelta(days=2)
+        Position.objects.bulk_create([
+            Position(driver=driver, latitude=5.0, longitude=-4.0, timestamp=late + timedelta(seconds=10 * i))
+            for i in range(6)
+        ])
+        # Une journée au plus par table : quelques requêtes, pas une par jour de rétention
+        with django_assert_max_num_queries(20):
+            call_command('compact_positions', interval=60, stdout=StringIO())
+        assert Position.objects.count() == 6
+
+        call_command('compact_positions', interval=60, full=True, stdout=StringIO())
+        assert Position.objects.count() == 1
+
+@pytest.mark.django_db
+class TestPositionHistoryAPI:
+    @pytest.fixture
+    def track(self, driver):
+        start = timezone.now() - timedelta(hours=1)
+        Position.objects.bulk_create([
+            Position(driver=driver, latitude=5.0 + i * 0.01, longitude=-4.0,
+                     timestamp=start + timedelta(seconds=10 * i))
+            for i in range(25)
+        ])
+        return start
+
+    def test_cursor_pagination(self, api_client, driver, track):
+        url = reverse('positions-history')
+        response = api_client.get(url, {'driver': driver.id, 'page_size': 10})
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 10
+        seen = [p['id'] for p in response.data['results']]
+        while response.data['next']:
+            response = api_client.get(response.data['next'])
+            seen += [p['id'] for p in response.data['results']]
+        assert len(seen) == 25 == len(set(seen))
+
+    def test_time_window_and_bbox(self, api_client, driver, track):
+        url = reverse('positions-history')
+        response = api_client.get(url, {
+            'driver': driver.id,
+            'from': (track + timedelta(seconds=50)).isoformat(),
+            'bbox': '-4.5,5.0,-3.5,5.125',
+        })
+        latitudes = [p['latitude'] for p in response.data['results']]
+        assert latitudes == pytest.approx([5.05, 5.06, 5.07, 5.08, 5.09, 5.10, 5.11, 5.12])
+
+    def test_ndjson_stream(self, api_client, driver, track):
+        response = api_client.get(reverse('positions-history'), {'driver': driver.id, 'stream': '1'})
+        assert response.status_code == status.HTTP_200_OK
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert len(lines) == 25
+        assert set(json.loads(lines[0])) == {'id', 'driver', 'latitude', 'longitude', 'timestamp'}
+
+    def test_driver_required(self, api_client):
+        response = api_client.get(reverse('positions-history'))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.django_db
+class TestPositionTrackAPI:
+    def test_simplified_track(self, api_client, driver):
+        start = timezone.now() - timedelta(hours=1)
+        Position.objects.bulk_create([
+            Position(driver=driver, latitude=5.0 + i * 0.001, longitude=-4.0,
+                     timestamp=start + timedelta(seconds=10 * i))
+            for i in range(200)
+        ])
+        response = api_client.get(reverse('positions-track'), {'driver': driver.id, 'tolerance': '2'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['points_count'] == 200
+        assert len(response.data['points']) == 2
+
+        response = api_client.get(reverse('positions-track'), {'driver': driver.id, 'encoding': 'polyline'})
+        assert isinstance(response.data['polyline'], str)
@@ -0,0 +1,88 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from affectations.models import Affectation
+from fleet.models import (
+    Vehicle, Driver, FuelLog, Alert, Mission, DocumentAdministratif, Entretien,
+    Rapport, CommentaireEcart, Historique, FinancialReport
+)
+
+@pytest.fixture
+def admin():
+    # Sans mot de passe : force_authenticate suffit et le hachage coûterait cher à chaque cas
+    return User.objects.create_superuser(username='admin1')
+
+@pytest.fixture
+def api_client(admin):
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    return client
+
+def make_pair(index):
+    user = User.objects.create_user(username=f'conducteur{index}', first_name='Jean', last_name=f'Dupont{index}')
+    driver = Driver.objects.create(user_profile=user.profile, numero_permis=f'P-{index:04d}')
+    vehicle = Vehicle.objects.create(marque='Toyota', modele='Hilux',
+                                     immatriculation=f'AB-{index:03d}-CD', kilometrage=0)
+    return vehicle, driver
+
+def make_mission(vehicle, driver):
+    return Mission.objects.create(vehicle=vehicle, driver=driver, raison='Livraison')
+
+# Pour chaque liste : (url, fabrique d'une ligne à partir d'un véhicule et d'un conducteur)
+LIST_ENDPOINTS = {
+    'userprofiles': ('/api/userprofiles/', lambda vehicle, driver: None),
+    'drivers': ('/api/drivers/', lambda vehicle, driver: None),
+    'vehicles': ('/api/vehicles/', lambda vehicle, driver: None),
+    'fuel-logs': ('/api/fuel-logs/', lambda vehicle, driver: FuelLog.objects.create(
+        vehicle=vehicle, driver=driver, date=timezone.localdate(), litres=40, cout=Decimal('3000.00'))),
+    'alerts': ('/api/alerts/', lambda vehicle, driver: Alert.objects.create(
+        vehicle=vehicle, driver=driver, type_alerte='autre', message='Test', niveau='info')),
+    'missions': ('/api/missions/', make_mission),
+    'documents': ('/api/documents/', lambda vehicle, driver: DocumentAdministratif.objects.create(
+        vehicle=vehicle, numero_document='D-1', type_document='autre',
+        date_emission=timezone.localdate(), date_expiration=timezone.localdate() + timedelta(days=365))),
+    'entretiens': ('/api/entretiens/', lambda vehicle, driver: Entretien.objects.create(
+        vehicle=vehicle, type_entretien='vidange', date_entretien=timezone.localdate(),
+        kilometrage=1000, cout=Decimal('100.00'), commentaires='', garage='Garage')),
+    'rapports': ('/api/rapports/', lambda vehicle, driver: Rapport.objects.create(
+        titre='Rapport', description='', type_rapport='trajet',
+        date_rapport=timezone.localdate(), auteur=driver.user_profile, fichier='rapports/r.pdf')),
+    'commentaires': ('/api/commentaires/', lambda vehicle, driver: CommentaireEcart.objects.create(
+        mission=make_mission(vehicle, driver), utilisateur=driver.user_profile, commentaire='Retard')),
+    'historique': ('/api/historique/', lambda vehicle, driver: Historique.objects.create(
+        vehicle=vehicle, utilisateur=driver.user_profile, evenement='modification', description='')),
+    'reports': ('/api/reports/', lambda vehicle, driver: FinancialReport.objects.create(
+        vehicle=vehicle, date_debut=timezone.localdate(), date_fin=timezone.localdate(),
+        total_carburant=0, total_entretien=0, total_peages=0, total_amendes=0, total_autre=0,
+        kilometrage_debut=0, kilometrage_fin=0, consommation_moyenne=0)),
+    'conducteur-missions': ('/api/conducteur/missions/', make_mission),
+    'affectations': ('/api/affectations/', lambda vehicle, driver: Affectation.objects.create(
+        vehicule=vehicle, conducteur=driver, date_debut=timezone.now(),
+        date_fin=timezone.now() + timedelta(days=1))),
+}
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    return len(context.captured_queries), response
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('endpoint', LIST_ENDPOINTS)
+def test_list_query_count_does_not_grow_with_rows(api_client, endpoint):
+    url, factory = LIST_ENDPOINTS[endpoint]
+    factory(*make_pair(0))
+    baseline, _ = count_queries(api_client, url)
+
+    for index in range(1, 6):
+        factory(*make_pair(index))
+    queries, response = count_queries(api_client, url)
+
+    assert len(response.data) >= 6
+    assert queries == baseline
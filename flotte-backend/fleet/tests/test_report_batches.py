@@ -0,0 +1,159 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from fleet.models import Vehicle, Expense, FuelLog, FinancialReport, ReportBatch, bump_table_version
+from fleet.reports import BatchReclaimed, _save_chunk, reclaim_stale_batches, run_report_batch, report_totals
+
+@pytest.fixture(autouse=True)
+def synchronous_batches(settings):
+    settings.REPORT_BATCH_ASYNC = False
+
+@pytest.fixture
+def admin():
+    return User.objects.create_superuser(username='admin1', password='testpass123')
+
+@pytest.fixture
+def api_client(admin):
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    return client
+
+def seed_fleet(count):
+    vehicles = [
+        Vehicle.objects.create(marque='Toyota', modele='Hilux', immatriculation=f'AB-{i:03d}-CD', kilometrage=1000,
+                               actif=i % 2 == 0)
+        for i in range(count)
+    ]
+    for i, vehicle in enumerate(vehicles):
+        Expense.objects.create(vehicle=vehicle, type='peage', montant=Decimal('500.00') * (i + 1),
+                               date='2024-03-03', description='')
+        FuelLog.objects.create(vehicle=vehicle, date='2024-03-01', litres=40, cout=Decimal('3000.00'), kilometrage=1000)
+        FuelLog.objects.create(vehicle=vehicle, date='2024-03-20', litres=20, cout=Decimal('1500.00'), kilometrage=1400)
+    return vehicles
+
+@pytest.mark.django_db
+class TestReportBatch:
+    def test_batch_matches_single_reports(self):
+        vehicles = seed_fleet(5)
+        batch = ReportBatch.objects.create(date_debut='2024-03-01', date_fin='2024-03-31')
+        batch = run_report_batch(batch.pk, chunk_size=2)
+        assert (batch.statut, batch.total, batch.traites) == ('terminee', 5, 5)
+        assert batch.demarre_le and batch.termine_le
+        for vehicle in vehicles:
+            report = FinancialReport.objects.get(batch=batch, vehicle=vehicle)
+            _, totals = report_totals(vehicle.id, '2024-03-01', '2024-03-31')
+            assert {field: getattr(report, field) for field in totals} == totals
+
+    def test_queries_independent_of_fleet_size(self):
+        bump_table_version(FinancialReport)
+        vehicles = seed_fleet(12)
+
+        def run(vehicle_ids):
+            batch = ReportBatch.objects.create(date_debut='2024-03-01', date_fin='2024-03-31', vehicle_ids=vehicle_ids)
+            with CaptureQueriesContext(connection) as queries:
+                run_report_batch(batch.pk, chunk_size=100)
+            return len(queries)
+
+        assert run([v.id for v in vehicles[:2]]) == run([v.id for v in vehicles])
+        assert FinancialReport.objects.count() == 2 + 12
+
+    def test_filters_and_claim(self):
+        vehicles = seed_fleet(4)
+        batch = ReportBatch.objects.create(date_debut='2024-03-01', date_fin='2024-03-31',
+                                           vehicle_ids=[v.id for v in vehicles[:3]], actifs_seulement=True)
+        run_report_batch(batch.pk)
+        assert set(batch.rapports.values_list('vehicle_id', flat=True)) == {vehicles[0].id, vehicles[2].id}
+        # Un lot déjà exécuté n'est pas repris
+        assert run_report_batch(batch.pk) is None
+
+    def test_api_create_and_progress(self, api_client, django_capture_on_commit_callbacks):
+        seed_fleet(3)
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post('/api/report-batches/', {
+                'date_debut': '2024-03-01', 'date_fin': '2024-03-31',
+            }, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['statut'] == 'en_attente'
+
+        detail = api_client.get(f"/api/report-batches/{response.data['id']}/")
+        assert detail.data['statut'] == 'terminee'
+        assert detail.data['progression'] == 1
+        rapports = api_client.get(f"/api/report-batches/{response.data['id']}/rapports/")
+        assert [r['total_peages'] for r in rapports.data] == ['500.00', '1000.00', '1500.00']
+
+    def test_api_validation(self, api_client):
+        response = api_client.post('/api/report-batches/', {
+            'date_debut': '2024-03-31', 'date_fin': '2024-03-01',
+        }, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = api_client.post('/api/report-batches/', {
+            'date_debut': '2024-03-01', 'date_fin': '2024-03-31', 'vehicle_ids': [],
+        }, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_command(self):
+        vehicles = seed_fleet(2)
+        out = StringIO()
+        call_command('generate_reports', '--date-debut', '2024-03-01', '--date-fin', '2024-03-31',
+                     '--vehicle', str(vehicles[1].id), stdout=out)
+        assert 'Lot' in out.getvalue()
+        assert list(FinancialReport.objects.values_list('vehicle_id', flat=True)) == [vehicles[1].id]
+
+        pending = ReportBatch.objects.create(date_debut='2024-03-01', date_fin='2024-03-31')
+        call_command('generate_reports', '--pending', stdout=StringIO())
+        pending.refresh_from_db()
+        assert pending.statut == 'terminee'
+
+    def test_stale_batch_reclaimed(self, settings):
+        settings.REPORT_BATCH_STALE_AFTER = 600
+        vehicles = seed_fleet(2)
+        stale = ReportBatch.objects.create(date_debut='2024-03-01', date_fin='2024-03-31', statut='en_cours',
+                                           demarre_le=timezone.now() - timedelta(hours=1),
+                                           maj_le=timezone.now() - timedelta(minutes=30), traites=1)
+        _, totals = report_totals(vehicles[0].id, '2024-03-01', '2024-03-31')
+        FinancialReport.objects.create(vehicle=vehicles[0], batch=stale, date_debut='2024-03-01',
+                                       date_fin='2024-03-31', **totals)
+        running = ReportBatch.objects.create(date_debut='2024-03-01', date_fin='2024-03-31', statut='en_cours',
+                                             demarre_le=timezone.now(), maj_le=timezone.now())
+        call_command('generate_reports', '--pending', stdout=StringIO())
+        stale.refresh_from_db()
+        assert stale.statut == 'terminee' and stale.traites == 2
+        assert stale.rapports.count() == 2
+        running.refresh_from_db()
+        assert running.statut == 'en_cours'
+
+    def test_reclaimed_batch_not_touched_by_original_runner(self, settings):
+        settings.REPORT_BATCH_STALE_AFTER = 0
+        vehicles = seed_fleet(1)
+        batch = ReportBatch.objects.create(date_debut='2024-03-01', date_fin='2024-03-31', statut='en_cours',
+                                           demarre_le=timezone.now() - timedelta(seconds=1))
+        assert reclaim_stale_batches() == 1
+        with pytest.raises(BatchReclaimed):
+            _save_chunk(batch, [(vehicles[0].id, {})])
+        batch.refresh_from_db()
+        assert batch.statut == 'en_attente' and batch.traites == 0
+        assert not FinancialReport.objects.exists()
+
+    def test_long_batch_still_progressing_not_reclaimed(self, settings):
+        settings.REPORT_BATCH_STALE_AFTER = 600
+        vehicles = seed_fleet(2)
+        started = timezone.now() - timedelta(hours=2)
+        batch = ReportBatch.objects.create(date_debut='2024-03-01', date_fin='2024-03-31', statut='en_cours',
+                                           demarre_le=started, maj_le=started, total=2)
+        # Démarré bien avant REPORT_BATCH_STALE_AFTER, mais un paquet vient d'être enregistré
+        _, totals = report_totals(vehicles[0].id, '2024-03-01', '2024-03-31')
+        _save_chunk(batch, [(vehicles[0].id, totals)])
+
+        assert reclaim_stale_batches() == 0
+        batch.refresh_from_db()
+        assert batch.statut == 'en_cours' and batch.traites == 1
+        assert batch.maj_le > started
+        assert batch.rapports.count() == 1
@@ -0,0 +1,74 @@
+import pytest
+from decimal import Decimal
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APIClient
+from fleet.models import Vehicle, Expense, FuelLog, Entretien, FinancialReport
+from fleet.reports import report_totals
+
+@pytest.fixture
+def admin():
+    return User.objects.create_superuser(username='admin1', password='testpass123')
+
+@pytest.fixture
+def api_client(admin):
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    return client
+
+@pytest.fixture
+def vehicle():
+    return Vehicle.objects.create(marque='Toyota', modele='Hilux', immatriculation='AB-123-CD', kilometrage=5000)
+
+def depense(vehicle, type, montant, date):
+    return Expense.objects.create(vehicle=vehicle, type=type, montant=Decimal(montant), date=date, description='')
+
+@pytest.mark.django_db
+class TestFinancialReport:
+    def test_totals_in_two_queries(self, vehicle, django_assert_num_queries):
+        depense(vehicle, 'carburant', '3000.00', '2024-03-02')
+        depense(vehicle, 'peage', '500.00', '2024-03-03')
+        depense(vehicle, 'peage', '700.00', '2024-03-20')
+        depense(vehicle, 'amende', '10000.00', '2024-03-04')
+        depense(vehicle, 'assurance', '90000.00', '2024-03-05')  # hors rapport
+        depense(vehicle, 'autre', '800.00', '2024-04-05')  # hors période
+        Entretien.objects.create(vehicle=vehicle, type_entretien='vidange', date_entretien='2024-03-10',
+                                 cout=Decimal('25000.00'), commentaires='', kilometrage=1000, garage='Garage')
+        FuelLog.objects.create(vehicle=vehicle, date='2024-03-01', litres=40, cout=Decimal('3000.00'), kilometrage=1000)
+        FuelLog.objects.create(vehicle=vehicle, date='2024-03-15', litres=30, cout=Decimal('2250.00'), kilometrage=1400)
+        FuelLog.objects.create(vehicle=vehicle, date='2024-03-31', litres=20, cout=Decimal('1500.00'), kilometrage=1500)
+
+        with django_assert_num_queries(2):
+            _, totals = report_totals(vehicle.id, '2024-03-01', '2024-03-31')
+        assert totals == {
+            'total_carburant': Decimal('3000.00'),
+            'total_peages': Decimal('1200.00'),
+            'total_amendes': Decimal('10000.00'),
+            'total_autre': 0,
+            'total_entretien': Decimal('25000.00'),
+            'kilometrage_debut': 1000,
+            'kilometrage_fin': 1500,
+            'consommation_moyenne': pytest.approx(90 * 100 / 500),
+        }
+
+    def test_empty_period_uses_vehicle_odometer(self, vehicle):
+        _, totals = report_totals(vehicle.id, '2024-03-01', '2024-03-31')
+        assert totals['kilometrage_debut'] == totals['kilometrage_fin'] == 5000
+        assert totals['consommation_moyenne'] == 0
+        assert totals['total_entretien'] == 0
+        assert report_totals(vehicle.id + 100, '2024-03-01', '2024-03-31') is None
+
+    def test_generate_report_endpoint(self, api_client, vehicle):
+        depense(vehicle, 'peage', '500.00', '2024-03-03')
+        response = api_client.post('/api/reports/generate_report/', {
+            'vehicle_id': vehicle.id, 'date_debut': '2024-03-01', 'date_fin': '2024-03-31',
+        })
+        assert response.status_code == status.HTTP_201_CREATED
+        report = FinancialReport.objects.get()
+        assert report.total_peages == Decimal('500.00')
+        assert report.total_depenses == Decimal('500.00')
+
+        response = api_client.post('/api/reports/generate_report/', {
+            'vehicle_id': vehicle.id + 100, 'date_debut': '2024-03-01', 'date_fin': '2024-03-31',
+        })
+        assert response.status_code == status.HTTP_404_NOT_FOUND
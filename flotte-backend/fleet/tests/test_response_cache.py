@@ -0,0 +1,111 @@
+import pytest
+from datetime import timedelta
+from io import StringIO
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from fleet.models import Vehicle, Driver, Mission, Expense, Alert
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+@pytest.fixture
+def user():
+    return User.objects.create_superuser(username='admin1', password='testpass123')
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+@pytest.fixture
+def vehicle():
+    return Vehicle.objects.create(marque='Toyota', modele='Hilux', immatriculation='AB-123-CD', kilometrage=0)
+
+@pytest.fixture
+def driver():
+    user = User.objects.create_user(username='conducteur1', password='testpass123')
+    return Driver.objects.create(user_profile=user.profile, numero_permis='P-0001')
+
+def window():
+    now = timezone.now()
+    return {'date_debut': (now - timedelta(hours=1)).isoformat(), 'date_fin': (now + timedelta(hours=1)).isoformat()}
+
+@pytest.mark.django_db
+class TestResponseCache:
+    def test_hit_served_without_queries(self, api_client, vehicle, django_assert_max_num_queries):
+        params = window()
+        first = api_client.get(reverse('available_vehicles'), params)
+        assert first.status_code == status.HTTP_200_OK
+        assert [v['id'] for v in first.data] == [vehicle.id]
+
+        with django_assert_max_num_queries(0):
+            second = api_client.get(reverse('available_vehicles'), params)
+        assert second.data == first.data
+
+    def test_write_invalidates(self, api_client, vehicle, driver, django_capture_on_commit_callbacks):
+        params = window()
+        api_client.get(reverse('available_vehicles'), params)
+        with django_capture_on_commit_callbacks(execute=True):
+            Mission.objects.create(vehicle=vehicle, driver=driver, raison='Livraison',
+                                   date_depart=timezone.now(), date_arrivee=timezone.now() + timedelta(minutes=30))
+        assert api_client.get(reverse('available_vehicles'), params).data == []
+
+    def test_invalidation_waits_for_commit(self, api_client, vehicle, driver, django_capture_on_commit_callbacks):
+        params = window()
+        api_client.get(reverse('available_vehicles'), params)
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            Mission.objects.create(vehicle=vehicle, driver=driver, raison='Livraison',
+                                   date_depart=timezone.now(), date_arrivee=timezone.now() + timedelta(minutes=30))
+            # Avant le commit, la réponse en cache reste servie et n'est pas remplacée
+            assert api_client.get(reverse('available_vehicles'), params).data != []
+        for callback in callbacks:
+            callback()
+        assert api_client.get(reverse('available_vehicles'), params).data == []
+
+    def test_commands_warn_about_local_cache(self, settings):
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        stderr = StringIO()
+        call_command('rebuild_daily_stats', stdout=StringIO(), stderr=stderr)
+        assert 'CACHE_REDIS_URL' in stderr.getvalue()
+
+    def test_params_are_part_of_key(self, api_client, vehicle):
+        api_client.get(reverse('available_vehicles'), window())
+        response = api_client.get(reverse('available_vehicles'), {'date_debut': 'x', 'date_fin': 'y'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_unrelated_write_keeps_entry(self, api_client, vehicle, django_assert_max_num_queries,
+                                         django_capture_on_commit_callbacks):
+        api_client.get(reverse('recent_activities'))
+        stats = api_client.get(reverse('vehicle-statistiques'))
+        with django_capture_on_commit_callbacks(execute=True):
+            Alert.objects.create(vehicle=vehicle, type_alerte='entretien', message='Vidange à prévoir')
+        # Alert fait partie de recent_activities mais pas de statistiques
+        with django_assert_max_num_queries(1):
+            assert api_client.get(reverse('vehicle-statistiques')).data == stats.data
+        assert len(api_client.get(reverse('recent_activities')).data['alerts']) == 1
+
+    def test_rollup_invalidates_statistiques(self, api_client, vehicle, django_capture_on_commit_callbacks):
+        assert api_client.get(reverse('vehicle-statistiques')).data['total_depenses'] == 0
+        with django_capture_on_commit_callbacks(execute=True):
+            Expense.objects.create(vehicle=vehicle, type='peage', montant=Decimal('1500.00'),
+                                   date=timezone.localdate())
+        assert api_client.get(reverse('vehicle-statistiques')).data['total_depenses'] == Decimal('1500.00')
+
+    def test_metrics(self, api_client, vehicle):
+        params = window()
+        api_client.get(reverse('available_vehicles'), params)
+        api_client.get(reverse('available_vehicles'), params)
+        api_client.get(reverse('available_vehicles'), params)
+        response = api_client.get(reverse('response_cache_stats'))
+        assert response.data['available_vehicles'] == {'hits': 2, 'misses': 1, 'hit_rate': 0.667}
+        assert response.data['available_drivers']['hit_rate'] is None
@@ -0,0 +1,78 @@
+import json
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+from io import StringIO
+from rest_framework.test import APIClient
+from fleet import views
+from fleet.models import Vehicle, Driver, Mission, FuelLog, Expense, Position
+from fleet.serializers import PositionSerializer
+
+@pytest.fixture
+def admin():
+    return User.objects.create_superuser(username='admin1', password='testpass123')
+
+@pytest.fixture
+def api_client(admin):
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    return client
+
+@pytest.fixture
+def dataset():
+    user = User.objects.create_user(username='conducteur1', password='testpass123', first_name='Awa')
+    user.profile.photo = 'profiles/awa.jpg'
+    user.profile.save()
+    driver = Driver.objects.create(user_profile=user.profile, numero_permis='P-0001',
+                                   date_expiration_permis=timezone.localdate())
+    vehicle = Vehicle.objects.create(marque='Toyota', modele='Hilux', immatriculation='AB-123-CD',
+                                     kilometrage=1200.5, prix_acquisition=Decimal('15000000.00'),
+                                     photo='vehicles/hilux.jpg')
+    Mission.objects.create(vehicle=vehicle, driver=driver, raison='Livraison', distance_km=12.5,
+                           date_arrivee=timezone.now() + timedelta(hours=2))
+    FuelLog.objects.create(vehicle=vehicle, driver=driver, date=timezone.localdate(), litres=40,
+                           cout=Decimal('3000.00'))
+    FuelLog.objects.create(vehicle=vehicle, driver=None, date=timezone.localdate(), litres=20,
+                           cout=Decimal('1500.00'))
+    Expense.objects.create(vehicle=vehicle, type='peage', montant=Decimal('1500.00'), date=timezone.localdate())
+    return vehicle, driver
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url,viewset', [
+    ('/api/missions/', views.MissionViewSet),
+    ('/api/fuel-logs/', views.FuelLogViewSet),
+    ('/api/expenses/', views.ExpenseViewSet),
+])
+@pytest.mark.parametrize('params', [{}, {'page_size': 1}, {'fields': 'id,vehicle', 'expand': 'vehicle_details'}])
+def test_fast_list_matches_serializer(api_client, dataset, monkeypatch, url, viewset, params):
+    fast = api_client.get(url, params)
+    monkeypatch.setattr(viewset, 'fast_list', False)
+    slow = api_client.get(url, params)
+    assert fast.status_code == slow.status_code == 200
+    assert json.loads(fast.content) == json.loads(slow.content)
+
+@pytest.mark.django_db
+def test_position_history_matches_serializer(api_client, dataset):
+    _, driver = dataset
+    now = timezone.now()
+    for i in range(3):
+        Position.objects.create(driver=driver, latitude=5.3 + i / 100, longitude=-4.0,
+                                timestamp=now - timedelta(minutes=i))
+    expected = PositionSerializer(Position.objects.order_by('timestamp'), many=True).data
+
+    response = api_client.get('/api/positions/history/', {'driver': driver.id})
+    assert json.loads(response.content)['results'] == json.loads(json.dumps(expected))
+
+    response = api_client.get('/api/positions/history/', {'driver': driver.id, 'stream': '1'})
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert [json.loads(line) for line in lines] == json.loads(json.dumps(expected))
+
+@pytest.mark.django_db
+def test_benchmark_command(dataset):
+    out = StringIO()
+    call_command('benchmark_lists', '--rows', '5', '--requests', '1', stdout=out)
+    assert '/api/missions/' in out.getvalue()
+    assert Mission.objects.count() == 1
@@ -0,0 +1,128 @@
+# fleet/tracking.py
+
+from django.conf import settings
+from django.db import transaction
+
+from .geo import haversine
+from .live import driver_update, publish_positions
+from .models import DriverLastPosition, Position
+
+
+def is_significant(last, latitude, longitude, timestamp, heading=None):
+    """
+    Indique si une position mérite d'être enregistrée au regard de la dernière
+    position enregistrée ``last`` (tuple latitude, longitude, timestamp, heading).
+
+    Une position est écartée si elle reste à moins de POSITION_FILTER_MIN_DISTANCE_M
+    mètres, que le cap varie de moins de POSITION_FILTER_MIN_HEADING_CHANGE degrés
+    et que moins de POSITION_FILTER_MAX_INTERVAL secondes se sont écoulées. Les
+    positions plus anciennes que la dernière enregistrée (rejeu) sont conservées.
+    """
+    if last is None:
+        return True
+    last_latitude, last_longitude, last_timestamp, last_heading = last
+    elapsed = (timestamp - last_timestamp).total_seconds()
+    if elapsed < 0 or elapsed >= getattr(settings, 'POSITION_FILTER_MAX_INTERVAL', 300):
+        return True
+    distance_m = haversine(last_latitude, last_longitude, latitude, longitude) * 1000
+    if distance_m >= getattr(settings, 'POSITION_FILTER_MIN_DISTANCE_M', 10):
+        return True
+    if heading is not None and last_heading is not None:
+        change = abs(float(heading) - float(last_heading)) % 360
+        if min(change, 360 - change) >= getattr(settings, 'POSITION_FILTER_MIN_HEADING_CHANGE', 30):
+            return True
+    return False
+
+
+def ingest_positions(positions):
+    """
+    Filtre puis enregistre des positions conducteur non sauvegardées.
+
+    Les positions jugées non significatives ne sont pas insérées ; elles
+    mettent seulement à jour last_seen et stationary_since de
+    DriverLastPosition. Retourne la liste des positions enregistrées.
+    """
+    positions = sorted(positions, key=lambda p: (p.driver_id, p.timestamp))
+    known = DriverLastPosition.objects.in_bulk(
+        {p.driver_id for p in positions}, field_name='driver_id'
+    )
+    last = {
+        driver_id: (row.latitude, row.longitude, row.timestamp, None)
+        for driver_id, row in known.items()
+    }
+    kept = []
+    for position in positions:
+        previous = last.get(position.driver_id)
+        if is_significant(previous, position.latitude, position.longitude, position.timestamp):
+            kept.append(position)
+            if previous is None or position.timestamp >= previous[2]:
+                last[position.driver_id] = (position.latitude, position.longitude, position.timestamp, None)
+
+    with transaction.atomic():
+        Position.objects.bulk_create(kept, batch_size=500)
+        update_last_positions(kept, received=positions, known=known)
+    return kept
+
+
+def update_last_positions(positions, received=None, known=None):
+    """
+    Met à jour la table DriverLastPosition à partir de positions déjà enregistrées.
+
+    ``received`` contient toutes les positions reçues, y compris celles écartées
+    par le filtre : elles avancent last_seen et marquent le conducteur immobile
+    depuis sa dernière position enregistrée. Une seule requête de lecture et un
+    seul upsert quel que soit le nombre de positions ; une position plus
+    ancienne que celle connue est ignorée. Les positions retenues sont
+    diffusées aux cartes de la flotte après le commit.
+    """
+    latest = {}
+    for position in positions:
+        current = latest.get(position.driver_id)
+        if current is None or position.timestamp > current.timestamp:
+            latest[position.driver_id] = position
+    seen = {}
+    for position in received if received is not None else positions:
+        if position.driver_id not in seen or position.timestamp > seen[position.driver_id]:
+            seen[position.driver_id] = position.timestamp
+    if not seen:
+        return
+
+    if known is None:
+        known = DriverLastPosition.objects.in_bulk(seen, field_name='driver_id')
+    rows = []
+    updates = []
+    for driver_id, seen_at in seen.items():
+        current = known.get(driver_id)
+        position = latest.get(driver_id)
+        if position is not None and (current is None or position.timestamp >= current.timestamp):
+            row = DriverLastPosition(
+                driver_id=driver_id,
+                latitude=position.latitude,
+                longitude=position.longitude,
+                timestamp=position.timestamp,
+            )
+            updates.append(driver_update(driver_id, row.latitude, row.longitude, row.timestamp))
+        elif current is not None:
+            row = DriverLastPosition(
+                driver_id=driver_id,
+                latitude=current.latitude,
+                longitude=current.longitude,
+                timestamp=current.timestamp,
+                stationary_since=current.stationary_since,
+            )
+        else:
+            continue
+        if current is not None and current.last_seen and current.last_seen > seen_at:
+            seen_at = current.last_seen
+        row.last_seen = max(seen_at, row.timestamp)
+        if row.last_seen > row.timestamp and row.stationary_since is None:
+            row.stationary_since = row.timestamp
+        rows.append(row)
+
+    DriverLastPosition.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['driver'],
+        update_fields=['latitude', 'longitude', 'timestamp', 'last_seen', 'stationary_since'],
+    )
+    transaction.on_commit(lambda: publish_positions(updates))
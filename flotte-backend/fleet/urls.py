@@ -1,4 +1,4 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .auth_views import (
@@ -31,6 +31,9 @@ from .views import (
     UserInfoView,
     ManagerViewSet,
     PositionListCreateAPIView,
+    PositionBulkCreateAPIView,
+    PositionHistoryAPIView,
+    PositionTrackAPIView,
     LastPositionAPIView,
     all_drivers_positions,
     driver_trips_history,
@@ -50,6 +53,7 @@ router.register(r'alerts', AlertViewSet, basename='alert')
 router.register(r'missions', views.MissionViewSet)
 router.register(r'expenses', views.ExpenseViewSet)
 router.register(r'reports', views.FinancialReportViewSet)
+router.register(r'report-batches', views.ReportBatchViewSet)
 router.register(r'documents', views.DocumentAdministratifViewSet)
 router.register(r'entretiens', views.EntretienViewSet)
 router.register(r'rapports', views.RapportViewSet)
@@ -60,6 +64,9 @@ router.register(r'managers', views.ManagerViewSet, basename='manager')
 urlpatterns = [
     path('userprofiles/my_profile/', views.user_profile_me, name='my-profile'),
     path('positions/', PositionListCreateAPIView.as_view(), name='positions-list-create'),
+    path('positions/bulk/', PositionBulkCreateAPIView.as_view(), name='positions-bulk-create'),
+    path('positions/history/', PositionHistoryAPIView.as_view(), name='positions-history'),
+    path('positions/track/', PositionTrackAPIView.as_view(), name='positions-track'),
     path('positions/last/<int:driver_id>/', LastPositionAPIView.as_view(), name='position-last'),
     path('drivers/positions/', all_drivers_positions, name='all-drivers-positions'),
     path('drivers/<int:driver_id>/trips/', driver_trips_history, name='driver-trips-history'),
@@ -85,10 +92,14 @@ urlpatterns = [
     path('api/conducteur/', include('conducteur.urls')),
     path('available_vehicles/', views.available_vehicles, name='available_vehicles'),
     path('available_drivers/', views.available_drivers, name='available_drivers'),
+    re_path(r'^availability/(?P<kind>vehicle|driver)s/$', views.availability, name='availability'),
+    re_path(r'^availability/(?P<kind>vehicle|driver)s/(?P<pk>\d+)/slots/$', views.availability_slots,
+            name='availability_slots'),
     
     # Endpoints du dashboard
     path('dashboard/stats/', views.dashboard_stats, name='dashboard_stats'),
     path('dashboard/recent-activities/', views.recent_activities, name='recent_activities'),
+    path('cache/stats/', views.response_cache_stats, name='response_cache_stats'),
     
     # Endpoint de recherche globale
     path('search/', views.global_search, name='global_search'),
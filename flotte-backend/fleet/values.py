@@ -0,0 +1,133 @@
+# fleet/values.py
+
+from django.db import models
+from rest_framework import serializers
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+
+from .renderers import FastJSONRenderer
+
+# Champs dont la représentation est la valeur lue en base, telle quelle
+PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class UnsupportedPlan(Exception):
+    """Le sérialiseur contient un champ que .values() ne sait pas reproduire."""
+
+
+class ValuesPlan:
+    """
+    Plan de lecture d'un ModelSerializer par queryset.values().
+
+    Chaque champ du sérialiseur (sparse fields compris) devient une colonne
+    values(), les sérialiseurs imbriqués des jointures préfixées ; les lignes
+    sont reconstruites dans l'ordre et avec la représentation du sérialiseur,
+    sans instancier de modèles. Lève UnsupportedPlan pour les champs calculés
+    (SerializerMethodField, propriétés, sources pointées, relations multiples).
+    """
+
+    def __init__(self, serializer):
+        # 'pk' sert à la pagination par curseur (ordering '-pk')
+        self.lookups = {'pk': None}
+        self.builder = self._compile(serializer, '')
+
+    def values(self, queryset):
+        return queryset.values(*self.lookups)
+
+    def build(self, row):
+        return self.builder(row)
+
+    def _compile(self, serializer, prefix):
+        model = serializer.Meta.model
+        steps = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            source = field.source
+            if '.' in source or source == '*':
+                raise UnsupportedPlan(name)
+            try:
+                model_field = model._meta.get_field(source)
+            except Exception:
+                raise UnsupportedPlan(name)
+            if model_field.many_to_many or model_field.one_to_many:
+                raise UnsupportedPlan(name)
+            lookup = prefix + source
+            self.lookups[lookup] = None
+
+            if isinstance(field, serializers.ModelSerializer):
+                if not model_field.is_relation:
+                    raise UnsupportedPlan(name)
+                steps.append(_nested(name, lookup, self._compile(field, lookup + '__')))
+            elif isinstance(field, serializers.BaseSerializer):
+                raise UnsupportedPlan(name)
+            elif isinstance(model_field, models.FileField):
+                steps.append(_file(name, lookup, field, model_field))
+            elif type(field) in PASSTHROUGH_FIELDS:
+                steps.append(_passthrough(name, lookup))
+            else:
+                steps.append(_convert(name, lookup, field))
+
+        def build(row):
+            data = {}
+            for step in steps:
+                step(row, data)
+            return data
+        return build
+
+
+def _passthrough(name, lookup):
+    def step(row, data):
+        data[name] = row[lookup]
+    return step
+
+
+def _convert(name, lookup, field):
+    to_representation = field.to_representation
+
+    def step(row, data):
+        value = row[lookup]
+        data[name] = None if value is None else to_representation(value)
+    return step
+
+
+def _file(name, lookup, field, model_field):
+    def step(row, data):
+        value = model_field.attr_class(None, model_field, row[lookup] or '')
+        data[name] = field.to_representation(value)
+    return step
+
+
+def _nested(name, lookup, build):
+    def step(row, data):
+        data[name] = None if row[lookup] is None else build(row)
+    return step
+
+
+class FastListMixin:
+    """
+    Liste rapide pour les grands viewsets : lignes lues par .values() selon un
+    ValuesPlan du sérialiseur puis rendues par FastJSONRenderer. La réponse est
+    identique à celle du sérialiseur ; si le plan n'est pas applicable, la
+    liste classique est utilisée. Désactivable par viewset avec fast_list.
+    """
+    fast_list = True
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def list(self, request, *args, **kwargs):
+        if not self.fast_list:
+            return super().list(request, *args, **kwargs)
+        try:
+            plan = ValuesPlan(self.get_serializer())
+        except UnsupportedPlan:
+            return super().list(request, *args, **kwargs)
+
+        rows = plan.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        data = [plan.build(row) for row in (page if page is not None else rows)]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
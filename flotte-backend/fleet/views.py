@@ -1,10 +1,11 @@
 # fleet/views.py
 
 from django.shortcuts import render
-from rest_framework import viewsets, status, permissions
+from rest_framework import viewsets, mixins, status, permissions, serializers
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Sum, Avg
+from django.db.models import Sum, Avg, Count, Q, Value
+from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta
 from .models import (
@@ -24,8 +25,27 @@ from .models import (
     Rapport,
     CommentaireEcart,
     Historique,
-    Position
+    Position,
+    VehicleDailyStats,
+    VehicleFuelStats,
+    ReportBatch,
+    DASHBOARD_STATS_CACHE_KEY
 )
+from .rollup import EXPENSES_TOTAL
+from .alerts import evaluate_alerts
+from .tracking import ingest_positions
+from .pagination import PositionHistoryPagination
+from .renderers import FastJSONRenderer, dumps
+from .values import FastListMixin, ValuesPlan
+from .conditional import ConditionalGetMixin
+from .response_cache import cache_statistics, cached_response
+from .fuel import fuel_summary, window_summary
+from .reports import generate_report, start_report_batch
+from .exports import ExportMixin
+from .availability import (
+    RESOURCE_MODELS, bookings, free_in_windows, free_resources, free_slots,
+)
+from .geo import track_payload, parse_bbox
 from .serializers import (
     VehicleSerializer,
     DriverSerializer,
@@ -43,13 +63,15 @@ from .serializers import (
     RapportSerializer,
     CommentaireEcartSerializer,
     HistoriqueSerializer,
-    PositionSerializer
+    PositionSerializer,
+    PositionBulkItemSerializer,
+    ReportBatchSerializer
 )
 from rest_framework.views import APIView
 from django.contrib.auth.models import User, Group
 from django.core.mail import send_mail
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
 from rest_framework.permissions import IsAuthenticated
@@ -69,8 +91,8 @@ except Exception:
 # Configurer le logger
 logger = logging.getLogger(__name__)
 
-class UserProfileViewSet(viewsets.ModelViewSet):
-    queryset = UserProfile.objects.all()
+class UserProfileViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = UserProfile.objects.select_related('user')
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [JSONParser, FormParser, MultiPartParser]
@@ -100,8 +122,8 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         profile.save()
         return Response(self.get_serializer(profile, context={'request': request}).data)
 
-class DriverViewSet(viewsets.ModelViewSet):
-    queryset = Driver.objects.all()
+class DriverViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Driver.objects.select_related('user_profile__user')
     serializer_class = DriverSerializer
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [JSONParser, FormParser, MultiPartParser]
@@ -170,7 +192,7 @@ class DriverViewSet(viewsets.ModelViewSet):
             status=status.HTTP_201_CREATED
         )
 
-class VehicleViewSet(viewsets.ModelViewSet):
+class VehicleViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Vehicle.objects.all()
     serializer_class = VehicleSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -183,28 +205,39 @@ class VehicleViewSet(viewsets.ModelViewSet):
         maintenances = Maintenance.objects.filter(vehicle=vehicle).order_by('-date')
         data['maintenances'] = MaintenanceSerializer(maintenances, many=True).data
         
-        pleins = FuelLog.objects.filter(vehicle=vehicle).order_by('-date')
+        pleins = FuelLog.objects.filter(vehicle=vehicle).select_related(
+            'vehicle', 'driver__user_profile__user'
+        ).order_by('-date')
         data['pleins'] = FuelLogSerializer(pleins, many=True).data
         
         depenses = Expense.objects.filter(vehicle=vehicle).order_by('-date')
         data['depenses'] = ExpenseSerializer(depenses, many=True).data
         
-        missions = Mission.objects.filter(vehicle=vehicle).order_by('-date_debut')
+        missions = Mission.objects.filter(vehicle=vehicle).select_related(
+            'vehicle', 'driver__user_profile__user'
+        ).order_by('-date_debut')
         data['missions'] = MissionSerializer(missions, many=True).data
         
         return Response(data)
 
     @action(detail=False, methods=['get'])
+    @cached_response('vehicle_statistiques')
     def statistiques(self, request):
-        total_vehicules = Vehicle.objects.count()
-        vehicules_actifs = Vehicle.objects.filter(actif=True).count()
-        total_kilometrage = Vehicle.objects.aggregate(total=Sum('kilometrage'))['total'] or 0
-        
-        depenses = Expense.objects.all()
-        total_depenses = depenses.aggregate(total=Sum('montant'))['total'] or 0
-        
-        pleins = FuelLog.objects.all()
-        total_litres = pleins.aggregate(total=Sum('litres'))['total'] or 0
+        flotte = Vehicle.objects.aggregate(
+            total=Count('id'),
+            actifs=Count('id', filter=Q(actif=True)),
+            kilometrage=Sum('kilometrage'),
+        )
+        total_vehicules = flotte['total']
+        vehicules_actifs = flotte['actifs']
+        total_kilometrage = flotte['kilometrage'] or 0
+
+        # Totaux lus dans la table journalière plutôt que dans Expense et FuelLog
+        totaux = VehicleDailyStats.objects.aggregate(
+            depenses=Sum(EXPENSES_TOTAL), litres=Sum('carburant_litres')
+        )
+        total_depenses = totaux['depenses'] or 0
+        total_litres = totaux['litres'] or 0
         consommation_moyenne = 0
         if total_kilometrage > 0:
             consommation_moyenne = (total_litres * 100) / total_kilometrage
@@ -235,12 +268,12 @@ class VehicleViewSet(viewsets.ModelViewSet):
         pleins = FuelLog.objects.filter(
             vehicle=vehicle,
             date__range=[date_debut, date_fin]
-        ).order_by('-date')
+        ).select_related('vehicle', 'driver__user_profile__user').order_by('-date')
         
         missions = Mission.objects.filter(
             vehicle=vehicle,
             date_debut__range=[date_debut, date_fin]
-        ).order_by('-date_debut')
+        ).select_related('vehicle', 'driver__user_profile__user').order_by('-date_debut')
         
         return Response({
             'maintenances': MaintenanceSerializer(maintenances, many=True).data,
@@ -248,100 +281,89 @@ class VehicleViewSet(viewsets.ModelViewSet):
             'missions': MissionSerializer(missions, many=True).data
         })
 
-class AssignmentViewSet(viewsets.ModelViewSet):
+class AssignmentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Assignment.objects.all()
     serializer_class = AssignmentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class MaintenanceViewSet(viewsets.ModelViewSet):
+class MaintenanceViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Maintenance.objects.all()
     serializer_class = MaintenanceSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class FuelLogViewSet(viewsets.ModelViewSet):
-    queryset = FuelLog.objects.all()
+class FuelLogViewSet(ConditionalGetMixin, FastListMixin, ExportMixin, viewsets.ModelViewSet):
+    queryset = FuelLog.objects.select_related('vehicle', 'driver__user_profile__user')
     serializer_class = FuelLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    export_name = 'pleins'
+    export_columns = (
+        ('id', 'id'),
+        ('date', 'date'),
+        ('immatriculation', 'vehicle__immatriculation'),
+        ('conducteur_prenom', 'driver__user_profile__user__first_name'),
+        ('conducteur_nom', 'driver__user_profile__user__last_name'),
+        ('litres', 'litres'),
+        ('prix_litre', 'prix_litre'),
+        ('cout', 'cout'),
+        ('kilometrage', 'kilometrage'),
+        ('station', 'station'),
+        ('commentaire', 'commentaire'),
+    )
+    export_filters = {'vehicle_id': 'vehicle_id', 'driver': 'driver_id'}
 
     @action(detail=False, methods=['get'])
     def consumption_stats(self, request):
         vehicle_id = request.query_params.get('vehicle_id')
         if not vehicle_id:
             return Response({'error': 'vehicle_id is required'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        vehicle = Vehicle.objects.get(id=vehicle_id)
-        return Response({
-            'consommation_moyenne': vehicle.consommation_moyenne,
-            'total_carburant': FuelLog.objects.filter(vehicle=vehicle).aggregate(
-                total=Sum('cout'))['total'] or 0,
-            'total_litres': FuelLog.objects.filter(vehicle=vehicle).aggregate(
-                total=Sum('litres'))['total'] or 0,
-            'prix_moyen': FuelLog.objects.filter(vehicle=vehicle).aggregate(
-                avg=Avg('prix_litre'))['avg'] or 0
-        })
+        try:
+            periodes = [int(days) for days in request.query_params.get('days', '30,90').split(',') if days]
+            vehicle_id = int(vehicle_id)
+        except ValueError:
+            return Response({'error': 'vehicle_id et days doivent être des entiers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        max_days = getattr(settings, 'FUEL_STATS_MAX_DAYS', 3650)
+        if any(not 0 < days <= max_days for days in periodes):
+            return Response({'error': f'days doit être compris entre 1 et {max_days}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        # Une requête d'agrégat par période
+        max_periodes = getattr(settings, 'FUEL_STATS_MAX_PERIODS', 10)
+        if len(periodes) > max_periodes:
+            return Response({'error': f'{max_periodes} périodes au plus'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Totaux cumulés (VehicleFuelStats) : une requête quel que soit l'historique
+        stats = VehicleFuelStats.objects.filter(vehicle_id=vehicle_id).first()
+        if stats is None:
+            if not Vehicle.objects.filter(id=vehicle_id).exists():
+                return Response({'error': 'Véhicule introuvable'}, status=status.HTTP_404_NOT_FOUND)
+            stats = VehicleFuelStats(vehicle_id=vehicle_id)
+        data = fuel_summary(stats.litres, stats.cout, stats.pleins, stats.prix_litre_total,
+                            stats.kilometrage_min, stats.kilometrage_max)
+        data['periodes'] = {str(days): window_summary(vehicle_id, days) for days in periodes}
+        return Response(data)
 
-class AlertViewSet(viewsets.ModelViewSet):
+class AlertViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Alert.objects.all()
     serializer_class = AlertSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # AlertSerializer affiche str(vehicle) et str(driver)
+    version_models = (Vehicle, Driver, UserProfile, User)
 
     def get_queryset(self):
-        queryset = Alert.objects.filter(resolue=False).order_by('-date_alerte')
+        queryset = Alert.objects.filter(resolue=False).select_related(
+            'vehicle', 'driver__user_profile__user'
+        ).order_by('-date_alerte')
         return queryset
 
-    def generate_alerts(self):
-        today = timezone.now().date()
-        
-        Alert.objects.filter(resolue=False).delete()
-        
-        vehicles = Vehicle.objects.all()
-        for vehicle in vehicles:
-            if vehicle.assurance_expiration and (vehicle.assurance_expiration - today).days <= 30:
-                Alert.objects.create(
-                    vehicle=vehicle,
-                    type_alerte='assurance',
-                    message=f"L'assurance du véhicule {vehicle} expire le {vehicle.assurance_expiration}",
-                    niveau='warning' if (vehicle.assurance_expiration - today).days > 7 else 'critique'
-                )
-            
-            if vehicle.visite_technique and (vehicle.visite_technique - today).days <= 30:
-                Alert.objects.create(
-                    vehicle=vehicle,
-                    type_alerte='controle_technique',
-                    message=f"La visite technique du véhicule {vehicle} expire le {vehicle.visite_technique}",
-                    niveau='warning' if (vehicle.visite_technique - today).days > 7 else 'critique'
-                )
-
-        drivers = Driver.objects.filter(statut='actif')
-        for driver in drivers:
-            if driver.date_expiration_permis:
-                days_until_expiration = (driver.date_expiration_permis - today).days
-                if days_until_expiration <= 30:
-                    try:
-                        full_name = driver.user_profile.user.get_full_name() or driver.user_profile.user.username
-                        Alert.objects.create(
-                            driver=driver,
-                            type_alerte='permis',
-                            message=f"Le permis de conduire de {full_name} expire le {driver.date_expiration_permis}",
-                            niveau='warning' if days_until_expiration > 7 else 'critique'
-                        )
-                    except Exception as e:
-                        print(f"Erreur lors de la création de l'alerte pour le conducteur {driver.id}: {str(e)}")
-
-        documents = DocumentAdministratif.objects.all()
-        for doc in documents:
-            if (doc.date_expiration - today).days <= 30:
-                Alert.objects.create(
-                    vehicle=doc.vehicle,
-                    type_alerte=doc.type_document,
-                    message=f"Le document {doc.type_document} du véhicule {doc.vehicle} expire le {doc.date_expiration}",
-                    niveau='warning' if (doc.date_expiration - today).days > 7 else 'critique'
-                )
-
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['post'])
     def generate(self, request):
-        self.generate_alerts()
-        return Response({'message': 'Alertes générées avec succès'})
+        result = evaluate_alerts()
+        return Response({
+            'message': 'Alertes générées avec succès',
+            'created': len(result['created']),
+            'updated': len(result['updated']),
+            'resolved': result['resolved'],
+        })
 
     @action(detail=True, methods=['post'])
     def resolve(self, request, pk=None):
@@ -357,12 +379,13 @@ class AlertViewSet(viewsets.ModelViewSet):
             conducteur = user.profile.driver
         except Exception:
             return Response({'error': 'Conducteur non trouvé.'}, status=404)
-        alertes_conducteur = Alert.objects.filter(driver=conducteur, resolue=False)
+        alertes = Alert.objects.select_related('vehicle', 'driver__user_profile__user')
+        alertes_conducteur = alertes.filter(driver=conducteur, resolue=False)
         maintenant = timezone.now()
         vehicules_affectes = Affectation.objects.filter(driver=conducteur, statut='actif').values_list('vehicle_id', flat=True)
         vehicules_missions = Mission.objects.filter(driver=conducteur, date_depart__gte=maintenant).values_list('vehicle_id', flat=True)
         vehicules_ids = set(list(vehicules_affectes) + list(vehicules_missions))
-        alertes_vehicules = Alert.objects.filter(vehicle_id__in=vehicules_ids, resolue=False)
+        alertes_vehicules = alertes.filter(vehicle_id__in=vehicules_ids, resolue=False)
         alertes = list(alertes_conducteur) + list(alertes_vehicules)
         alertes = {a.id: a for a in alertes}.values()
         serializer = self.get_serializer(alertes, many=True)
@@ -374,10 +397,28 @@ class IsAdminOrDriver(permissions.BasePermission):
             return True
         return Driver.objects.filter(user_profile__user=request.user).exists()
 
-class MissionViewSet(viewsets.ModelViewSet):
-    queryset = Mission.objects.all()
+class MissionViewSet(ConditionalGetMixin, FastListMixin, ExportMixin, viewsets.ModelViewSet):
+    queryset = Mission.objects.select_related('vehicle', 'driver__user_profile__user')
     serializer_class = MissionSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrDriver]
+    export_name = 'missions'
+    export_date_field = 'date_depart'
+    export_columns = (
+        ('id', 'id'),
+        ('code', 'code'),
+        ('date_depart', 'date_depart'),
+        ('date_arrivee', 'date_arrivee'),
+        ('immatriculation', 'vehicle__immatriculation'),
+        ('conducteur_prenom', 'driver__user_profile__user__first_name'),
+        ('conducteur_nom', 'driver__user_profile__user__last_name'),
+        ('lieu_depart', 'lieu_depart'),
+        ('lieu_arrivee', 'lieu_arrivee'),
+        ('distance_km', 'distance_km'),
+        ('statut', 'statut'),
+        ('raison', 'raison'),
+    )
+    # ?driver= est déjà appliqué par get_queryset pour les conducteurs
+    export_filters = {'vehicle_id': 'vehicle_id', 'statut': 'statut'}
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -400,18 +441,11 @@ class MissionViewSet(viewsets.ModelViewSet):
                 queryset = queryset.none()
         return queryset
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        for mission in serializer.data:
-            logger.info(f"Mission ID: {mission['id']}, Statut: {mission['statut']}, Réponse conducteur: {mission['reponse_conducteur']}")
-        return Response(serializer.data)
-
     @action(detail=False, methods=['get'])
     def me(self, request):
         try:
             driver = Driver.objects.get(user_profile__user=request.user)
-            missions = Mission.objects.filter(driver=driver)
+            missions = self.queryset.filter(driver=driver)
             serializer = self.get_serializer(missions, many=True)
             return Response(serializer.data)
         except Driver.DoesNotExist:
@@ -475,10 +509,21 @@ class MissionViewSet(viewsets.ModelViewSet):
         except Driver.DoesNotExist:
             return Response({'error': 'Conducteur non trouvé'}, status=status.HTTP_404_NOT_FOUND)
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(ConditionalGetMixin, FastListMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Expense.objects.all()
     serializer_class = ExpenseSerializer
     permission_classes = [permissions.IsAuthenticated]
+    export_name = 'depenses'
+    export_columns = (
+        ('id', 'id'),
+        ('date', 'date'),
+        ('immatriculation', 'vehicle__immatriculation'),
+        ('type', 'type'),
+        ('montant', 'montant'),
+        ('kilometrage', 'kilometrage'),
+        ('description', 'description'),
+    )
+    export_filters = {'vehicle_id': 'vehicle_id', 'type': 'type'}
 
     @action(detail=False, methods=['get'])
     def by_vehicle(self, request):
@@ -486,7 +531,7 @@ class ExpenseViewSet(viewsets.ModelViewSet):
         if not vehicle_id:
             return Response({'error': 'vehicle_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        expenses = Expense.objects.filter(vehicle_id=vehicle_id)
+        expenses = self.get_queryset().filter(vehicle_id=vehicle_id)
         serializer = self.get_serializer(expenses, many=True)
         return Response(serializer.data)
 
@@ -496,12 +541,12 @@ class ExpenseViewSet(viewsets.ModelViewSet):
         if not expense_type:
             return Response({'error': 'type is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        expenses = Expense.objects.filter(type=expense_type)
+        expenses = self.get_queryset().filter(type=expense_type)
         serializer = self.get_serializer(expenses, many=True)
         return Response(serializer.data)
 
-class FinancialReportViewSet(viewsets.ModelViewSet):
-    queryset = FinancialReport.objects.all()
+class FinancialReportViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = FinancialReport.objects.select_related('vehicle')
     serializer_class = FinancialReportSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -514,67 +559,40 @@ class FinancialReportViewSet(viewsets.ModelViewSet):
         if not all([vehicle_id, date_debut, date_fin]):
             return Response({'error': 'vehicle_id, date_debut, and date_fin are required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            vehicle = Vehicle.objects.get(id=vehicle_id)
-        except Vehicle.DoesNotExist:
+        report = generate_report(vehicle_id, date_debut, date_fin)
+        if report is None:
             return Response({'error': 'Vehicle not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        total_carburant = Expense.objects.filter(
-            vehicle=vehicle, type='carburant',
-            date__range=[date_debut, date_fin]
-        ).aggregate(Sum('montant'))['montant__sum'] or 0
-
-        total_entretien = Entretien.objects.filter(
-            vehicle=vehicle,
-            date_entretien__range=[date_debut, date_fin]
-        ).aggregate(Sum('cout'))['cout__sum'] or 0
-
-        total_peages = Expense.objects.filter(
-             vehicle=vehicle, type='peage',
-             date__range=[date_debut, date_fin]
-        ).aggregate(Sum('montant'))['montant__sum'] or 0
-
-        total_amendes = Expense.objects.filter(
-             vehicle=vehicle, type='amende',
-             date__range=[date_debut, date_fin]
-        ).aggregate(Sum('montant'))['montant__sum'] or 0
-
-        total_autre = Expense.objects.filter(
-             vehicle=vehicle, type='autre',
-             date__range=[date_debut, date_fin]
-        ).aggregate(Sum('montant'))['montant__sum'] or 0
-
-        fuel_logs_in_period = FuelLog.objects.filter(
-            vehicle=vehicle,
-            date__range=[date_debut, date_fin]
-        ).order_by('date', 'kilometrage')
+        serializer = self.get_serializer(report)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        kilometrage_debut = fuel_logs_in_period.first().kilometrage if fuel_logs_in_period.exists() else vehicle.kilometrage
-        kilometrage_fin = fuel_logs_in_period.last().kilometrage if fuel_logs_in_period.exists() else vehicle.kilometrage
-        
-        total_litres = fuel_logs_in_period.aggregate(Sum('litres'))['litres__sum'] or 0
-        kilometrage_parcouru = kilometrage_fin - kilometrage_debut
-        consommation_moyenne = (total_litres * 100) / kilometrage_parcouru if kilometrage_parcouru > 0 else 0
+class ReportBatchViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin,
+                         viewsets.GenericViewSet):
+    """
+    Rapports financiers de toute la flotte (ou de vehicle_ids) sur une période :
+    la création répond 201 immédiatement, le lot s'exécute en arrière-plan et
+    son avancement se lit sur le détail ; les rapports produits sur /rapports/.
+    """
+    queryset = ReportBatch.objects.order_by('-date_creation')
+    serializer_class = ReportBatchSerializer
+    permission_classes = [permissions.IsAuthenticated]
 
-        report = FinancialReport.objects.create(
-            vehicle=vehicle,
-            date_debut=date_debut,
-            date_fin=date_fin,
-            total_carburant=total_carburant,
-            total_entretien=total_entretien,
-            total_peages=total_peages,
-            total_amendes=total_amendes,
-            total_autre=total_autre,
-            kilometrage_debut=kilometrage_debut,
-            kilometrage_fin=kilometrage_fin,
-            consommation_moyenne=consommation_moyenne
-        )
+    def perform_create(self, serializer):
+        batch = serializer.save(cree_par=self.request.user)
+        start_report_batch(batch)
 
-        serializer = self.get_serializer(report)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    @action(detail=True, methods=['get'])
+    def rapports(self, request, pk=None):
+        queryset = self.get_object().rapports.select_related('vehicle').order_by('vehicle_id')
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = FinancialReportSerializer(page, many=True, context=self.get_serializer_context())
+            return self.get_paginated_response(serializer.data)
+        serializer = FinancialReportSerializer(queryset, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
 
-class DocumentAdministratifViewSet(viewsets.ModelViewSet):
-    queryset = DocumentAdministratif.objects.all()
+class DocumentAdministratifViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = DocumentAdministratif.objects.select_related('vehicle')
     serializer_class = DocumentAdministratifSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -584,7 +602,7 @@ class DocumentAdministratifViewSet(viewsets.ModelViewSet):
         if not vehicle_id:
             return Response({'error': 'vehicle_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        documents = DocumentAdministratif.objects.filter(vehicle_id=vehicle_id)
+        documents = self.get_queryset().filter(vehicle_id=vehicle_id)
         serializer = self.get_serializer(documents, many=True)
         return Response(serializer.data)
 
@@ -594,12 +612,12 @@ class DocumentAdministratifViewSet(viewsets.ModelViewSet):
         if not document_type:
             return Response({'error': 'type is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        documents = DocumentAdministratif.objects.filter(type_document=document_type)
+        documents = self.get_queryset().filter(type_document=document_type)
         serializer = self.get_serializer(documents, many=True)
         return Response(serializer.data)
 
-class EntretienViewSet(viewsets.ModelViewSet):
-    queryset = Entretien.objects.all()
+class EntretienViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Entretien.objects.select_related('vehicle')
     serializer_class = EntretienSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -609,7 +627,7 @@ class EntretienViewSet(viewsets.ModelViewSet):
         if not vehicle_id:
             return Response({'error': 'vehicle_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        entretiens = Entretien.objects.filter(vehicle_id=vehicle_id)
+        entretiens = self.get_queryset().filter(vehicle_id=vehicle_id)
         serializer = self.get_serializer(entretiens, many=True)
         return Response(serializer.data)
 
@@ -619,12 +637,12 @@ class EntretienViewSet(viewsets.ModelViewSet):
         if not entretien_type:
             return Response({'error': 'type is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        entretiens = Entretien.objects.filter(type_entretien=entretien_type)
+        entretiens = self.get_queryset().filter(type_entretien=entretien_type)
         serializer = self.get_serializer(entretiens, many=True)
         return Response(serializer.data)
 
-class RapportViewSet(viewsets.ModelViewSet):
-    queryset = Rapport.objects.all()
+class RapportViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Rapport.objects.select_related('auteur__user')
     serializer_class = RapportSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -634,7 +652,7 @@ class RapportViewSet(viewsets.ModelViewSet):
         if not rapport_type:
             return Response({'error': 'type is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        rapports = Rapport.objects.filter(type_rapport=rapport_type)
+        rapports = self.get_queryset().filter(type_rapport=rapport_type)
         serializer = self.get_serializer(rapports, many=True)
         return Response(serializer.data)
 
@@ -644,12 +662,14 @@ class RapportViewSet(viewsets.ModelViewSet):
         if not auteur_id:
             return Response({'error': 'auteur_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        rapports = Rapport.objects.filter(auteur_id=auteur_id)
+        rapports = self.get_queryset().filter(auteur_id=auteur_id)
         serializer = self.get_serializer(rapports, many=True)
         return Response(serializer.data)
 
-class CommentaireEcartViewSet(viewsets.ModelViewSet):
-    queryset = CommentaireEcart.objects.all()
+class CommentaireEcartViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = CommentaireEcart.objects.select_related(
+        'mission__vehicle', 'mission__driver__user_profile__user', 'utilisateur__user'
+    )
     serializer_class = CommentaireEcartSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -659,12 +679,12 @@ class CommentaireEcartViewSet(viewsets.ModelViewSet):
         if not mission_id:
             return Response({'error': 'mission_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        commentaires = CommentaireEcart.objects.filter(mission_id=mission_id)
+        commentaires = self.get_queryset().filter(mission_id=mission_id)
         serializer = self.get_serializer(commentaires, many=True)
         return Response(serializer.data)
 
-class HistoriqueViewSet(viewsets.ModelViewSet):
-    queryset = Historique.objects.all()
+class HistoriqueViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Historique.objects.select_related('vehicle', 'utilisateur__user')
     serializer_class = HistoriqueSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -674,7 +694,7 @@ class HistoriqueViewSet(viewsets.ModelViewSet):
         if not vehicle_id:
             return Response({'error': 'vehicle_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        historiques = Historique.objects.filter(vehicle_id=vehicle_id)
+        historiques = self.get_queryset().filter(vehicle_id=vehicle_id)
         serializer = self.get_serializer(historiques, many=True)
         return Response(serializer.data)
 
@@ -684,7 +704,7 @@ class HistoriqueViewSet(viewsets.ModelViewSet):
         if not evenement_type:
             return Response({'error': 'type is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        historiques = Historique.objects.filter(evenement=evenement_type)
+        historiques = self.get_queryset().filter(evenement=evenement_type)
         serializer = self.get_serializer(historiques, many=True)
         return Response(serializer.data)
 
@@ -746,8 +766,8 @@ def send_alert_email(request):
         'error': 'Méthode non autorisée'
     }, status=405)
 
-class ManagerViewSet(viewsets.ModelViewSet):
-    queryset = UserProfile.objects.filter(role='gestionnaire')
+class ManagerViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = UserProfile.objects.filter(role='gestionnaire').select_related('user')
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -803,41 +823,248 @@ class PositionListCreateAPIView(APIView):
         except Exception as e:
             print("[ERROR] Position serializer errors:", serializer.errors)
             return Response(serializer.errors, status=400)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        position = Position(**serializer.validated_data)
+        # Une position trop proche de la précédente est reçue mais pas enregistrée
+        # (id nul, "filtered" vrai) ; le statut reste 201 pour l'application conducteur
+        filtered = not ingest_positions([position])
+        return Response({**PositionSerializer(position).data, 'filtered': filtered},
+                        status=status.HTTP_201_CREATED)
+
+class PositionBulkCreateAPIView(APIView):
+    """
+    Enregistre un lot de positions horodatées envoyées par l'application conducteur.
+
+    Corps accepté : une liste de positions, ou un objet
+    {"driver": <id>, "positions": [...]} où "driver" sert de valeur par défaut.
+    Les positions valides passent le filtre d'ingestion (fleet.tracking) puis
+    sont insérées en un seul bulk_create ; les positions écartées sont comptées
+    dans "filtered", les invalides renvoyées avec leur index dans "errors".
+    """
+    permission_classes = [IsAuthenticated]
+    max_items = 1000
+
+    def post(self, request):
+        data = request.data
+        default_driver = None
+        if isinstance(data, dict):
+            default_driver = data.get('driver')
+            data = data.get('positions')
+        if not isinstance(data, list) or not data:
+            return Response({'error': 'Une liste de positions est requise'}, status=400)
+        if len(data) > self.max_items:
+            return Response({'error': f'Maximum {self.max_items} positions par lot'}, status=400)
+
+        if default_driver is None:
+            default_driver = Driver.objects.filter(
+                user_profile__user=request.user
+            ).values_list('id', flat=True).first()
+
+        errors = []
+        valid = []
+        for index, item in enumerate(data):
+            if not isinstance(item, dict):
+                errors.append({'index': index, 'errors': {'non_field_errors': ['Objet attendu']}})
+                continue
+            serializer = PositionBulkItemSerializer(data=item)
+            if not serializer.is_valid():
+                errors.append({'index': index, 'errors': serializer.errors})
+                continue
+            attrs = serializer.validated_data
+            attrs.setdefault('driver_id', default_driver)
+            if attrs['driver_id'] is None:
+                errors.append({'index': index, 'errors': {'driver': ['Ce champ est obligatoire.']}})
+                continue
+            valid.append((index, attrs))
+
+        driver_ids = {attrs['driver_id'] for _, attrs in valid}
+        known_drivers = set(Driver.objects.filter(id__in=driver_ids).values_list('id', flat=True))
+        positions = []
+        for index, attrs in valid:
+            if attrs['driver_id'] not in known_drivers:
+                errors.append({'index': index, 'errors': {'driver': ['Conducteur introuvable.']}})
+                continue
+            positions.append(Position(**attrs))
+
+        created = ingest_positions(positions) if positions else []
+
+        errors.sort(key=lambda e: e['index'])
+        payload = {
+            'created': len(created),
+            'filtered': len(positions) - len(created),
+            'rejected': len(errors),
+            'errors': errors,
+        }
+        if not positions:
+            return Response(payload, status=400)
+        return Response(payload, status=status.HTTP_201_CREATED)
+
+def _filter_position_history(request, queryset):
+    """Applique les filtres driver, from, to et bbox (min_lon,min_lat,max_lon,max_lat)."""
+    driver_id = request.GET.get('driver')
+    if not driver_id:
+        raise ValueError('driver est requis')
+    queryset = queryset.filter(driver_id=driver_id)
+
+    for param, lookup in (('from', 'timestamp__gte'), ('to', 'timestamp__lt')):
+        value = request.GET.get(param)
+        if value:
+            parsed = parse_datetime(value)
+            if not parsed:
+                raise ValueError(f'Format de date invalide pour {param}')
+            queryset = queryset.filter(**{lookup: parsed})
+
+    bbox = request.GET.get('bbox')
+    if bbox:
+        min_lon, min_lat, max_lon, max_lat = parse_bbox(bbox)
+        queryset = queryset.filter(
+            longitude__gte=min_lon, longitude__lte=max_lon,
+            latitude__gte=min_lat, latitude__lte=max_lat,
+        )
+    return queryset
+
+class PositionHistoryAPIView(APIView):
+    """
+    Historique GPS d'un conducteur, paginé par curseur (?cursor=, ?page_size=)
+    ou diffusé en NDJSON avec ?stream=1, sans jamais charger toute la trace.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [FastJSONRenderer]
+    stream_chunk_size = 2000
+    fast_list = True
+
+    def get(self, request):
+        try:
+            queryset = _filter_position_history(request, Position.objects.all())
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        # Lignes lues par .values() et construites comme PositionSerializer
+        plan = ValuesPlan(PositionSerializer())
+        if request.GET.get('stream') in ('1', 'true', 'ndjson'):
+            rows = plan.values(queryset.order_by('timestamp')).iterator(chunk_size=self.stream_chunk_size)
+            response = StreamingHttpResponse(
+                (dumps(plan.build(row)) + b'\n' for row in rows), content_type='application/x-ndjson'
+            )
+            response['Cache-Control'] = 'no-cache'
+            return response
+
+        paginator = PositionHistoryPagination()
+        if not self.fast_list:
+            page = paginator.paginate_queryset(queryset, request, view=self)
+            return paginator.get_paginated_response(PositionSerializer(page, many=True).data)
+        page = paginator.paginate_queryset(plan.values(queryset), request, view=self)
+        return paginator.get_paginated_response([plan.build(row) for row in page])
+
+class PositionTrackAPIView(APIView):
+    """
+    Trace simplifiée (Douglas-Peucker) d'un conducteur pour l'affichage cartographique.
+
+    Mêmes filtres que l'historique ; ?tolerance=<mètres> ou ?zoom=<niveau>,
+    et ?encoding=polyline pour une polyligne encodée au format Google.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            queryset = _filter_position_history(request, Position.objects.all())
+            points = list(queryset.order_by('timestamp').values_list('latitude', 'longitude', 'timestamp'))
+            payload = track_payload(points, request.GET, serializers.DateTimeField())
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        payload['driver'] = int(request.GET['driver'])
+        return Response(payload)
+
+def _parse_window(debut, fin):
+    """Fenêtre [debut, fin[ à partir de deux dates ISO ; lève ValueError si invalide."""
+    if not debut or not fin:
+        raise ValueError('date_debut et date_fin requis')
+    debut, fin = parse_datetime(debut), parse_datetime(fin)
+    if not debut or not fin:
+        raise ValueError('Format de date invalide')
+    if timezone.is_naive(debut):
+        debut = timezone.make_aware(debut)
+    if timezone.is_naive(fin):
+        fin = timezone.make_aware(fin)
+    if fin <= debut:
+        raise ValueError('date_fin doit être postérieure à date_debut')
+    return debut, fin
 
 @api_view(['GET'])
+@cached_response('available_vehicles')
 def available_vehicles(request):
-    date_debut = request.GET.get('date_debut')
-    date_fin = request.GET.get('date_fin')
-    if not date_debut or not date_fin:
-        return Response({'error': 'date_debut et date_fin requis'}, status=400)
-    date_debut = parse_datetime(date_debut)
-    date_fin = parse_datetime(date_fin)
-    if not date_debut or not date_fin:
-        return Response({'error': 'Format de date invalide'}, status=400)
-    missions = Mission.objects.filter(date_depart__lt=date_fin, date_arrivee__gt=date_debut)
-    vehicules_occupes = missions.values_list('vehicle_id', flat=True)
-    vehicules_dispos = Vehicle.objects.exclude(id__in=vehicules_occupes)
-    serializer = VehicleSerializer(vehicules_dispos, many=True)
+    try:
+        date_debut, date_fin = _parse_window(request.GET.get('date_debut'), request.GET.get('date_fin'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    vehicules_dispos = free_resources('vehicle', date_debut, date_fin)
+    serializer = VehicleSerializer(vehicules_dispos, many=True, context={'request': request})
     return Response(serializer.data)
 
 @api_view(['GET'])
+@cached_response('available_drivers')
 def available_drivers(request):
-    date_debut = request.GET.get('date_debut')
-    date_fin = request.GET.get('date_fin')
-    if not date_debut or not date_fin:
-        return Response({'error': 'date_debut et date_fin requis'}, status=400)
-    date_debut = parse_datetime(date_debut)
-    date_fin = parse_datetime(date_fin)
-    if not date_debut or not date_fin:
-        return Response({'error': 'Format de date invalide'}, status=400)
-    missions = Mission.objects.filter(date_depart__lt=date_fin, date_arrivee__gt=date_debut)
-    conducteurs_occupes = missions.values_list('driver_id', flat=True)
-    conducteurs_dispos = Driver.objects.exclude(id__in=conducteurs_occupes)
-    serializer = DriverSerializer(conducteurs_dispos, many=True)
+    try:
+        date_debut, date_fin = _parse_window(request.GET.get('date_debut'), request.GET.get('date_fin'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    conducteurs_dispos = free_resources(
+        'driver', date_debut, date_fin, Driver.objects.select_related('user_profile__user')
+    )
+    serializer = DriverSerializer(conducteurs_dispos, many=True, context={'request': request})
     return Response(serializer.data)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def availability(request, kind):
+    """
+    Identifiants des véhicules ou conducteurs (``kind``) libres pour chaque fenêtre ?fenetre=<début>,<fin> (répétable), en une requête.
+    """
+    fenetres = request.GET.getlist('fenetre')
+    if not fenetres:
+        return Response({'error': 'Au moins une fenetre=<début>,<fin> requise'}, status=400)
+    max_windows = getattr(settings, 'AVAILABILITY_MAX_WINDOWS', 50)
+    if len(fenetres) > max_windows:
+        return Response({'error': f'{max_windows} fenêtres au plus'}, status=400)
+    try:
+        windows = [_parse_window(*fenetre.split(',', 1)) if ',' in fenetre else _parse_window(fenetre, None)
+                   for fenetre in fenetres]
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    libres = free_in_windows(kind, windows)
+    return Response([
+        {'date_debut': debut, 'date_fin': fin, 'libres': sorted(ids)}
+        for (debut, fin), ids in zip(windows, libres)
+    ])
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def availability_slots(request, kind, pk):
+    """
+    Réservations et créneaux libres d'un véhicule ou conducteur sur les
+    ?days= prochains jours (7 par défaut) ; ?duree_min= en minutes.
+    """
+    try:
+        days = int(request.GET.get('days', 7))
+        duree_min = int(request.GET.get('duree_min', 0))
+    except ValueError:
+        return Response({'error': 'days et duree_min doivent être des entiers'}, status=400)
+    if not 0 < days <= getattr(settings, 'AVAILABILITY_MAX_DAYS', 90) or duree_min < 0:
+        return Response({'error': 'days ou duree_min hors limites'}, status=400)
+    date_debut = timezone.now()
+    date_fin = date_debut + timedelta(days=days)
+    reservations = bookings(kind, pk, date_debut, date_fin)
+    if not reservations and not RESOURCE_MODELS[kind].objects.filter(pk=pk).exists():
+        return Response({'error': 'Ressource introuvable'}, status=404)
+    return Response({
+        'date_debut': date_debut,
+        'date_fin': date_fin,
+        'reservations': [{'source': source, 'date_debut': debut, 'date_fin': fin}
+                         for source, debut, fin in reservations],
+        'creneaux': [{'date_debut': debut, 'date_fin': fin}
+                     for debut, fin in free_slots(kind, pk, date_debut, date_fin,
+                                                  timedelta(minutes=duree_min), reservations)],
+    })
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_profile_me(request):
@@ -859,64 +1086,79 @@ class LastPositionAPIView(RetrieveAPIView):
         serializer = self.get_serializer(position)
         return Response(serializer.data)
 
+def _counts(model, key, first=None, second=None):
+    """Ligne (clé, total, compte filtré, compte filtré) d'une table, sans GROUP BY."""
+    zero = Value(0, output_field=models.IntegerField())
+    return model.objects.order_by().annotate(
+        key=Value(key, output_field=models.CharField())
+    ).values('key').annotate(
+        total=Count('pk'),
+        first=Count('pk', filter=first) if first is not None else zero,
+        second=Count('pk', filter=second) if second is not None else zero,
+    ).values_list('key', 'total', 'first', 'second')
+
+def compute_dashboard_stats(period_days=30):
+    """
+    Statistiques du tableau de bord en deux requêtes : UNION ALL d'agrégats
+    conditionnels pour les effectifs, table VehicleDailyStats pour les montants.
+    """
+    counts = {
+        key: (total, first, second)
+        for key, total, first, second in _counts(Vehicle, 'vehicles', Q(actif=True)).union(
+            _counts(Driver, 'drivers', Q(statut='actif')),
+            _counts(Mission, 'missions', Q(statut='en_attente'), Q(statut='en_cours')),
+            _counts(Alert, 'alerts', Q(niveau='critique', resolue=False)),
+            all=True,
+        )
+    }
+    since = timezone.localdate() - timedelta(days=period_days)
+    totals = VehicleDailyStats.objects.filter(date__gte=since).aggregate(
+        expenses=Sum(EXPENSES_TOTAL), fuel=Sum('carburant_cout')
+    )
+    return {
+        'vehicles': {
+            'total': counts['vehicles'][0],
+            'active': counts['vehicles'][1]
+        },
+        'drivers': {
+            'total': counts['drivers'][0],
+            'active': counts['drivers'][1]
+        },
+        'missions': {
+            'total': counts['missions'][0],
+            'pending': counts['missions'][1],
+            'active': counts['missions'][2]
+        },
+        'alerts': {
+            'total': counts['alerts'][0],
+            'critical': counts['alerts'][1]
+        },
+        'finances': {
+            'recent_expenses': float(totals.get('expenses') or 0),
+            'recent_fuel': float(totals.get('fuel') or 0),
+            'period_days': period_days
+        }
+    }
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def dashboard_stats(request):
     try:
-        total_vehicles = Vehicle.objects.count()
-        active_vehicles = Vehicle.objects.filter(actif=True).count()
-        
-        total_drivers = Driver.objects.count()
-        active_drivers = Driver.objects.filter(statut='actif').count()
-        
-        total_missions = Mission.objects.count()
-        pending_missions = Mission.objects.filter(statut='en_attente').count()
-        active_missions = Mission.objects.filter(statut='en_cours').count()
-        
-        total_alerts = Alert.objects.count()
-        critical_alerts = Alert.objects.filter(niveau='critique', resolue=False).count()
-        
-        from datetime import datetime, timedelta
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        
-        recent_expenses = Expense.objects.filter(date__gte=thirty_days_ago)
-        total_recent_expenses = sum(expense.montant for expense in recent_expenses)
-        
-        recent_fuel = FuelLog.objects.filter(date__gte=thirty_days_ago)
-        total_recent_fuel = sum(fuel.cout for fuel in recent_fuel)
-        
-        return Response({
-            'vehicles': {
-                'total': total_vehicles,
-                'active': active_vehicles
-            },
-            'drivers': {
-                'total': total_drivers,
-                'active': active_drivers
-            },
-            'missions': {
-                'total': total_missions,
-                'pending': pending_missions,
-                'active': active_missions
-            },
-            'alerts': {
-                'total': total_alerts,
-                'critical Ascertainable': critical_alerts
-            },
-            'finances': {
-                'recent_expenses': float(total_recent_expenses),
-                'recent_fuel': float(total_recent_fuel),
-                'period_days': 30
-            }
-        })
+        # Instantané mis en cache, invalidé par les signaux de fleet.models
+        stats = cache.get(DASHBOARD_STATS_CACHE_KEY)
+        if stats is None:
+            stats = compute_dashboard_stats()
+            cache.set(DASHBOARD_STATS_CACHE_KEY, stats, getattr(settings, 'DASHBOARD_STATS_CACHE_TTL', 60))
+        return Response(stats)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_response('recent_activities')
 def recent_activities(request):
     try:
-        recent_missions = Mission.objects.order_by('-date_depart')[:10]
+        recent_missions = Mission.objects.select_related('vehicle', 'driver__user_profile__user').order_by('-date_depart')[:10]
         mission_data = []
         for mission in recent_missions:
             mission_data.append({
@@ -942,7 +1184,7 @@ def recent_activities(request):
                 'resolue': alert.resolue
             })
         
-        recent_expenses = Expense.objects.order_by('-date')[:10]
+        recent_expenses = Expense.objects.select_related('vehicle').order_by('-date')[:10]
         expense_data = []
         for expense in recent_expenses:
             expense_data.append({
@@ -962,6 +1204,12 @@ def recent_activities(request):
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def response_cache_stats(request):
+    """Succès et échecs du cache de réponses (fleet.response_cache) par endpoint."""
+    return Response(cache_statistics())
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def global_search(request):
@@ -1032,31 +1280,34 @@ def global_search(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def all_drivers_positions(request):
-    drivers = Driver.objects.all()
+    drivers = Driver.objects.select_related('user_profile__user', 'last_position')
+    now = timezone.now()
     result = []
-    
+
     for driver in drivers:
-        last_position = Position.objects.filter(driver=driver).order_by('-timestamp').first()
-        
+        last_position = getattr(driver, 'last_position', None)
+        user = driver.user_profile.user
+
         is_online = False
         if last_position:
-            time_diff = timezone.now() - last_position.timestamp
+            time_diff = now - (last_position.last_seen or last_position.timestamp)
             is_online = time_diff.total_seconds() < 300
-        
+
         driver_data = {
             'id': driver.id,
-            'username': driver.user_profile.user.username if driver.user_profile else 'Inconnu',
-            'first_name': driver.user_profile.user.first_name if driver.user_profile and driver.user_profile.user else '',
-            'last_name': driver.user_profile.user.last_name if driver.user_profile and driver.user_profile.user else '',
+            'username': user.username,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
             'is_online': is_online,
             'last_position': {
-                'latitude': float(last_position.latitude) if last_position else None,
-                'longitude': float(last_position.longitude) if last_position else None,
-                'timestamp': last_position.timestamp if last_position else None,
+                'latitude': last_position.latitude,
+                'longitude': last_position.longitude,
+                'timestamp': last_position.timestamp,
+                'stationary_since': last_position.stationary_since,
             } if last_position else None
         }
         result.append(driver_data)
-    
+
     return Response(result)
 
 @api_view(['GET'])
@@ -8,6 +8,7 @@ import 'package:intl/intl.dart';
 import 'package:flotte/services/notification_service.dart';
 import 'package:flotte/services/sms_service.dart';
 import 'package:flotte/services/email_service.dart';
+import 'package:web_socket_channel/web_socket_channel.dart';
 
 class AlertesPage extends StatefulWidget {
   const AlertesPage({super.key});
@@ -36,10 +37,43 @@ class _AlertesPageState extends State<AlertesPage> {
   final SMSService _smsService = SMSService();
   final EmailService _emailService = EmailService();
 
+  // Alertes critiques poussées par le serveur (ws/alerts/), évaluées en tâche de fond
+  WebSocketChannel? _alertsChannel;
+
   @override
   void initState() {
     super.initState();
     fetchAlertes();
+    _listenCriticalAlerts();
+  }
+
+  @override
+  void dispose() {
+    _alertsChannel?.sink.close();
+    super.dispose();
+  }
+
+  Future<void> _listenCriticalAlerts() async {
+    final prefs = await SharedPreferences.getInstance();
+    final token = prefs.getString('token');
+    if (token == null || !mounted) return;
+
+    try {
+      _alertsChannel = WebSocketChannel.connect(
+        Uri.parse('ws://192.168.11.243:8000/ws/alerts/?token=$token'),
+      );
+      _alertsChannel!.stream.listen((message) async {
+        final data = json.decode(message);
+        if (data['type'] != 'alerts') return;
+        for (var alerte in data['alerts']) {
+          await _notificationService.showNotification('Alerte Critique');
+          await _emailService.sendAlertEmail(alerte);
+        }
+        if (mounted) await fetchAlertes();
+      }, onError: (e) => print('Erreur flux des alertes: $e'));
+    } catch (e) {
+      print('Erreur connexion flux des alertes: $e');
+    }
   }
 
   Future<void> fetchAlertes() async {
@@ -53,11 +87,6 @@ class _AlertesPageState extends State<AlertesPage> {
         return;
       }
 
-      await http.get(
-        Uri.parse('http://192.168.11.243:8000/api/alerts/generate/'),
-        headers: {'Authorization': 'Bearer $token'},
-      );
-
       final response = await http.get(
         Uri.parse('http://192.168.11.243:8000/api/alerts/'),
         headers: {'Authorization': 'Bearer $token'},
@@ -70,12 +99,6 @@ class _AlertesPageState extends State<AlertesPage> {
           isLoading = false;
         });
 
-        for (var alerte in nouvellesAlertes) {
-          if (alerte['niveau'] == 'critique') {
-            await _notificationService.showNotification('Alerte Critique');
-            await _emailService.sendAlertEmail(alerte);
-          }
-        }
       } else {
         setState(() {
           isLoading = false;
@@ -8,6 +8,7 @@ import 'package:shared_preferences/shared_preferences.dart';
 import 'package:intl/intl.dart';
 import 'package:google_maps_flutter/google_maps_flutter.dart';
 import 'package:flotte/config.dart';
+import 'package:web_socket_channel/web_socket_channel.dart';
 
 class TrajetsModernPage extends StatefulWidget {
   const TrajetsModernPage({super.key});
@@ -33,30 +34,89 @@ class _TrajetsModernPageState extends State<TrajetsModernPage> {
   int totalConducteurs = 0;
   int conducteursEnLigne = 0;
   
-  // Timer pour actualisation automatique
-  Timer? _refreshTimer;
+  // Positions en temps réel (ws/fleet/) ; reconnexion automatique si la connexion tombe
+  WebSocketChannel? _liveChannel;
+  StreamSubscription? _liveSubscription;
+  Timer? _reconnectTimer;
 
   @override
   void initState() {
     super.initState();
     loadData();
-    _startAutoRefresh();
+    _connectLive();
   }
 
   @override
   void dispose() {
-    _refreshTimer?.cancel();
+    _reconnectTimer?.cancel();
+    _liveSubscription?.cancel();
+    _liveChannel?.sink.close();
     super.dispose();
   }
 
-  void _startAutoRefresh() {
-    _refreshTimer = Timer.periodic(const Duration(seconds: 30), (timer) {
+  Future<void> _connectLive() async {
+    final prefs = await SharedPreferences.getInstance();
+    final token = prefs.getString('token');
+    if (token == null || !mounted) return;
+
+    final wsUrl = AppConfig.baseUrl.replaceFirst('http', 'ws');
+    try {
+      _liveChannel = WebSocketChannel.connect(Uri.parse('$wsUrl/ws/fleet/?token=$token'));
+      _liveSubscription = _liveChannel!.stream.listen(
+        _onLiveMessage,
+        onError: (e) => _scheduleReconnect(),
+        onDone: _scheduleReconnect,
+      );
+    } catch (e) {
+      print('Erreur connexion temps réel: $e');
+      _scheduleReconnect();
+    }
+  }
+
+  void _scheduleReconnect() {
+    _liveSubscription?.cancel();
+    _liveSubscription = null;
+    _liveChannel = null;
+    if (!mounted) return;
+    _reconnectTimer?.cancel();
+    _reconnectTimer = Timer(const Duration(seconds: 10), () {
       if (mounted) {
+        // Rattraper les positions manquées pendant la coupure
         loadData();
+        _connectLive();
       }
     });
   }
 
+  void _onLiveMessage(dynamic message) {
+    final data = json.decode(message);
+    if (data['type'] != 'snapshot' && data['type'] != 'positions') return;
+
+    var changed = false;
+    for (var update in data['positions']) {
+      if (update['kind'] != 'driver') continue;
+      final conducteur = conducteurs.firstWhere(
+        (c) => c['id'] == update['id'],
+        orElse: () => null,
+      );
+      if (conducteur == null) continue;
+      final timestamp = DateTime.tryParse(update['timestamp'] ?? '');
+      conducteur['last_position'] = {
+        'latitude': (update['latitude'] as num).toDouble(),
+        'longitude': (update['longitude'] as num).toDouble(),
+        'timestamp': update['timestamp'],
+      };
+      conducteur['is_online'] = timestamp != null &&
+          DateTime.now().difference(timestamp).inSeconds < 300;
+      changed = true;
+    }
+
+    if (changed && mounted) {
+      conducteursEnLigne = conducteurs.where((c) => c['is_online'] == true).length;
+      _updateMapMarkers();
+    }
+  }
+
   Future<void> loadData() async {
     try {
       setState(() {